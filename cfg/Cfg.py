@@ -0,0 +1,98 @@
+from array import array
+
+# kinds of the nodes of a Cfg
+ASSIGN_NODE = 0
+IF_NODE = 1
+WHILE_NODE = 2
+# node without successors that is not a decision (the empty label ending the program)
+EXIT_NODE = 3
+
+
+class Cfg:
+    """
+    Compact CFG stored in arrays (CSR layout)
+    Nodes are the integer ids 0..n-1, labels[id] is the label of the node and ids the reverse.
+    The edges leaving node u are the edge ids offsets[u] to offsets[u+1] - 1, edge e goes
+    to the node targets[e], edge_labels[e] is its code label and actions[e] its compiled
+    EdgeAction. Successors keep the order in which the edges were added.
+    kinds[id] is the kind of the node (ASSIGN_NODE, IF_NODE, WHILE_NODE, EXIT_NODE),
+    source and target are the ids of the entry and exit nodes
+    """
+    def __init__(self, labels, edges, labels_if=(), labels_while=()):
+        """
+        :param labels: labels of the nodes, in the order they were added
+        :param edges: dict (label1, label2) -> code label, in the order the edges were added
+        :param labels_if: labels of the IF decisions
+        :param labels_while: labels of the WHILE decisions
+        """
+        self.labels = list(labels)
+        known = set(self.labels)
+        for edge in edges:
+            for label in edge:
+                if label not in known:
+                    known.add(label)
+                    self.labels.append(label)
+        self.ids = {label: i for i, label in enumerate(self.labels)}
+        n = len(self.labels)
+        by_source = [[] for _ in range(n)]
+        for (label1, label2), code in edges.items():
+            by_source[self.ids[label1]].append((self.ids[label2], code))
+        self.offsets = array('q', [0])
+        self.sources = array('q')
+        self.targets = array('q')
+        self.edge_labels = []
+        for u, successors in enumerate(by_source):
+            for v, code in successors:
+                self.sources.append(u)
+                self.targets.append(v)
+                self.edge_labels.append(code)
+            self.offsets.append(len(self.targets))
+        self.edge_ids = {(self.sources[e], self.targets[e]): e for e in range(len(self.targets))}
+        # compiled by CfgParser.compileEdges
+        self.actions = [None] * len(self.targets)
+        self.kinds = array('b', [ASSIGN_NODE] * n)
+        for u in range(n):
+            if self.offsets[u] == self.offsets[u + 1]:
+                self.kinds[u] = EXIT_NODE
+        for label in labels_if:
+            self.kinds[self.ids[label]] = IF_NODE
+        for label in labels_while:
+            self.kinds[self.ids[label]] = WHILE_NODE
+        # entry: first node without predecessors, exit: first node without successors
+        has_predecessors = set(self.targets)
+        self.source = next((u for u in range(n) if u not in has_predecessors), None)
+        self.target = next((u for u in range(n) if self.offsets[u] == self.offsets[u + 1]), None)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def isDecision(self, u):
+        return self.kinds[u] == IF_NODE or self.kinds[u] == WHILE_NODE
+
+    def successors(self, label):
+        """ Labels of the successors of the node of label """
+        u = self.ids[label]
+        return [self.labels[v] for v in self.targets[self.offsets[u]:self.offsets[u + 1]]]
+
+    def predecessors(self, label):
+        v = self.ids[label]
+        return [self.labels[self.sources[e]] for e in range(len(self.targets)) if self.targets[e] == v]
+
+    def edge(self, label1, label2):
+        """ :return: id of the edge from label1 to label2 """
+        return self.edge_ids[self.ids[label1], self.ids[label2]]
+
+    def edges(self):
+        """ :return: list of the edges (label1, label2), by source node then in order """
+        return [(self.labels[self.sources[e]], self.labels[self.targets[e]]) for e in range(len(self.targets))]
+
+    def toNetworkx(self):
+        """ networkx DiGraph holding the code labels (no compiled action), only for drawing and export """
+        # networkx is not needed to build or run the CFG
+        import networkx as nx
+        graph = nx.DiGraph()
+        for label in self.labels:
+            graph.add_node(label, label=label)
+        for (label1, label2), code in zip(self.edges(), self.edge_labels):
+            graph.add_edge(label1, label2, label=code)
+        return graph
@@ -0,0 +1,134 @@
+import gc
+import hashlib
+import os
+import pickle
+import tempfile
+
+###############################################################################
+#                                                                             #
+#  ON-DISK CACHE OF PARSED CFG                                                #
+#                                                                             #
+###############################################################################
+
+# part of every key: bump it when the AST, CfgParser or EdgeAction change,
+# so that entries written by an older version are never loaded
+CACHE_VERSION = 4
+# directory of the cache, an empty value disables the cache
+CACHE_DIR_VARIABLE = 'IVF_CACHE_DIR'
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'ivf')
+# maximum size in bytes of the cache directory
+CACHE_SIZE_VARIABLE = 'IVF_CACHE_SIZE'
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+SUFFIX = '.pickle'
+
+
+def sourceKey(kind, text):
+    """ Content address of what is cached for a program (kind: 'cfg') """
+    content = '{}\0{}\0{}'.format(CACHE_VERSION, kind, text)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """
+    Pickled values in one file per key. Files are written in a temporary file then
+    renamed, so concurrent processes only ever read complete entries. When the
+    directory grows over max_size, the least recently used entries are removed.
+    Any error while reading or writing is a cache miss, never a failure
+    """
+    def __init__(self, directory, max_size=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        # pickled entries already read by this process
+        self.loaded = {}
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key):
+        """ :return: a fresh copy of the value of key, None if not in cache """
+        data = self.loaded.get(key)
+        if data is None:
+            try:
+                with open(self.path(key), 'rb') as f:
+                    data = f.read()
+                # the modification time orders the entries for eviction
+                os.utime(self.path(key))
+            except OSError:
+                return None
+        # the entry is a graph of many small objects (the ASTs of the edge actions),
+        # the cyclic garbage collector would run over and over while it is built
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            value = pickle.loads(data)
+        except Exception:
+            return None
+        finally:
+            if enabled:
+                gc.enable()
+        self.loaded[key] = data
+        return value
+
+    def put(self, key, value):
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        self.loaded[key] = data
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, self.path(key))
+            except OSError:
+                os.unlink(tmp)
+                raise
+            self.evict()
+        except OSError:
+            pass
+
+    def evict(self):
+        """ Remove the least recently used entries until the cache fits in max_size """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                # already removed by another process
+                pass
+            size -= entry_size
+
+
+class NoCache:
+    """ Cache that never holds anything """
+    def get(self, key):
+        return None
+
+    def put(self, key, value):
+        pass
+
+
+_DEFAULT = []
+
+
+def defaultCache():
+    """ Cache configured by IVF_CACHE_DIR and IVF_CACHE_SIZE, shared by the process """
+    if not _DEFAULT:
+        directory = os.environ.get(CACHE_DIR_VARIABLE, DEFAULT_CACHE_DIR)
+        if directory:
+            _DEFAULT.append(DiskCache(directory, int(os.environ.get(CACHE_SIZE_VARIABLE, DEFAULT_CACHE_SIZE))))
+        else:
+            _DEFAULT.append(NoCache())
+    return _DEFAULT[0]
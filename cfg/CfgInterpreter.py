@@ -1,9 +1,11 @@
-import networkx as nx
 from collections import defaultdict, deque
 from interpreter.Lexer import Lexer
 from interpreter.Parser import Parser
 from interpreter.Interpreter import Interpreter
 from cfg.NodeExtractor import NodeExtractor
+from cfg.Cfg import ASSIGN_NODE, IF_NODE, WHILE_NODE
+from cfg.LoopAnalysis import LoopForest
+from interpreter.LoopAcceleration import AffineLoop
 
 class CfgInterpreter:
 
@@ -11,15 +13,25 @@ class CfgInterpreter:
     Interpret a CFG with more general interpreter interpreter.Interpreter
     Visit all nodes
     Show new attributes of data
+    The CFG of cfgparser is built once and shared, only the interpreter state
+    (variable scope and visited trace) is renewed for each datatest with reset()
     """
     def __init__(self, cfgparser):
         self.cfgparser = cfgparser
         self.cfg = cfgparser.cfg
-        self.node_labels = nx.get_node_attributes(self.cfg, 'label')
-        self.edge_labels = nx.get_edge_attributes(self.cfg, 'label')
         lexer = Lexer(" ")
-        parser = Parser(lexer)
-        self.interpreter = Interpreter(parser)
+        self.parser = Parser(lexer)
+        # back-edges of the CFG and WHILE with an affine body by node, found the first time
+        self.back_edges = None
+        self.affine_loops = {}
+        self.reset()
+
+    def reset(self):
+        """
+        Give a fresh interpreter state (empty scope and visited trace)
+        to run a new datatest against the same CFG
+        """
+        self.interpreter = Interpreter(self.parser)
         self.visited = []
 
     def parseCondition(self, code):
@@ -58,6 +70,14 @@ class CfgInterpreter:
             condition_node = self.parseCondition(code)
             return self.interpreter.visit(condition_node)
 
+    def seed(self, values):
+        """
+        Initialize variables without interpreting any code
+        :param values: dict variable -> integer value (ex: Datatest.values)
+        :return: None
+        """
+        self.interpreter.GLOBAL_SCOPE.update(values)
+
     def interpretAssigments(self, code):
         """
         Interpret an assigment based on code
@@ -73,122 +93,160 @@ class CfgInterpreter:
         """
         Interpret the full CFG
         """
-        to_visit = deque()  # next_nodes is a stack of tuples (node, distance of node from START)
-        to_visit.append((self.getSourceNode(), 0))
+        cfg = self.cfg
+        offsets, targets, labels, kinds = cfg.offsets, cfg.targets, cfg.labels, cfg.kinds
+        to_visit = deque()  # next_nodes is a stack of tuples (node id, distance of node from START)
+        to_visit.append((cfg.source, 0))
 
         # Holding current valid path
         local_path = list()
 
         while to_visit:
             node, node_k = to_visit.pop()
-            local_path = local_path[:node_k] + [node]
-            if local_path[-1] == self.getTargetNode():
+            local_path = local_path[:node_k] + [labels[node]]
+            if node == cfg.target:
                 # we touched the last node
                 yield local_path
             elif node_k + 1 <= k:
-                succ = list(self.cfg.successors(node))
-                if node in self.cfgparser.labelsIf :
+                succ = targets[offsets[node]:offsets[node + 1]]
+                if kinds[node] == IF_NODE:
                     succ.reverse()
                 for s in succ:
                     to_visit.append((s, node_k + 1))
 
     def getSourceNode(self):
-        for n, nbrsdict in self.cfg.adjacency():
-            predecessors = [p for p in self.cfg.predecessors(n)]
-            if not predecessors :
-                # source node is node without predecessors
-                return n
+        # source node is node without predecessors, found when the CFG is built
+        return self.cfg.labels[self.cfg.source]
 
     def getTargetNode(self):
-         for n, nbrsdict in self.cfg.adjacency():
-            successors = [s for s in self.cfg.successors(n)]
-            if not successors :
-                # target node is node without successors
-                return n
+        # target node is node without successors, found when the CFG is built
+        return self.cfg.labels[self.cfg.target]
+
+    def backEdges(self):
+        if self.back_edges is None:
+            # shared by all datatests, like the CFG
+            self.back_edges = LoopForest(self.cfg).back_edges
+        return self.back_edges
+
+    def affineLoop(self, u):
+        """
+        :return: (AffineLoop, labels visited by an iteration) of the WHILE of node u,
+            None if its body is not a sequence of assigments
+        """
+        cfg = self.cfg
+        enter = [e for e in range(cfg.offsets[u], cfg.offsets[u + 1]) if not cfg.actions[e].negate][0]
+        assigns = []
+        labels = []
+        v = cfg.targets[enter]
+        while v != u:
+            if cfg.kinds[v] != ASSIGN_NODE or cfg.offsets[v + 1] - cfg.offsets[v] != 1:
+                return None
+            labels.append(cfg.labels[v])
+            assigns += cfg.actions[cfg.offsets[v]].assigns
+            v = cfg.targets[cfg.offsets[v]]
+        labels.append(cfg.labels[u])
+        return AffineLoop(cfg.actions[enter].condition, assigns), labels
+
+    def accelerate(self, u, max_steps=None):
+        """
+        Run at once the iterations of the WHILE of node u just entered, when its body is
+        a sequence of affine assigments (see interpreter.LoopAcceleration)
+        :param max_steps: the loop is not accelerated if more nodes would be visited
+        :return: number of iterations run
+        """
+        if u not in self.affine_loops:
+            self.affine_loops[u] = self.affineLoop(u)
+        if self.affine_loops[u] is None:
+            return 0
+        loop, labels = self.affine_loops[u]
+        max_iterations = None if max_steps is None else (max_steps - len(self.visited)) // len(labels)
+        iterations = loop.accelerate(self.interpreter, max_iterations)
+        if not iterations:
+            return 0
+        self.visited.extend(labels * iterations)
+        return iterations
 
     def interpretCfgForIWhile(self):
         """
+        Interpret the full CFG counting the iterations of the WHILE: a loop is entered
+        by an edge that is not a back-edge of the CFG, then each back-edge taken to its
+        head is an iteration
         :return dict with keys while_label and value: [iter, max]
         """
+        cfg = self.cfg
+        offsets, targets, labels, actions, kinds = cfg.offsets, cfg.targets, cfg.labels, cfg.actions, cfg.kinds
+        back_edges = self.backEdges()
         while_dict = {}
-        target_node = self.getTargetNode()
-        current_node = self.getSourceNode()
-        self.visited.append(current_node)
-        while current_node != target_node:
-            #print(current_node)
+        current = cfg.source
+        self.visited.append(labels[current])
+        if kinds[current] == WHILE_NODE:
+            while_dict[labels[current]] = [0, 0]
+        while current != cfg.target:
+            first, last = offsets[current], offsets[current + 1]
+            kind = kinds[current]
+            edge = None
             # see if there is actually a decision to take when node is (if|while)
-            if current_node in self.cfgparser.labelsIf or \
-                    current_node in self.cfgparser.labelsWhile:
-                decision_node = current_node
-                succ = [s for s in self.cfg.successors(current_node)]
-                # Modified part
-                if current_node in self.cfgparser.labelsWhile:
-                    if current_node not in while_dict.keys():
-                        while_dict[current_node] = [0, 0]
-                    else:
-                        while_dict[current_node][0] += 1
-                        if while_dict[current_node][0] > while_dict[current_node][1]:
-                            while_dict[current_node][1] = while_dict[current_node][0]
-                    # get the node executed when cond is not true for while anymore
-                node_to_exit = max(succ)
-                for s in succ:
-                    label = self.cfg.edges[decision_node, s]['label']
-                    if self.interpretCondition(label):
-                        # rebooting compteur for node
-                        if s == node_to_exit and current_node in self.cfgparser.labelsWhile:
-                            while_dict[current_node][0] = 0
-                        current_node = s
+            if kind == IF_NODE or kind == WHILE_NODE:
+                for e in range(first, last):
+                    if actions[e](self.interpreter):
+                        edge = e
             # else the edge represents an assigment
             # however if the assigment has a while as successor, it means there is
             # a condition to evaluate
-            elif current_node in self.cfgparser.labelsAssigns:
-                succ = [s for s in self.cfg.successors(current_node)]
-                if len(succ) == 1:
-                    label = self.cfg.edges[current_node, succ[0]]['label']
-                    self.interpretAssigments(label)
-                    current_node = succ[0]
+            elif kind == ASSIGN_NODE:
+                if last - first == 1:
+                    actions[first](self.interpreter)
+                    edge = first
             # else finally the node must BE the empty label with no successfors
             else:
-                succ = [s for s in self.cfg.successors(current_node)]
-                if len(succ) == 0:
-                    current_node = target_node
+                current = cfg.target
+            if edge is not None:
+                current = targets[edge]
+            self.visited.append(labels[current])
+            if edge is not None and kinds[current] == WHILE_NODE:
+                counter = while_dict.setdefault(labels[current], [0, 0])
+                if back_edges[edge]:
+                    counter[0] += 1
                 else:
-                    raise Exception('Target node could not be reached')
-            self.visited.append(current_node)
+                    # (re)entering the loop, an affine one runs all its iterations at once
+                    counter[0] = self.accelerate(current)
+                counter[1] = max(counter[1], counter[0])
         return while_dict
 
-    def interpretCfg(self):
+    def interpretCfg(self, max_steps=None):
         """
         Interpret the full CFG
+        :param max_steps: maximum number of nodes visited, a RuntimeError is raised beyond
         """
-        target_node = self.getTargetNode()
-        current_node = self.getSourceNode()
-        self.visited.append(current_node)
-        while current_node != target_node:
+        cfg = self.cfg
+        offsets, targets, labels, actions, kinds = cfg.offsets, cfg.targets, cfg.labels, cfg.actions, cfg.kinds
+        back_edges = self.backEdges()
+        current = cfg.source
+        self.visited.append(labels[current])
+        while current != cfg.target:
+            first, last = offsets[current], offsets[current + 1]
+            kind = kinds[current]
+            edge = None
             # see if there is actually a decision to take when node is (if|while)
-            if current_node in self.cfgparser.labelsIf or \
-               current_node in self.cfgparser.labelsWhile :
-                decision_node = current_node
-                succ = [s for s in self.cfg.successors(current_node)]
-                for s in succ:
-                    label = self.cfg.edges[decision_node, s]['label']
-                    if self.interpretCondition(label):
-                        current_node = s
+            if kind == IF_NODE or kind == WHILE_NODE:
+                for e in range(first, last):
+                    if actions[e](self.interpreter):
+                        edge = e
             # else the edge represents an assigment
             # however if the assigment has a while as successor, it means there is
             # a condition to evaluate
-            elif current_node in self.cfgparser.labelsAssigns:
-                succ = [s for s in self.cfg.successors(current_node)]
-                if len(succ) == 1:
-                    label = self.cfg.edges[current_node, succ[0]]['label']
-                    self.interpretAssigments(label)
-                    current_node = succ[0]
+            elif kind == ASSIGN_NODE:
+                if last - first == 1:
+                    actions[first](self.interpreter)
+                    edge = first
             # else finally the node must BE the empty label with no successfors
             else:
-                succ = [s for s in self.cfg.successors(current_node)]
-                if len(succ) == 0 :
-                    current_node = target_node
-                else:
-                    raise Exception('Target node could not be reached')
-            self.visited.append(current_node)
-
+                current = cfg.target
+            if edge is not None:
+                current = targets[edge]
+            self.visited.append(labels[current])
+            if max_steps is not None and len(self.visited) > max_steps:
+                raise RuntimeError('More than {} nodes visited'.format(max_steps))
+            if edge is not None and kinds[current] == WHILE_NODE and not back_edges[edge]:
+                # entering a loop, an affine one runs all its iterations at once
+                self.accelerate(current, max_steps)
@@ -1,8 +1,10 @@
 import networkx as nx
-import copy
 from interpreter.Lexer import Lexer
 from interpreter.Parser import Parser
 from cfg.NodeExtractor import NodeExtractor
+from cfg.EdgeCompiler import EdgeCompiler
+from cfg.Cfg import Cfg
+from cfg.CfgCache import defaultCache, sourceKey
 
 class Node:
     def __init__(self, _num, type, value):
@@ -16,6 +18,13 @@ class Edge:
         self.node2 = node2
         self.value = value
 
+# attributes of CfgParser holding the AST of the program, only read while parse() builds
+# the CFG (which labels the AST in place): they are left out of the cache. For a 150 KB
+# source the pickled AST is 1.4 MB, 0.16s to load when no caller reads it.
+# The edge actions keep the AST of their own label (see EdgeAction)
+AST_ATTRIBUTES = ('parser', 'ast', 'ne')
+
+
 class CfgParser:
 
     def __init__(self, text_source):
@@ -24,14 +33,38 @@ class CfgParser:
         parser = Parser(lexer)
         self.parser = parser
         self.ast = self.parser.parse()
-        self.ne = NodeExtractor(copy.deepcopy(self.ast))
-        self.cfg = nx.DiGraph()
+        # the index is built before the visit sets the labels of the blocks to plain ints,
+        # its sub-trees are only read afterwards, so the AST does not need to be copied
+        self.ne = NodeExtractor(self.ast)
+        # edges (label1, label2) -> code label, the Cfg is built from them by parse()
+        self.edges = {}
+        self.cfg = None
         self.previous_label = ''
         self.labelsIf = []
         self.labelsWhile = []
         self.labelsAssigs = []
         self.labels = []
 
+    @classmethod
+    def cached(cls, text_source, cache=None):
+        """
+        Parsed CfgParser of text_source (labels and CFG with its compiled edge actions),
+        loaded from the cache when the same source was already parsed. It has no
+        AST_ATTRIBUTES, whether it comes from the cache or not: a caller needing
+        the AST builds a CfgParser(text_source)
+        """
+        cache = cache if cache is not None else defaultCache()
+        key = sourceKey('cfg', text_source)
+        state = cache.get(key)
+        if state is None:
+            cfgparser = cls(text_source)
+            cfgparser.parse()
+            state = {k: v for k, v in cfgparser.__dict__.items() if k not in AST_ATTRIBUTES}
+            cache.put(key, state)
+        cfgparser = cls.__new__(cls)
+        cfgparser.__dict__.update(state)
+        return cfgparser
+
     def visit(self, node):
         # to debug and follow which node is visited
         #print(type(node).__name__)
@@ -104,7 +137,10 @@ class CfgParser:
         self.addlabel(label)
         node.label = label
         node.source = label
+        return self.blockCode(node)
 
+    def blockCode(self, node):
+        """ Code label of the assigments of a block, the block is left untouched """
         code = ""
         for statement in node.statement_list:
             if type(statement).__name__ != 'NoOp':
@@ -112,12 +148,15 @@ class CfgParser:
         return code
 
     def addlabel(self, label):
-        self.cfg.add_node(label, label=label)
         #if self.previous_label != '':
-            #self.cfg.add_edge(self.previous_label, label)
+            #self.addEdge(self.previous_label, label, '')
         self.labels.append(label)
         self.previous_label = label
 
+    def addEdge(self, label1, label2, code):
+        # like networkx, adding an edge again only replaces its code label
+        self.edges[label1, label2] = code
+
     def connectIf(self,cl,tl, fl, node):
         """ cl : unique label of decision (condition)
             tl : (true) labels returned from true branch
@@ -130,14 +169,14 @@ class CfgParser:
             if isinstance(tl, int):
                 tl = [tl]
             if len(tl) == 1 :
-                self.cfg.add_edge(cl, tl[0], label=self.visit_BinOp(node.cond_block.condition))
+                self.addEdge(cl, tl[0], self.visit_BinOp(node.cond_block.condition))
             else:
                 # connect with fist label of true block
                 self.connectIf(cl, tl[0], fl, node)
             if isinstance(fl, int):
                 fl = [fl]
             if len(fl) == 1 :
-                self.cfg.add_edge(cl, fl[0], label="! "+self.visit_BinOp(node.cond_block.condition))
+                self.addEdge(cl, fl[0], "! "+self.visit_BinOp(node.cond_block.condition))
             else:
                 # connect with fist label of false block
                 self.connectIf(cl, tl,fl[0], node)
@@ -145,7 +184,7 @@ class CfgParser:
             if isinstance(tl, int):
                 tl = [tl]
             if len(tl) == 1 :
-                self.cfg.add_edge(cl, tl[0], label=self.visit_BinOp(node.cond_block.condition))
+                self.addEdge(cl, tl[0], self.visit_BinOp(node.cond_block.condition))
             else:
                 # connect with fist label of true block
                 self.connectIf(cl, tl[0], fl, node)
@@ -160,16 +199,16 @@ class CfgParser:
             tl = [tl]
         # connect decision label to first assigment label
         if len(tl) == 1 and direction != "LAST":
-            self.cfg.add_edge(cl, tl[0], label=self.visit_BinOp(node.cond_block.condition))
+            self.addEdge(cl, tl[0], self.visit_BinOp(node.cond_block.condition))
         elif direction != "LAST":
             # connect with fist label
             self.connectWhile(cl, tl[0], "FIRST", node)
         # connect last assigment label to decision label
         if len(tl) == 1 and direction != "FIRST":
             # to extract the assigment label, we just extract the block whose label matches
-            # and then we visit it ...
-            assign_label = self.visit(copy.deepcopy(self.ne.extractBlockFromLabel(tl[0])))
-            self.cfg.add_edge(tl[0], cl, label=assign_label)
+            # and then we render its code ...
+            assign_label = self.blockCode(self.ne.extractBlockFromLabel(tl[0]))
+            self.addEdge(tl[0], cl, assign_label)
         elif direction != "FIRST":
             # connect with fist label
             self.connectWhile(cl, tl[-1], "LAST", node)
@@ -188,12 +227,12 @@ class CfgParser:
             if len(labels) == 1:
                 # if the node is a condition, we must add "!" in front since if it was a direct condition
                 # from a while or if, the edge would have been handled in connectWhile or connect If
-                subtree = copy.deepcopy(self.ne.extractBlockFromLabel(labels[0]))
+                subtree = self.ne.extractBlockFromLabel(labels[0])
                 if type(subtree).__name__ == 'BinOp':
                     assign_label = '! '+self.visit(subtree)
                 else:
-                    assign_label = self.visit(subtree)
-                self.cfg.add_edge(labels[0], next_label, label=assign_label)
+                    assign_label = self.blockCode(subtree)
+                self.addEdge(labels[0], next_label, assign_label)
             else:
                 self.connectCompounds(labels[-1], next_label)
 
@@ -231,19 +270,45 @@ class CfgParser:
 
     def parse(self):
         self.visit(self.ast)
-        self.labelsAssigns = [l for l in self.labels if l not in self.labelsIf and l not in self.labelsWhile]
-        self.show()
-
-    def show(self):
-        pos = nx.drawing.nx_pydot.pydot_layout(self.cfg)
-        nx.draw(self.cfg, pos, with_labels=True, font_weight='bold')
-        node_labels = nx.get_node_attributes(self.cfg, 'label')
-        nx.draw_networkx_labels(self.cfg, pos, labels=node_labels)
-        edge_labels = nx.get_edge_attributes(self.cfg, 'label')
-        nx.draw_networkx_edge_labels(self.cfg, pos, labels=edge_labels)
+        decisions = set(self.labelsIf) | set(self.labelsWhile)
+        self.labelsAssigns = [l for l in self.labels if l not in decisions]
+        # the CFG is built once and shared by all the datatests, it must not change anymore
+        self.cfg = Cfg(self.labels, self.edges, self.labelsIf, self.labelsWhile)
+        self.compileEdges()
+
+    def compileEdges(self):
+        """
+        Compile once the code label of every edge into an EdgeAction,
+        stored in the action slot of the edge
+        """
+        compiler = EdgeCompiler()
+        cfg = self.cfg
+        for e, label in enumerate(cfg.edge_labels):
+            cfg.actions[e] = compiler.compileLabel(label, cfg.isDecision(cfg.sources[e]))
+
+    def labelGraph(self):
+        """ networkx copy of the CFG holding only the code labels, for drawing and export """
+        return self.cfg.toNetworkx()
+
+    def show(self, dot_file="cfg.dot"):
+        """ Draw the CFG with matplotlib (layout computed by Graphviz) and export it to dot_file """
+        graph = self.labelGraph()
+        pos = nx.drawing.nx_pydot.pydot_layout(graph)
+        nx.draw(graph, pos, with_labels=True, font_weight='bold')
+        node_labels = nx.get_node_attributes(graph, 'label')
+        nx.draw_networkx_labels(graph, pos, labels=node_labels)
+        edge_labels = nx.get_edge_attributes(graph, 'label')
+        nx.draw_networkx_edge_labels(graph, pos, labels=edge_labels)
         #plt.show()
+        self.writeDot(dot_file, graph)
 
-        nx.drawing.nx_pydot.write_dot(self.cfg, "cfg.dot")
+    def writeDot(self, dot_file="cfg.dot", graph=None):
+        """
+        Export the CFG in the dot format, without any layout nor drawing
+        parse() never renders the CFG, the export must be asked explicitly
+        """
+        if graph is None:
+            graph = self.labelGraph()
+        nx.drawing.nx_pydot.write_dot(graph, dot_file)
         #print('To visualize : ')
         #print('dot -Tpng -o cfg.png cfg.dot')
-
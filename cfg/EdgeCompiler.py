@@ -0,0 +1,128 @@
+from interpreter.NodeVisitor import NodeVisitor, PLUS, MINUS, MUL, DIV, SUPERIOR, INFERIOR, EQUAL
+from interpreter.Lexer import Lexer
+from interpreter.Parser import Parser
+
+
+class EdgeAction:
+    """
+    Pre-compiled action of a CFG edge
+    Either a condition (with a real negation flag) or a list of assigments,
+    evaluated by calling the action with the interpreter holding the state
+    """
+    def __init__(self, label, condition=None, negate=False, assigns=None):
+        self.label = label
+        self.condition = condition
+        self.negate = negate
+        self.assigns = assigns if assigns is not None else []
+        self.isCondition = condition is not None
+        self.run = EdgeCompiler().compileAction(self)
+
+    def __call__(self, interpreter):
+        return self.run(interpreter)
+
+    def __getstate__(self):
+        # closures can't be pickled, the action is pickled with the AST of its label
+        state = dict(self.__dict__)
+        del state['run']
+        return state
+
+    def __setstate__(self, state):
+        # an unpickled action is compiled again from its AST, its label is not parsed again
+        self.__dict__.update(state)
+        self.run = EdgeCompiler().compileAction(self)
+
+    def __repr__(self):
+        return 'EdgeAction({})'.format(repr(self.label))
+
+
+class EdgeCompiler(NodeVisitor):
+    """
+    Compile AST nodes into python closures taking an interpreter.Interpreter
+    as argument, so that evaluating an edge never touches the lexer or the parser.
+    Closures have the same semantics as the Interpreter visitor (scope, toUse)
+    """
+
+    def compileLabel(self, label, is_decision):
+        """
+        Build the EdgeAction of an edge label generated by the CfgParser
+        :param label: code source (ex: '! X < 48' or ' X = 42 ; Y = X + 3 ; ')
+        :param is_decision: True if the edge leaves an IF or WHILE node
+        :return: EdgeAction
+        """
+        if is_decision:
+            negate = label.lstrip().startswith('!')
+            code = label.replace('!', '', 1) if negate else label
+            parser = Parser(Lexer(code))
+            return EdgeAction(label, condition=parser.condition(), negate=negate)
+        if label.strip() == '':
+            return EdgeAction(label)
+        parser = Parser(Lexer(label))
+        assigns = [s for s in parser.statement_list() if type(s).__name__ != 'NoOp']
+        return EdgeAction(label, assigns=assigns)
+
+    def compileAction(self, action):
+        if action.isCondition:
+            condition = self.visit(action.condition)
+            if action.negate:
+                return lambda interpreter: not condition(interpreter)
+            return condition
+        assigns = [self.visit(assign) for assign in action.assigns]
+
+        def run(interpreter):
+            for assign in assigns:
+                assign(interpreter)
+        return run
+
+    def visit_BinOp(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        op = node.op.type
+        if op == PLUS:
+            return lambda interpreter: left(interpreter) + right(interpreter)
+        elif op == MINUS:
+            return lambda interpreter: left(interpreter) - right(interpreter)
+        elif op == MUL:
+            return lambda interpreter: left(interpreter) * right(interpreter)
+        elif op == DIV:
+            return lambda interpreter: left(interpreter) // right(interpreter)
+        elif op == SUPERIOR:
+            return lambda interpreter: left(interpreter) > right(interpreter)
+        elif op == INFERIOR:
+            return lambda interpreter: left(interpreter) < right(interpreter)
+        elif op == EQUAL:
+            return lambda interpreter: left(interpreter) == right(interpreter)
+        raise Exception('Unknown operator {}'.format(op))
+
+    def visit_Num(self, node):
+        value = node.value
+        return lambda interpreter: value
+
+    def visit_UnaryOp(self, node):
+        expr = self.visit(node.expr)
+        if node.op.type == MINUS:
+            return lambda interpreter: -expr(interpreter)
+        return lambda interpreter: +expr(interpreter)
+
+    def visit_Var(self, node):
+        var_name = node.value
+
+        def var(interpreter):
+            var_value = interpreter.GLOBAL_SCOPE.get(var_name)
+            if var_name in interpreter.toUse:
+                interpreter.toUse.remove(var_name)
+            if var_value is None:
+                raise RuntimeError('{} is not defined, it can\'t be used - check that {} is defined in program or in datatest'.format(var_name, var_name))
+            return var_value
+        return var
+
+    def visit_Assign(self, node):
+        var_name = node.left.value
+        right = self.visit(node.right)
+
+        def assign(interpreter):
+            if var_name not in interpreter.toUse:
+                interpreter.toUse.append(var_name)
+            elif interpreter.raiseExceptionIfNotUsed:
+                raise RuntimeError('Var "{}" not used after declaration'.format(var_name))
+            interpreter.GLOBAL_SCOPE[var_name] = right(interpreter)
+        return assign
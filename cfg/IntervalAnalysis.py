@@ -0,0 +1,427 @@
+from collections import deque
+from interpreter.NodeVisitor import NodeVisitor, PLUS, MINUS, MUL, DIV, SUPERIOR, INFERIOR, EQUAL
+from cfg.Cfg import IF_NODE, WHILE_NODE
+
+###############################################################################
+#                                                                             #
+#  INTERVAL ABSTRACT INTERPRETATION                                           #
+#                                                                             #
+###############################################################################
+
+# An interval is a tuple (lo, hi) of integers or infinite floats, an abstract
+# state a dict variable -> interval where a missing variable can take any value
+# (an input of the program), None is the empty state of an unreachable point
+INF = float('inf')
+TOP = (-INF, INF)
+
+RELATION_OF = {SUPERIOR: '>', INFERIOR: '<', EQUAL: '=='}
+NEGATION = {'<': '>=', '<=': '>', '>': '<=', '>=': '<', '==': '!=', '!=': '=='}
+MIRROR = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '==': '==', '!=': '!='}
+
+# updates of a WHILE head before its intervals are widened to infinity
+WIDENING_DELAY = 3
+# descending iterations recovering the bounds lost by widening
+NARROWING_STEPS = 2
+# maximum number of (node, state) explored to count the feasible k-paths
+DEFAULT_MAX_STATES = 200000
+# bounds beyond it are taken as infinite, python ints that large can't be mixed with INF
+MAX_BOUND = 2 ** 1000
+
+
+def meet(a, b):
+    """ Intersection of two intervals, None if empty """
+    lo, hi = max(a[0], b[0]), min(a[1], b[1])
+    return (lo, hi) if lo <= hi else None
+
+
+def clamp(a):
+    """ Interval containing a with its bounds in [-MAX_BOUND, MAX_BOUND] or infinite """
+    lo = -INF if a[0] < -MAX_BOUND else min(a[0], MAX_BOUND)
+    hi = INF if a[1] > MAX_BOUND else max(a[1], -MAX_BOUND)
+    return (lo, hi)
+
+
+def hull(a, b):
+    return (min(a[0], b[0]), max(a[1], b[1]))
+
+
+def times(x, y):
+    # 0 * infinity is 0 for the bounds of a product
+    return 0 if x == 0 or y == 0 else x * y
+
+
+def floorDivide(x, y):
+    """ Floor division of two bounds, y != 0 """
+    if x in (INF, -INF):
+        return x if y > 0 else -x
+    if y in (INF, -INF):
+        return 0 if (x >= 0) == (y > 0) else -1
+    return x // y
+
+
+def joinStates(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return {name: hull(a[name], b[name]) for name in a if name in b}
+
+
+def meetStates(a, b):
+    if a is None or b is None:
+        return None
+    state = dict(a)
+    for name, interval in b.items():
+        interval = meet(state.get(name, TOP), interval)
+        if interval is None:
+            return None
+        state[name] = interval
+    return state
+
+
+def widenStates(old, new):
+    """ Bounds growing from old to new go to infinity """
+    if old is None or new is None:
+        return new
+    state = {}
+    for name in old:
+        if name in new:
+            lo = old[name][0] if new[name][0] >= old[name][0] else -INF
+            hi = old[name][1] if new[name][1] <= old[name][1] else INF
+            if (lo, hi) != TOP:
+                state[name] = (lo, hi)
+    return state
+
+
+class Infeasible(Exception):
+    """ No concrete state goes through the abstract computation (ex: division by 0) """
+
+
+class IntervalEvaluator(NodeVisitor):
+    """ Evaluate edge actions on abstract states """
+    def __init__(self, state):
+        self.state = state
+
+    def visit_Num(self, node):
+        return clamp((node.value, node.value))
+
+    def visit_Var(self, node):
+        return self.state.get(node.value, TOP)
+
+    def visit_UnaryOp(self, node):
+        lo, hi = self.visit(node.expr)
+        return (-hi, -lo) if node.op.type == MINUS else (lo, hi)
+
+    def visit_BinOp(self, node):
+        return clamp(self.binOp(self.visit(node.left), node.op.type, self.visit(node.right)))
+
+    def binOp(self, a, op, b):
+        if op == PLUS:
+            return (a[0] + b[0], a[1] + b[1])
+        elif op == MINUS:
+            return (a[0] - b[1], a[1] - b[0])
+        elif op == MUL:
+            corners = [times(x, y) for x in a for y in b]
+            return (min(corners), max(corners))
+        elif op == DIV:
+            # the divisor without 0, split in its negative and positive parts
+            parts = [part for part in (meet(b, (-INF, -1)), meet(b, (1, INF))) if part is not None]
+            if not parts:
+                raise Infeasible()
+            result = None
+            for part in parts:
+                corners = [floorDivide(x, y) for x in a for y in part]
+                interval = (min(corners), max(corners))
+                result = interval if result is None else hull(result, interval)
+            return result
+        raise Exception('Unknown operator {}'.format(op))
+
+    def assign(self, action):
+        """ :return: state after the assigments of the action """
+        for assign in action.assigns:
+            self.state = dict(self.state)
+            interval = self.visit(assign.right)
+            if interval == TOP:
+                self.state.pop(assign.left.value, None)
+            else:
+                self.state[assign.left.value] = interval
+        return self.state
+
+    def refine(self, action):
+        """ :return: state where the condition of the decision edge holds, None if it can't """
+        condition = action.condition
+        relation = RELATION_OF[condition.op.type]
+        if action.negate:
+            relation = NEGATION[relation]
+        left = self.visit(condition.left)
+        right = self.visit(condition.right)
+        if not self.holds(left, relation, right):
+            return None
+        state = self.state
+        # variables compared to an expression are narrowed (both sides when both are variables)
+        for var, value, other in ((condition.left, left, right), (condition.right, right, left)):
+            if type(var).__name__ == 'Var':
+                narrowed = meet(value, self.bound(relation, other, value))
+                if narrowed is None:
+                    return None
+                state = dict(state)
+                state[var.value] = narrowed
+            # the same relation read from the right side
+            relation = MIRROR[relation]
+        return state
+
+    @staticmethod
+    def holds(a, relation, b):
+        """ True if a relation b may hold for some values of the intervals """
+        if relation == '<':
+            return a[0] < b[1]
+        if relation == '<=':
+            return a[0] <= b[1]
+        if relation == '>':
+            return a[1] > b[0]
+        if relation == '>=':
+            return a[1] >= b[0]
+        if relation == '==':
+            return meet(a, b) is not None
+        return not (a[0] == a[1] == b[0] == b[1])
+
+    @staticmethod
+    def bound(relation, other, value):
+        """ Interval of the values x such that x relation y for some y in other """
+        if relation == '<':
+            return (-INF, other[1] - 1)
+        if relation == '<=':
+            return (-INF, other[1])
+        if relation == '>':
+            return (other[0] + 1, INF)
+        if relation == '>=':
+            return (other[0], INF)
+        if relation == '==':
+            return other
+        if other[0] == other[1]:
+            # x != c removes c from the bounds of x
+            if value[0] == other[0]:
+                return (value[0] + 1, value[1])
+            if value[1] == other[0]:
+                return (value[0], value[1] - 1)
+        return TOP
+
+
+class IntervalAnalysis:
+    """
+    Interval abstract interpretation of a CFG. invariants[u] over-approximates the
+    values of the variables on entry of node u for every datatest: it is the
+    fixpoint of the edge actions, widened at the WHILE heads then narrowed.
+    Along one path there is no join: the state is propagated edge by edge and
+    a prefix whose state becomes empty is infeasible for every datatest, so
+    are all the paths extending it
+    """
+    def __init__(self, cfg, inputs=None):
+        """ :param inputs: dict variable -> interval of its initial values, any value if missing """
+        self.cfg = cfg
+        # state on entry of the program
+        self.entry = {name: interval for name, interval in (inputs or {}).items() if interval != TOP}
+        self.invariants = self.fixpoint()
+        self.shortest, self.longest = self.distances()
+        # (node, state, horizon) -> number of feasible paths to target with at most horizon edges
+        self.counts = {}
+
+    def distances(self):
+        """
+        shortest[u], longest[u] : numbers of edges of the shortest and the longest
+        paths from u to target (None if target can't be reached, INF if a loop can be)
+        """
+        cfg = self.cfg
+        n = len(cfg)
+        shortest = [None] * n
+        longest = [None] * n
+        if cfg.target is None:
+            return shortest, longest
+        predecessors = [[] for _ in range(n)]
+        for e in range(len(cfg.targets)):
+            predecessors[cfg.targets[e]].append(cfg.sources[e])
+        shortest[cfg.target] = 0
+        queue = deque([cfg.target])
+        while queue:
+            v = queue.popleft()
+            for u in predecessors[v]:
+                if shortest[u] is None:
+                    shortest[u] = shortest[v] + 1
+                    queue.append(u)
+        # depth first search: a successor still on the stack closes a loop
+        on_stack = [False] * n
+        for root in range(n):
+            if longest[root] is not None or shortest[root] is None:
+                continue
+            longest[root] = 0
+            on_stack[root] = True
+            stack = [(root, cfg.offsets[root])]
+            while stack:
+                u, e = stack[-1]
+                if e == cfg.offsets[u + 1]:
+                    stack.pop()
+                    on_stack[u] = False
+                    if stack:
+                        parent = stack[-1][0]
+                        longest[parent] = max(longest[parent], longest[u] + 1)
+                    continue
+                stack[-1] = (u, e + 1)
+                v = cfg.targets[e]
+                if shortest[v] is None:
+                    continue
+                if on_stack[v]:
+                    longest[u] = INF
+                elif longest[v] is None:
+                    longest[v] = 0
+                    on_stack[v] = True
+                    stack.append((v, cfg.offsets[v]))
+                else:
+                    longest[u] = max(longest[u], longest[v] + 1)
+        return shortest, longest
+
+    def transfer(self, state, e):
+        """ :return: state after edge e, None if no datatest can take it """
+        if state is None:
+            return None
+        action = self.cfg.actions[e]
+        evaluator = IntervalEvaluator(state)
+        try:
+            if self.cfg.isDecision(self.cfg.sources[e]):
+                return evaluator.refine(action)
+            return evaluator.assign(action)
+        except Infeasible:
+            return None
+
+    def fixpoint(self):
+        cfg = self.cfg
+        n = len(cfg)
+        predecessors = [[] for _ in range(n)]
+        for e in range(len(cfg.targets)):
+            predecessors[cfg.targets[e]].append(e)
+        states = [None] * n
+        if cfg.source is None:
+            return states
+        states[cfg.source] = self.entry
+        updates = [0] * n
+        worklist = deque([cfg.source])
+        queued = [False] * n
+        queued[cfg.source] = True
+        while worklist:
+            u = worklist.popleft()
+            queued[u] = False
+            for e in range(cfg.offsets[u], cfg.offsets[u + 1]):
+                v = cfg.targets[e]
+                new = joinStates(states[v], self.transfer(states[u], e))
+                if new == states[v]:
+                    continue
+                updates[v] += 1
+                if cfg.kinds[v] == WHILE_NODE and updates[v] > WIDENING_DELAY:
+                    new = widenStates(states[v], new)
+                states[v] = new
+                if not queued[v]:
+                    queued[v] = True
+                    worklist.append(v)
+        for _ in range(NARROWING_STEPS):
+            narrowed = [None] * n
+            narrowed[cfg.source] = self.entry
+            for v in range(n):
+                for e in predecessors[v]:
+                    narrowed[v] = joinStates(narrowed[v], self.transfer(states[cfg.sources[e]], e))
+            states = [meetStates(states[v], narrowed[v]) for v in range(n)]
+        return states
+
+    def deadEdges(self):
+        """ :return: edges (label1, label2) no datatest can take """
+        cfg = self.cfg
+        return [(cfg.labels[cfg.sources[e]], cfg.labels[cfg.targets[e]]) for e in range(len(cfg.targets))
+                if self.transfer(self.invariants[cfg.sources[e]], e) is None]
+
+    def step(self, state, e):
+        """ State of a path after edge e, narrowed by the invariant of its target """
+        return meetStates(self.transfer(state, e), self.invariants[self.cfg.targets[e]])
+
+    def horizon(self, u, j):
+        """ Number of edges left to a path in u that can matter, None if target is out of reach """
+        if self.shortest[u] is None or j < self.shortest[u]:
+            return None
+        return min(j, self.longest[u])
+
+    @staticmethod
+    def key(state):
+        return tuple(sorted(state.items()))
+
+    def successors(self, u, state):
+        """ :return: list of (edge, state) of the edges leaving u a path in state can take """
+        result = []
+        for e in range(self.cfg.offsets[u], self.cfg.offsets[u + 1]):
+            new = self.step(state, e)
+            if new is not None:
+                result.append((e, new))
+        return result
+
+    def countFeasible(self, k, max_states=DEFAULT_MAX_STATES):
+        """
+        Number of k-paths (at most k edges from source to target) not proven infeasible,
+        by a depth-first search memoized on (node, state, remaining edges that can matter)
+        :param max_states: a RuntimeError is raised beyond this number of memoized states
+        """
+        cfg = self.cfg
+        counts = self.counts
+        if cfg.source is None or self.invariants[cfg.source] is None:
+            return 0
+        # frames [node, state, j, memo key, successors left, count, parent frame]
+        root = [None, None, None, None, None, 0, None]
+        stack = [[cfg.source, self.entry, k, None, None, 0, root]]
+        while stack:
+            frame = stack[-1]
+            u, state, j = frame[0], frame[1], frame[2]
+            if frame[4] is None:
+                horizon = self.horizon(u, j)
+                if horizon is None:
+                    stack.pop()
+                    continue
+                frame[3] = (u, self.key(state), horizon)
+                if frame[3] not in counts and u == cfg.target:
+                    counts[frame[3]] = 1
+                if frame[3] in counts:
+                    stack.pop()
+                    frame[6][5] += counts[frame[3]]
+                    continue
+                if len(counts) >= max_states:
+                    raise RuntimeError('More than {} abstract states'.format(max_states))
+                frame[4] = iter(self.successors(u, state))
+            successor = next(frame[4], None)
+            if successor is None:
+                counts[frame[3]] = frame[5]
+                stack.pop()
+                frame[6][5] += frame[5]
+            else:
+                e, new = successor
+                stack.append([cfg.targets[e], new, j - 1, None, None, 0, frame])
+        return root[5]
+
+    def feasiblePaths(self, k):
+        """
+        Yield the k-paths not proven infeasible, in the order of CfgInterpreter.getPaths.
+        An infeasible prefix is cut as soon as its state is empty, and so is a prefix
+        already counted without feasible path by countFeasible
+        """
+        cfg = self.cfg
+        if cfg.source is None or self.invariants[cfg.source] is None:
+            return
+        to_visit = [(cfg.source, self.entry, 0)]
+        local_path = []
+        while to_visit:
+            node, state, node_k = to_visit.pop()
+            local_path = local_path[:node_k] + [cfg.labels[node]]
+            if node == cfg.target:
+                yield local_path
+            elif node_k + 1 <= k:
+                successors = self.successors(node, state)
+                if cfg.kinds[node] == IF_NODE:
+                    successors.reverse()
+                for e, new in successors:
+                    v = cfg.targets[e]
+                    horizon = self.horizon(v, k - node_k - 1)
+                    if horizon is not None and self.counts.get((v, self.key(new), horizon)) != 0:
+                        to_visit.append((v, new, node_k + 1))
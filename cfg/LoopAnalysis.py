@@ -0,0 +1,286 @@
+from interpreter.NodeVisitor import PLUS, MINUS, VarCollector
+from cfg.Cfg import WHILE_NODE
+from cfg.IntervalAnalysis import IntervalAnalysis, IntervalEvaluator, Infeasible, INF, TOP, RELATION_OF, MIRROR, \
+    hull, joinStates
+
+###############################################################################
+#                                                                             #
+#  LOOPS AND STATIC BOUNDS OF THEIR ITERATIONS                                #
+#                                                                             #
+###############################################################################
+
+
+class LoopForest:
+    """
+    Natural loops of a CFG. The dominators are computed by the iterative algorithm of
+    Cooper, Harvey and Kennedy over the reverse postorder: an edge u -> h is a back-edge
+    when h dominates u, the loop of h is h and the nodes reaching one of its back-edges
+    without going through h. Loops of a structured program are nested, parent[h] is the
+    head of the innermost loop containing the loop of h (None for an outermost loop)
+    """
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.order = self.reversePostorder()
+        # index[u] : position of u in the reverse postorder, None if u is unreachable
+        self.index = [None] * len(cfg)
+        for i, u in enumerate(self.order):
+            self.index[u] = i
+        self.idom = self.dominators()
+        # only an edge going back in the reverse postorder can be a back-edge
+        self.back_edges = [self.isRetreating(e) and self.dominates(cfg.targets[e], cfg.sources[e])
+                           for e in range(len(cfg.targets))]
+        # loops[h] : set of the nodes of the loop of head h
+        self.loops = {}
+        predecessors = [[] for _ in range(len(cfg))]
+        for e in range(len(cfg.targets)):
+            predecessors[cfg.targets[e]].append(cfg.sources[e])
+        for e, back in enumerate(self.back_edges):
+            if not back:
+                continue
+            h = cfg.targets[e]
+            body = self.loops.setdefault(h, {h})
+            stack = [cfg.sources[e]]
+            while stack:
+                u = stack.pop()
+                if u not in body:
+                    body.add(u)
+                    stack.extend(predecessors[u])
+        self.parent = {}
+        for h in self.loops:
+            outer = [h2 for h2, body in self.loops.items() if h2 != h and h in body]
+            self.parent[h] = min(outer, key=lambda h2: len(self.loops[h2])) if outer else None
+
+    def reversePostorder(self):
+        """ :return: nodes reachable from source in reverse postorder """
+        cfg = self.cfg
+        order = []
+        if cfg.source is None:
+            return order
+        visited = [False] * len(cfg)
+        visited[cfg.source] = True
+        stack = [(cfg.source, cfg.offsets[cfg.source])]
+        while stack:
+            u, e = stack[-1]
+            if e < cfg.offsets[u + 1]:
+                stack[-1] = (u, e + 1)
+                v = cfg.targets[e]
+                if not visited[v]:
+                    visited[v] = True
+                    stack.append((v, cfg.offsets[v]))
+            else:
+                stack.pop()
+                order.append(u)
+        order.reverse()
+        return order
+
+    def dominators(self):
+        """ :return: idom[u], immediate dominator of u (source for source, None if u is unreachable) """
+        cfg = self.cfg
+        idom = [None] * len(cfg)
+        if not self.order:
+            return idom
+        index = self.index
+        predecessors = [[] for _ in range(len(cfg))]
+        for e in range(len(cfg.targets)):
+            predecessors[cfg.targets[e]].append(cfg.sources[e])
+        idom[cfg.source] = cfg.source
+        changed = True
+        while changed:
+            changed = False
+            for u in self.order[1:]:
+                new = None
+                for p in predecessors[u]:
+                    if idom[p] is None:
+                        continue
+                    if new is None:
+                        new = p
+                        continue
+                    # nearest common dominator of p and new
+                    while p != new:
+                        while index[p] > index[new]:
+                            p = idom[p]
+                        while index[new] > index[p]:
+                            new = idom[new]
+                if new != idom[u]:
+                    idom[u] = new
+                    changed = True
+        return idom
+
+    def isRetreating(self, e):
+        u, v = self.cfg.sources[e], self.cfg.targets[e]
+        return self.index[u] is not None and self.index[v] <= self.index[u]
+
+    def dominates(self, a, b):
+        """ True if every path from source to b goes through a """
+        if self.idom[b] is None:
+            return False
+        while b != a:
+            if b == self.idom[b]:
+                return False
+            b = self.idom[b]
+        return True
+
+    def depth(self, h):
+        """ Number of loops containing the loop of h """
+        depth = 0
+        while self.parent[h] is not None:
+            h = self.parent[h]
+            depth += 1
+        return depth
+
+
+class LoopBoundAnalysis:
+    """
+    Static bounds of the iterations of the WHILE of a CFG, for the datatests whose
+    inputs are in given intervals. A WHILE "x < e" (or >, and mirrored) is bounded when
+    e only reads variables the loop doesn't assign and every iteration adds to x an
+    amount of constant sign: each assigment of x in the loop is x = x + a or x = x - a,
+    a not assigned by the loop, and the inner loops don't assign x. The amounts added
+    along the paths from the head back to it are bounded by a longest/shortest path
+    over the loop without its back-edges, the values of x and e entering the loop by an
+    IntervalAnalysis started from the intervals of the inputs.
+    The bound is the maximum of iterations each time the loop is entered, the one
+    counted by CfgInterpreter.interpretCfgForIWhile
+    """
+    def __init__(self, cfg, inputs=None):
+        """ :param inputs: dict variable -> (min, max) of its initial values, any value if missing """
+        self.cfg = cfg
+        self.forest = LoopForest(cfg)
+        self.intervals = IntervalAnalysis(cfg, inputs)
+        self.collector = VarCollector()
+        # bounds[while label] : bound of its iterations, None if none is proven
+        self.bounds = {}
+        for h in range(len(cfg)):
+            if cfg.kinds[h] == WHILE_NODE:
+                self.bounds[cfg.labels[h]] = self.bound(h)
+
+    def bound(self, h):
+        """ :return: bound of the iterations of the WHILE of node h, None if unknown """
+        cfg = self.cfg
+        invariant = self.intervals.invariants[h]
+        if invariant is None:
+            # never executed
+            return 0
+        enter = [e for e in range(cfg.offsets[h], cfg.offsets[h + 1]) if not cfg.actions[e].negate][0]
+        if self.intervals.transfer(invariant, enter) is None or h not in self.forest.loops:
+            return 0
+        body = self.forest.loops[h]
+        assigned = set()
+        for u in body:
+            for e in range(cfg.offsets[u], cfg.offsets[u + 1]):
+                if not cfg.isDecision(u):
+                    assigned.update(assign.left.value for assign in cfg.actions[e].assigns)
+        condition = cfg.actions[enter].condition
+        relation = RELATION_OF[condition.op.type]
+        var, limit = condition.left, condition.right
+        if not self.isVariable(var, assigned):
+            var, limit, relation = limit, var, MIRROR[relation]
+        if not self.isVariable(var, assigned) or not self.isInvariant(limit, assigned):
+            return None
+        try:
+            limit = IntervalEvaluator(invariant).visit(limit)
+        except Infeasible:
+            return None
+        step = self.step(h, var.value, assigned, invariant)
+        start = self.entry(h).get(var.value, TOP)
+        if step is None:
+            return None
+        return self.iterations(relation, start, limit, step)
+
+    @staticmethod
+    def isVariable(node, assigned):
+        return type(node).__name__ == 'Var' and node.value in assigned
+
+    def isInvariant(self, node, assigned):
+        """ True if the expression reads no variable assigned by the loop """
+        return not assigned.intersection(self.collector.collect(node))
+
+    def entry(self, h):
+        """ :return: state of the variables entering the loop of h """
+        cfg = self.cfg
+        state = self.intervals.entry if h == cfg.source else None
+        for e in range(len(cfg.targets)):
+            if cfg.targets[e] == h and not self.forest.back_edges[e]:
+                state = joinStates(state, self.intervals.transfer(self.intervals.invariants[cfg.sources[e]], e))
+        return state or {}
+
+    def increment(self, e, name, assigned, invariant):
+        """ :return: interval of the amount edge e adds to name, None if it is not an addition """
+        cfg = self.cfg
+        increment = (0, 0)
+        if cfg.isDecision(cfg.sources[e]):
+            return increment
+        evaluator = IntervalEvaluator(invariant)
+        for assign in cfg.actions[e].assigns:
+            if assign.left.value != name:
+                continue
+            right = assign.right
+            if type(right).__name__ != 'BinOp' or right.op.type not in (PLUS, MINUS):
+                return None
+            if self.isVariable(right.left, {name}) and self.isInvariant(right.right, assigned):
+                amount = right.right
+            elif right.op.type == PLUS and self.isVariable(right.right, {name}) and self.isInvariant(right.left, assigned):
+                amount = right.left
+            else:
+                return None
+            try:
+                lo, hi = evaluator.visit(amount)
+            except Infeasible:
+                return None
+            if right.op.type == MINUS:
+                lo, hi = -hi, -lo
+            increment = (increment[0] + lo, increment[1] + hi)
+        return increment
+
+    def step(self, h, name, assigned, invariant):
+        """ :return: interval of the amount an iteration of the loop of h adds to name, None if unknown """
+        cfg = self.cfg
+        forest = self.forest
+        body = forest.loops[h]
+        for inner, nodes in forest.loops.items():
+            if inner != h and inner in body:
+                for u in nodes:
+                    for e in range(cfg.offsets[u], cfg.offsets[u + 1]):
+                        if not cfg.isDecision(u) and name in (a.left.value for a in cfg.actions[e].assigns):
+                            return None
+        # the loop without its back-edges is acyclic, the reverse postorder is a topological order
+        amounts = {h: (0, 0)}
+        step = None
+        for u in forest.order:
+            if u not in body or u not in amounts:
+                continue
+            for e in range(cfg.offsets[u], cfg.offsets[u + 1]):
+                v = cfg.targets[e]
+                if v not in body or (forest.back_edges[e] and v != h):
+                    continue
+                increment = self.increment(e, name, assigned, invariant)
+                if increment is None:
+                    return None
+                amount = (amounts[u][0] + increment[0], amounts[u][1] + increment[1])
+                if forest.back_edges[e]:
+                    step = amount if step is None else hull(step, amount)
+                else:
+                    amounts[v] = amount if v not in amounts else hull(amounts[v], amount)
+        return step
+
+    @staticmethod
+    def iterations(relation, start, limit, step):
+        """
+        Bound of the iterations of "x relation limit" when x starts in start and each
+        iteration adds an amount in step
+        :return: number of iterations, None if not bounded
+        """
+        if relation in ('<', '<='):
+            # greatest value of x entering the body, x grows at least by step[0]
+            first, last, amount = start[0], limit[1] - (1 if relation == '<' else 0), step[0]
+        elif relation in ('>', '>='):
+            first, last, amount = -start[1], -limit[0] - (1 if relation == '>' else 0), -step[1]
+        else:
+            return None
+        if amount <= 0 or INF in (first, last) or -INF in (first, last):
+            return None
+        return max(0, int((last - first) // amount) + 1)
+
+    def proven(self, i):
+        """ :return: labels of the WHILE proven to iterate at most i times """
+        return [label for label, bound in self.bounds.items() if bound is not None and bound <= i]
@@ -1,13 +1,17 @@
 from interpreter.Interpreter import Interpreter, NodeVisitor
 from interpreter.Lexer import Lexer
 from interpreter.Parser import Parser
-import copy
 
 class NodeExtractor:
+    """
+    Index the AST by label in a single traversal
+    Blocks are indexed by their label, conditions by the label of their decision.
+    The indexed sub-trees are shared, they must be read and never modified
+    """
     def __init__(self, ast):
         self.ast = ast
-        self.search = None
-        self.found = None
+        self.index = {}
+        self.visit(self.ast)
 
     def visit(self, node):
         # to debug and follow which node is visited
@@ -36,20 +40,18 @@ class NodeExtractor:
         self.visit(node.block)
 
     def visit_CondBlock(self, node):
-        if node.label.value == self.search:
-            self.found = node.condition
+        self.index[node.label.value] = node.condition
 
     def visit_Block(self, node):
-        if isinstance(node.label,int):
-            print(node.label)
-        if node.label.value == self.search:
-            self.found = node
+        self.index[node.label.value] = node
 
     def visit_NoOp(self, node):
         pass
 
     def extractBlockFromLabel(self, label):
-        self.search = label
-        self.visit(self.ast)
-        return self.found
+        """
+        :param label: label of a block or of a decision
+        :return: Block of the label, condition (BinOp) of a decision label, None if unknown
+        """
+        return self.index.get(label)
 
@@ -0,0 +1,140 @@
+import random
+import numpy as np
+from cfg.IntervalAnalysis import IntervalAnalysis
+
+
+class PathAnalysis:
+    """
+    Analysis of the k-paths (paths from source to target node with at most k edges)
+    of a CFG without enumerating them : paths are counted by dynamic programming
+    over the successor arrays of the CFG, and visited paths are kept in a set of tuples
+    of labels
+    """
+    def __init__(self, cfginterpreter, k):
+        self.cfginterpreter = cfginterpreter
+        self.cfg = cfginterpreter.cfg
+        self.k = k
+        self.source = cfginterpreter.getSourceNode()
+        self.target = cfginterpreter.getTargetNode()
+        self.visited = set()
+        self._ways = None
+        self._intervals = None
+
+    def countPaths(self):
+        """
+        :return: number of k-paths, the same as len(list(getPaths(k)))
+        """
+        return self.ways()[self.k][self.cfg.ids[self.source]]
+
+    def ways(self):
+        """
+        ways[j][node id] is the number of paths from node to target with at most j edges
+        """
+        if self._ways is None:
+            cfg = self.cfg
+            n = len(cfg)
+            offsets = np.frombuffer(cfg.offsets, dtype=np.int64)
+            targets = np.frombuffer(cfg.targets, dtype=np.int64)
+            # the counts grow exponentially with k, they are python integers
+            ways = [np.zeros(n, dtype=object)]
+            target = cfg.ids[self.target]
+            ways[0][target] = 1
+            # sum the counts of the successors of every node (reduceat can't sum empty slices)
+            has_successors = offsets[1:] > offsets[:-1]
+            starts = offsets[:-1][has_successors]
+            for j in range(1, self.k + 1):
+                current = np.zeros(n, dtype=object)
+                if len(targets):
+                    current[has_successors] = np.add.reduceat(ways[-1][targets], starts)
+                current[target] = 1
+                ways.append(current)
+            self._ways = ways
+        return self._ways
+
+    def isKPath(self, path):
+        return len(path) - 1 <= self.k and path[0] == self.source and path[-1] == self.target
+
+    def addVisited(self, path):
+        """ Record a path executed by a datatest """
+        self.visited.add(tuple(path))
+
+    def coveredPaths(self):
+        return [path for path in self.visited if self.isKPath(path)]
+
+    def countUncovered(self):
+        return self.countPaths() - len(self.coveredPaths())
+
+    def coverageRate(self):
+        total = self.countPaths()
+        if total == 0:
+            return 100
+        return round(1 - self.countUncovered()/total, 2)*100
+
+    def intervals(self):
+        """ Interval analysis of the CFG, computed on first use """
+        if self._intervals is None:
+            self._intervals = IntervalAnalysis(self.cfg)
+        return self._intervals
+
+    def countFeasible(self):
+        """
+        :return: number of k-paths not proven infeasible by the interval analysis
+        (a RuntimeError is raised when the analysis explores too many states)
+        """
+        return self.intervals().countFeasible(self.k)
+
+    def feasibleCoverageRate(self):
+        """ Coverage rate of the feasible k-paths, a visited path is always feasible """
+        total = self.countFeasible()
+        if total == 0:
+            return 100
+        return round(100 * len(self.coveredPaths()) / total)
+
+    def uncoveredPaths(self, limit=None, feasible=False):
+        """
+        Yield the k-paths not visited in the order of CfgInterpreter.getPaths,
+        stopping after limit paths
+        :param feasible: skip the paths proven infeasible, cutting their prefixes early
+        """
+        n = 0
+        paths = self.intervals().feasiblePaths(self.k) if feasible else self.cfginterpreter.getPaths(self.k)
+        for path in paths:
+            if limit is not None and n >= limit:
+                return
+            if tuple(path) not in self.visited:
+                n += 1
+                yield path
+
+    def samplePath(self, rng=random):
+        """ Draw uniformly one k-path using the counts of paths to target """
+        ways = self.ways()
+        cfg = self.cfg
+        node = cfg.ids[self.source]
+        target = cfg.ids[self.target]
+        if ways[self.k][node] == 0:
+            return None
+        path = [self.source]
+        j = self.k
+        while node != target:
+            choice = rng.randrange(ways[j][node])
+            for e in range(cfg.offsets[node], cfg.offsets[node + 1]):
+                choice -= ways[j - 1][cfg.targets[e]]
+                if choice < 0:
+                    node = cfg.targets[e]
+                    break
+            path.append(cfg.labels[node])
+            j -= 1
+        return path
+
+    def sampleUncovered(self, n, rng=random, tries=100):
+        """ Draw at most n distinct uncovered k-paths at random """
+        found = set()
+        if self.countUncovered() == 0:
+            return []
+        attempts = 0
+        while len(found) < n and attempts < n * tries:
+            attempts += 1
+            path = tuple(self.samplePath(rng))
+            if path not in self.visited:
+                found.add(path)
+        return [list(path) for path in found]
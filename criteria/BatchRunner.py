@@ -0,0 +1,38 @@
+from interpreter.BatchInterpreter import BatchInterpreter
+from interpreter.DatatestColumns import loadColumns
+from criteria.Coverage import CoverageMap, CoverageAccumulator, ASSIGN, DECISION
+
+# labels of the program covered by each kind, with the name printed by main-ta and main-td
+LABEL_TYPES = {
+    ASSIGN: ('ASSIGN', ('ASSIGN',)),
+    DECISION: ('DECISIONS', ('IF', 'WHILE')),
+}
+
+
+def runBatch(parser, path, kind):
+    """
+    Evaluate the program over all the datatests at once (main-ta and main-td with the
+    batch backend), a failing datatest stops alone
+    :param kind: ASSIGN or DECISION
+    :return: CoverageAccumulator of the labels of this kind
+    """
+    name, types = LABEL_TYPES[kind]
+    datatests = loadColumns(path)
+    batch = BatchInterpreter(parser.parse(), datatests)
+    scopes, hits = batch.interpret()
+    coverage = CoverageAccumulator(CoverageMap({kind: [l.value for l in parser.labels if l.type in types]}))
+    coverage.addBatch(coverage.map.batchHits(kind, [l.value for l in batch.labels], hits))
+    for d, dt in enumerate(datatests):
+        print('====================================')
+        print('-------Datatest '+str(d + 1)+'--------')
+        print('====================================')
+        print('/------- Evaluating with initial assigments:  -------/ ')
+        print(dt.ini_assigns)
+        if d in batch.errors:
+            print('/------- Error: {} -------/ '.format(batch.errors[d]))
+        print('/------- Labels {} visited -------/ '.format(name))
+        print([l.value for l, count in zip(batch.labels, hits[:, d]) if count > 0 and l.type in types])
+        print('/------- Variables final evaluation -------/ ')
+        for k, v in sorted(scopes[d].items()):
+            print('%s = %s' % (k, v))
+    return coverage
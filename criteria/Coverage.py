@@ -0,0 +1,127 @@
+import numpy as np
+
+# kinds of items of a CoverageMap built from a CFG
+ASSIGN = 'ASSIGN'
+DECISION = 'DECISION'
+OUTCOME = 'OUTCOME'
+EDGE = 'EDGE'
+
+
+class CoverageMap:
+    """
+    Dense integer ids of the items to cover, grouped by kind
+    (labels ASSIGN, labels DECISION, decision outcomes, edges of the CFG).
+    The hits of a datatest are a numpy bool array indexed by these ids
+    """
+    def __init__(self, kinds):
+        """ :param kinds: dict kind -> list of items of this kind """
+        self.items = []
+        self.ids = {}
+        self.masks = {}
+        for kind, items in kinds.items():
+            first = len(self.items)
+            for item in items:
+                if (kind, item) not in self.ids:
+                    self.ids[kind, item] = len(self.items)
+                    self.items.append((kind, item))
+            self.masks[kind] = (first, len(self.items))
+        self.size = len(self.items)
+        for kind, (first, last) in self.masks.items():
+            mask = np.zeros(self.size, dtype=bool)
+            mask[first:last] = True
+            self.masks[kind] = mask
+
+    @classmethod
+    def fromCfg(cls, cfgparser):
+        decisions = set(cfgparser.labelsIf) | set(cfgparser.labelsWhile)
+        edges = cfgparser.cfg.edges()
+        return cls({
+            ASSIGN: [l for l in cfgparser.labels if l not in decisions],
+            DECISION: [l for l in cfgparser.labels if l in decisions],
+            OUTCOME: [edge for edge in edges if edge[0] in decisions],
+            EDGE: edges,
+        })
+
+    def hits(self, kind, items, hits=None):
+        """
+        Set the bits of the items of a kind, items unknown for this kind are ignored
+        :return: bool array of the hits (hits if given, else a new one)
+        """
+        if hits is None:
+            hits = np.zeros(self.size, dtype=bool)
+        ids = [self.ids[kind, item] for item in items if (kind, item) in self.ids]
+        hits[ids] = True
+        return hits
+
+    def batchHits(self, kind, items, counts):
+        """
+        Hits of the items of a kind for a batch of datatests, items unknown for this kind are ignored
+        :param counts: counts[l, d], visits of items[l] by datatest d (see BatchInterpreter)
+        :return: bool matrix, row d being the hits of datatest d
+        """
+        hits = np.zeros((counts.shape[1], self.size), dtype=bool)
+        rows = [l for l, item in enumerate(items) if (kind, item) in self.ids]
+        hits[:, [self.ids[kind, items[l]] for l in rows]] = (counts[rows] > 0).T
+        return hits
+
+    def pathHits(self, path):
+        """ Hits of the labels, decision outcomes and edges of a path of the CFG """
+        edges = list(zip(path, path[1:]))
+        hits = self.hits(ASSIGN, path)
+        self.hits(DECISION, path, hits)
+        self.hits(OUTCOME, edges, hits)
+        return self.hits(EDGE, edges, hits)
+
+
+class CoverageAccumulator:
+    """
+    OR-reduction of the hits of all datatests, recording the index of the
+    datatest that first covered each item (-1 while not covered)
+    """
+    def __init__(self, coverage_map):
+        self.map = coverage_map
+        self.covered = np.zeros(coverage_map.size, dtype=bool)
+        self.first = np.full(coverage_map.size, -1, dtype=np.int64)
+        self.count = 0
+
+    def add(self, hits):
+        """ Accumulate the hits of the next datatest """
+        self.first[hits & ~self.covered] = self.count
+        self.covered |= hits
+        self.count += 1
+
+    def addBatch(self, hits):
+        """ Accumulate the hits of the next datatests at once, hits[d] being the ones of datatest d """
+        if len(hits) == 0:
+            return
+        covered = hits.any(axis=0)
+        new = covered & ~self.covered
+        self.first[new] = np.argmax(hits, axis=0)[new] + self.count
+        self.covered |= covered
+        self.count += len(hits)
+
+    def merge(self, other):
+        """ Accumulate the datatests of other, run after the datatests of self """
+        new = other.covered & ~self.covered
+        self.first[new] = other.first[new] + self.count
+        self.covered |= other.covered
+        self.count += other.count
+        return self
+
+    def countCovered(self, kind):
+        return int(np.count_nonzero(self.covered & self.map.masks[kind]))
+
+    def uncovered(self, kind):
+        """ Items of a kind not covered, in the order of the map """
+        return [self.map.items[i][1] for i in np.flatnonzero(self.map.masks[kind] & ~self.covered)]
+
+    def coverageRate(self, kind):
+        total = int(np.count_nonzero(self.map.masks[kind]))
+        if total == 0:
+            return 100
+        return round(1 - (total - self.countCovered(kind))/total, 2)*100
+
+    def firstCovered(self, kind):
+        """ :return: dict item -> index of the datatest that first covered it """
+        ids = np.flatnonzero(self.map.masks[kind] & self.covered)
+        return {self.map.items[i][1]: int(self.first[i]) for i in ids}
@@ -0,0 +1,231 @@
+from cfg.CfgParser import CfgParser
+from cfg.CfgInterpreter import CfgInterpreter
+from cfg.PathAnalysis import PathAnalysis
+from cfg.Cfg import IF_NODE, WHILE_NODE
+from criteria.Coverage import CoverageMap, CoverageAccumulator, ASSIGN, DECISION
+from interpreter.NodeVisitor import VarCollector
+from criteria.DefUse import DefUseAnalysis
+from criteria.DuPaths import DuPathAnalysis
+
+# def-use events of a trace
+DEF = 'def'
+USE = 'use'
+
+
+def edgeEvents(action):
+    """
+    def-use events of an edge, in the order the interpreter does its toUse bookkeeping:
+    a condition uses its variables, an assigment defines its variable then uses the
+    variables of its right side
+    :return: list of (DEF|USE, variable)
+    """
+    collector = VarCollector()
+    if action.isCondition:
+        return [(USE, name) for name in collector.collect(action.condition)]
+    events = []
+    for assign in action.assigns:
+        events.append((DEF, assign.left.value))
+        events += [(USE, name) for name in collector.collect(assign.right)]
+    return events
+
+
+class Trace:
+    """
+    Everything recorded by the single run of a datatest
+    path : nodes visited from source to target
+    decisions : decision edges (decision label, successor) taken
+    while_max : maximum of consecutive iterations by WHILE label
+    events : def-use events (DEF|USE, variable) in execution order
+    error : message of the RuntimeError that stopped the run, None if it reached the target
+    """
+    def __init__(self):
+        self.path = []
+        self.decisions = []
+        self.while_max = {}
+        self.events = []
+        self.error = None
+
+    def unusedDefinitions(self):
+        """
+        Replay the def-use events like main-tdef: a variable defined again before
+        being used stops the replay
+        :return: (critere, variables declarations not used)
+        """
+        to_use = []
+        for kind, name in self.events:
+            if kind == DEF:
+                if name in to_use:
+                    return False, to_use
+                to_use.append(name)
+            elif name in to_use:
+                to_use.remove(name)
+        return self.error is None and to_use == [], to_use
+
+
+class Accumulated:
+    """
+    What CoverageEngine.add accumulated from the traces of consecutive datatests.
+    It is picklable: the datatests can be split between processes, the engine of
+    each process accumulating a chunk merged in order by CoverageEngine.merge
+    """
+    def __init__(self, engine):
+        self.count = engine.count
+        self.coverage = engine.coverage
+        self.paths = engine.pathanalysis.visited
+        self.while_max = engine.while_max
+        self.tdef = engine.tdef
+        self.unused = engine.unused
+        self.du_covered = engine.du_covered
+        self.dupaths_covered = engine.dupaths_covered
+
+
+class CoverageEngine:
+    """
+    Evaluate TA, TD, TC, TB, TDef and TU (and TDU on demand) together: each datatest is
+    run once on the CFG, every criterion is then computed from the traces accumulated by add()
+    """
+    def __init__(self, text_source, k, i, dupaths=False):
+        """ :param dupaths: enumerate the DU-paths for TDU, a RuntimeError is raised when there are too many """
+        self.cfgparser = CfgParser.cached(text_source)
+        self.cfginterpreter = CfgInterpreter(self.cfgparser)
+        self.cfg = self.cfgparser.cfg
+        self.i = i
+        self.source = self.cfginterpreter.getSourceNode()
+        self.target = self.cfginterpreter.getTargetNode()
+        self.whiles = set(self.cfgparser.labelsWhile)
+        # def-use events by edge id
+        self.events = [edgeEvents(action) for action in self.cfg.actions]
+        # labels, decision outcomes and edges of the program (the label 0 of the datatest is not counted)
+        self.map = CoverageMap.fromCfg(self.cfgparser)
+        self.pathanalysis = PathAnalysis(self.cfginterpreter, k)
+        # static def-use pairs (TU) and DU-paths (TDU)
+        self.defuse = DefUseAnalysis(self.cfg)
+        self.dupaths = DuPathAnalysis(self.defuse) if dupaths else None
+        self.reset()
+
+    def reset(self):
+        """ Forget the traces accumulated """
+        self.coverage = CoverageAccumulator(self.map)
+        self.pathanalysis.visited = set()
+        self.while_max = {}
+        self.tdef = True
+        self.unused = []
+        # def-use pairs and indexes of the DU-paths executed
+        self.du_covered = set()
+        self.dupaths_covered = set()
+        self.count = 0
+
+    def run(self, dt):
+        """
+        Run a parsed datatest once on the CFG
+        :return: Trace
+        """
+        trace = Trace()
+        self.cfginterpreter.reset()
+        interpreter = self.cfginterpreter.interpreter
+        self.cfginterpreter.seed(dt.values)
+        iterations = {}
+        cfg = self.cfg
+        offsets, targets, labels, actions, kinds = cfg.offsets, cfg.targets, cfg.labels, cfg.actions, cfg.kinds
+        current = cfg.source
+        target = cfg.target
+        trace.path.append(self.source)
+        try:
+            while current != target:
+                first, last = offsets[current], offsets[current + 1]
+                label = labels[current]
+                kind = kinds[current]
+                if kind == IF_NODE or kind == WHILE_NODE:
+                    edge = None
+                    for e in range(first, last):
+                        if actions[e](interpreter):
+                            edge = e
+                    if edge is None:
+                        raise Exception('No branch of decision {} can be taken'.format(label))
+                    trace.decisions.append((label, labels[targets[edge]]))
+                    if kind == WHILE_NODE:
+                        self.countIteration(trace, iterations, label, edge)
+                elif last - first == 1:
+                    edge = first
+                    actions[edge](interpreter)
+                elif last == first:
+                    edge = None
+                else:
+                    raise Exception('Target node could not be reached')
+                if edge is None:
+                    # no edge when the empty label without successors ends the program
+                    current = target
+                else:
+                    trace.events += self.events[edge]
+                    current = targets[edge]
+                trace.path.append(labels[current])
+        except RuntimeError as e:
+            trace.error = str(e)
+        return trace
+
+    def countIteration(self, trace, iterations, label, edge):
+        """ Iterations of a WHILE are counted like CfgInterpreter.interpretCfgForIWhile """
+        if label not in iterations:
+            iterations[label] = 0
+            trace.while_max.setdefault(label, 0)
+        else:
+            iterations[label] += 1
+            trace.while_max[label] = max(trace.while_max[label], iterations[label])
+        if self.cfg.actions[edge].negate:
+            # leaving the loop, it iterates from 0 again if it is entered again
+            del iterations[label]
+
+    def add(self, trace):
+        """ Accumulate the trace of a datatest in the results of every criterion """
+        self.count += 1
+        self.coverage.add(self.coverage.map.pathHits(trace.path))
+        if trace.error is None:
+            self.pathanalysis.addVisited(trace.path)
+        for label, iterations in trace.while_max.items():
+            if label not in self.while_max or self.while_max[label] < iterations:
+                self.while_max[label] = iterations
+        self.defuse.coveredPairs(trace.path, self.du_covered)
+        if self.dupaths is not None:
+            self.dupaths.coveredPaths(trace.path, self.dupaths_covered)
+        critere, unused = trace.unusedDefinitions()
+        self.tdef = self.tdef and critere
+        self.unused += unused
+
+    def accumulated(self):
+        """ :return: Accumulated, the traces added since the last reset() """
+        return Accumulated(self)
+
+    def merge(self, accumulated):
+        """ Accumulate the datatests of another engine on the same program, run after the datatests of self """
+        self.count += accumulated.count
+        self.coverage.merge(accumulated.coverage)
+        self.pathanalysis.visited |= accumulated.paths
+        for label, iterations in accumulated.while_max.items():
+            if label not in self.while_max or self.while_max[label] < iterations:
+                self.while_max[label] = iterations
+        self.tdef = self.tdef and accumulated.tdef
+        self.unused += accumulated.unused
+        self.du_covered |= accumulated.du_covered
+        self.dupaths_covered |= accumulated.dupaths_covered
+        return self
+
+    def results(self):
+        """
+        Verdict and coverage rate of every criterion
+        :return: dict criterion -> (verdict, coverage rate or None)
+        """
+        tb_rate = None
+        if self.whiles:
+            bounded = [l for l in self.whiles if self.while_max.get(l, 0) <= self.i]
+            tb_rate = round(len(bounded)/len(self.whiles), 2)*100
+        results = {
+            'ta': (self.coverage.uncovered(ASSIGN) == [], self.coverage.coverageRate(ASSIGN)),
+            'td': (self.coverage.uncovered(DECISION) == [], self.coverage.coverageRate(DECISION)),
+            'tc': (self.pathanalysis.countUncovered() == 0, self.pathanalysis.coverageRate()),
+            'tb': (all(m <= self.i for m in self.while_max.values()), tb_rate),
+            'tdef': (self.tdef, None),
+            'tu': (len(self.du_covered) == len(self.defuse.pairs), self.defuse.coverageRate(self.du_covered)),
+        }
+        if self.dupaths is not None:
+            results['tdu'] = (len(self.dupaths_covered) == len(self.dupaths.paths), self.dupaths.coverageRate(self.dupaths_covered))
+        return results
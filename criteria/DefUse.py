@@ -0,0 +1,156 @@
+import collections
+from interpreter.NodeVisitor import VarCollector
+
+###############################################################################
+#                                                                             #
+#  REACHING DEFINITIONS AND DEF-USE PAIRS                                     #
+#                                                                             #
+###############################################################################
+
+
+class DefUseAnalysis:
+    """
+    Static def-use pairs of a CFG. The definitions of a node are the last assigment of
+    each variable in its block, its uses the variables read before being assigned in
+    the block (or by its condition). Reaching definitions are computed by a worklist
+    over the nodes in reverse postorder, the set of definitions reaching a node being
+    a bit vector (python int, bit i for self.definitions[i]).
+    A pair (def label, use label, variable) means a definition-clear path of the CFG
+    goes from the definition to the use
+    """
+    def __init__(self, cfg):
+        self.cfg = cfg
+        n = len(cfg)
+        # uses[u] : variables read by node u before it assigns them, defs[u] : variables assigned by u
+        self.uses = [[] for _ in range(n)]
+        self.defs = [[] for _ in range(n)]
+        collector = VarCollector()
+        for u in range(n):
+            first, last = cfg.offsets[u], cfg.offsets[u + 1]
+            if first == last:
+                continue
+            action = cfg.actions[first]
+            if action.isCondition:
+                self.uses[u] = list(collections.OrderedDict.fromkeys(collector.collect(action.condition)))
+                continue
+            for assign in action.assigns:
+                for name in collector.collect(assign.right):
+                    if name not in self.defs[u] and name not in self.uses[u]:
+                        self.uses[u].append(name)
+                if assign.left.value not in self.defs[u]:
+                    self.defs[u].append(assign.left.value)
+        # definitions : list of (node, variable), masks[variable] : bits of its definitions
+        self.definitions = []
+        self.masks = collections.defaultdict(int)
+        self.gen = [0] * n
+        for u in range(n):
+            for name in self.defs[u]:
+                bit = 1 << len(self.definitions)
+                self.definitions.append((u, name))
+                self.masks[name] |= bit
+                self.gen[u] |= bit
+        self.kill = [0] * n
+        for u in range(n):
+            for name in self.defs[u]:
+                self.kill[u] |= self.masks[name]
+        self.reaching = self.reachingDefinitions()
+        self.pairs = self.defUsePairs()
+
+    def reversePostorder(self):
+        cfg = self.cfg
+        order = []
+        visited = [False] * len(cfg)
+        for root in [cfg.source] + list(range(len(cfg))):
+            if root is None or visited[root]:
+                continue
+            visited[root] = True
+            stack = [(root, cfg.offsets[root])]
+            while stack:
+                u, e = stack[-1]
+                if e < cfg.offsets[u + 1]:
+                    stack[-1] = (u, e + 1)
+                    v = cfg.targets[e]
+                    if not visited[v]:
+                        visited[v] = True
+                        stack.append((v, cfg.offsets[v]))
+                else:
+                    stack.pop()
+                    order.append(u)
+        order.reverse()
+        return order
+
+    def reachingDefinitions(self):
+        """ :return: reaching[u], bit vector of the definitions reaching the entry of node u """
+        cfg = self.cfg
+        n = len(cfg)
+        predecessors = [[] for _ in range(n)]
+        for e in range(len(cfg.targets)):
+            predecessors[cfg.targets[e]].append(cfg.sources[e])
+        reaching = [0] * n
+        out = list(self.gen)
+        order = self.reversePostorder()
+        queued = [True] * n
+        worklist = collections.deque(order)
+        while worklist:
+            u = worklist.popleft()
+            queued[u] = False
+            bits = 0
+            for p in predecessors[u]:
+                bits |= out[p]
+            reaching[u] = bits
+            new = self.gen[u] | (bits & ~self.kill[u])
+            if new != out[u]:
+                out[u] = new
+                for e in range(cfg.offsets[u], cfg.offsets[u + 1]):
+                    v = cfg.targets[e]
+                    if not queued[v]:
+                        queued[v] = True
+                        worklist.append(v)
+        return reaching
+
+    def defUsePairs(self):
+        """ :return: set of the pairs (def label, use label, variable) """
+        labels = self.cfg.labels
+        pairs = set()
+        for u, names in enumerate(self.uses):
+            for name in names:
+                bits = self.reaching[u] & self.masks.get(name, 0)
+                while bits:
+                    low = bits & -bits
+                    d, _ = self.definitions[low.bit_length() - 1]
+                    pairs.add((labels[d], labels[u], name))
+                    bits ^= low
+        return pairs
+
+    def unusedDefinitions(self):
+        """ :return: list of the definitions (label, variable) reaching no use """
+        used = set((d, name) for d, _, name in self.pairs)
+        labels = self.cfg.labels
+        return [(labels[u], name) for u, name in self.definitions if (labels[u], name) not in used]
+
+    def coverageRate(self, covered):
+        if not self.pairs:
+            return 100
+        return round(len(covered)/len(self.pairs), 2)*100
+
+    def coveredPairs(self, path, covered=None):
+        """
+        Pairs executed by a path of labels: the last definition of each variable is
+        followed along the path, every use then is one set lookup
+        :return: set of pairs (covered if given)
+        """
+        if covered is None:
+            covered = set()
+        ids, uses, defs, pairs = self.cfg.ids, self.uses, self.defs, self.pairs
+        last = {}
+        for label in path:
+            u = ids[label]
+            for name in uses[u]:
+                d = last.get(name)
+                if d is not None:
+                    pair = (d, label, name)
+                    if pair in pairs:
+                        covered.add(pair)
+            for name in defs[u]:
+                last[name] = label
+        return covered
@@ -0,0 +1,165 @@
+###############################################################################
+#                                                                             #
+#  ALL DU-PATHS                                                               #
+#                                                                             #
+###############################################################################
+
+# the number of DU-paths can grow exponentially with the number of decisions
+DEFAULT_MAX_PATHS = 100000
+
+
+class DuNode:
+    """ Node of the prefix tree of the DU-paths of a definition """
+    __slots__ = ('label', 'parent', 'children', 'path')
+
+    def __init__(self, label, parent=None):
+        self.label = label
+        self.parent = parent
+        # label of the next node -> DuNode
+        self.children = {}
+        # index of the DU-path ending here in DuPathAnalysis.paths, else None
+        self.path = None
+
+
+class DuPathAnalysis:
+    """
+    DU-paths of a program: for every definition (node d, variable x), the paths
+    of the CFG from d to a use of x that are definition-clear (no node between
+    them assigns x) and loop-free (no node repeated, but the use may be d itself).
+    The DU-paths of a definition are enumerated by a single depth-first search
+    from d and stored in a prefix tree, so they share their prefixes whatever
+    their use. The search only enters the nodes where x is live (computed once
+    for all definitions), so it never explores a part of the CFG leading to no use.
+    A trace is matched in one scan: each variable follows the prefix tree of its
+    last definition, label after label
+    """
+    def __init__(self, defuse, max_paths=DEFAULT_MAX_PATHS):
+        """ :param max_paths: a RuntimeError is raised when the program has more DU-paths """
+        self.defuse = defuse
+        self.max_paths = max_paths
+        self.cfg = defuse.cfg
+        self.use_sets = [set(names) for names in defuse.uses]
+        self.def_sets = [set(names) for names in defuse.defs]
+        self.live = self.liveVariables()
+        # paths[i] : (variable, prefix tree node where it ends) of the DU-path i, see path(i)
+        self.paths = []
+        # trees[(d, x)] : root of the prefix tree of the definition, only when it has DU-paths
+        self.trees = {}
+        for d, name in defuse.definitions:
+            root = self.enumerate(d, name)
+            if root.children:
+                self.trees[d, name] = root
+
+    def liveVariables(self):
+        """
+        Backward worklist over bit vectors of variables
+        :return: live[u], set of the variables read after the entry of node u before being assigned
+        """
+        cfg = self.cfg
+        n = len(cfg)
+        names = sorted(set(name for names in self.defuse.uses for name in names))
+        bits = {name: 1 << i for i, name in enumerate(names)}
+        use = [sum(bits[name] for name in names) for names in self.use_sets]
+        kill = [sum(bits[name] for name in names if name in bits) for names in self.def_sets]
+        predecessors = [[] for _ in range(n)]
+        for e in range(len(cfg.targets)):
+            predecessors[cfg.targets[e]].append(cfg.sources[e])
+        live = list(use)
+        worklist = list(range(n))
+        queued = [True] * n
+        while worklist:
+            u = worklist.pop()
+            queued[u] = False
+            out = 0
+            for e in range(cfg.offsets[u], cfg.offsets[u + 1]):
+                out |= live[cfg.targets[e]]
+            new = use[u] | (out & ~kill[u])
+            if new != live[u]:
+                live[u] = new
+                for p in predecessors[u]:
+                    if not queued[p]:
+                        queued[p] = True
+                        worklist.append(p)
+        return [set(name for name in names if live[u] & bits[name]) for u in range(n)]
+
+    def enumerate(self, d, name):
+        """ :return: root of the prefix tree of the DU-paths of the definition of name in d """
+        cfg = self.cfg
+        labels, offsets, targets = cfg.labels, cfg.offsets, cfg.targets
+        root = DuNode(labels[d])
+        on_path = {d}
+        # frames (node id, prefix tree node, next edge to follow)
+        stack = [[d, root, offsets[d]]]
+        while stack:
+            frame = stack[-1]
+            u, node, e = frame
+            if e == offsets[u + 1]:
+                stack.pop()
+                on_path.discard(u)
+                if stack and not node.children and node.path is None:
+                    # no DU-path goes through this prefix
+                    del stack[-1][1].children[labels[u]]
+                continue
+            frame[2] = e + 1
+            v = targets[e]
+            if name not in self.live[v] or (v in on_path and v != d):
+                continue
+            label = labels[v]
+            child = node.children.get(label)
+            if child is None:
+                child = node.children[label] = DuNode(label, node)
+            if name in self.use_sets[v] and child.path is None:
+                if len(self.paths) == self.max_paths:
+                    raise RuntimeError('More than {} DU-paths'.format(self.max_paths))
+                child.path = len(self.paths)
+                self.paths.append((name, child))
+            if v == d or name in self.def_sets[v]:
+                # the path is no longer definition-clear after v
+                if not child.children and child.path is None:
+                    del node.children[label]
+                continue
+            on_path.add(v)
+            stack.append([v, child, offsets[v]])
+        return root
+
+    def path(self, i):
+        """ :return: (variable, tuple of labels) of the DU-path i """
+        name, node = self.paths[i]
+        labels = []
+        while node is not None:
+            labels.append(node.label)
+            node = node.parent
+        return name, tuple(reversed(labels))
+
+    def coveredPaths(self, path, covered=None):
+        """
+        DU-paths executed by a path of labels, in one scan of the path
+        :return: set of the indexes of the DU-paths (covered if given)
+        """
+        if covered is None:
+            covered = set()
+        ids, defs, trees = self.cfg.ids, self.defuse.defs, self.trees
+        # variable -> prefix tree node of its last definition reached by the path
+        cursors = {}
+        for label in path:
+            for name, node in list(cursors.items()):
+                child = node.children.get(label)
+                if child is None:
+                    del cursors[name]
+                    continue
+                if child.path is not None:
+                    covered.add(child.path)
+                cursors[name] = child
+            u = ids[label]
+            for name in defs[u]:
+                root = trees.get((u, name))
+                if root is None:
+                    cursors.pop(name, None)
+                else:
+                    cursors[name] = root
+        return covered
+
+    def coverageRate(self, covered):
+        if not self.paths:
+            return 100
+        return round(len(covered)/len(self.paths), 2)*100
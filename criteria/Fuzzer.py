@@ -0,0 +1,291 @@
+import collections
+import concurrent.futures
+import os
+import time
+import numpy as np
+from interpreter.NodeVisitor import NodeVisitor, VarCollector
+from interpreter.PythonCompiler import compilePaths
+from interpreter.DatatestSet import Datatest
+from cfg.CfgParser import CfgParser
+from cfg.CfgInterpreter import CfgInterpreter
+from cfg.PathAnalysis import PathAnalysis
+from criteria.Coverage import CoverageMap, CoverageAccumulator
+
+###############################################################################
+#                                                                             #
+#  COVERAGE-GUIDED FUZZING                                                    #
+#                                                                             #
+###############################################################################
+
+# maximum number of labels visited by one execution, longer ones are dropped
+# (a diverging input costs MAX_STEPS steps, it must stay small next to a usual run)
+MAX_STEPS = 1000
+# mutated values are kept in [-VALUE_LIMIT, VALUE_LIMIT]
+VALUE_LIMIT = 2 ** 31
+# random values are drawn in [-RANDOM_BOUND, RANDOM_BOUND]
+RANDOM_BOUND = 1000
+# mutations: add a small delta, negate, program constant (+-1), random value,
+# flip a bit, double or halve, copy another input, copy the input of another datatest
+MUTATIONS = 8
+
+# state of a worker process, built once by initWorker
+_WORKER = {}
+
+
+class ConstantCollector(NodeVisitor):
+    """ Integer constants of an expression """
+    def collect(self, node, constants):
+        self.constants = constants
+        self.visit(node)
+
+    def visit_BinOp(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+
+    def visit_UnaryOp(self, node):
+        self.visit(node.expr)
+
+    def visit_Num(self, node):
+        self.constants.add(node.value)
+
+    def visit_Var(self, node):
+        pass
+
+
+def programConstants(cfg):
+    """ Constants of the conditions and assigments of the program, and 0 """
+    constants = {0}
+    collector = ConstantCollector()
+    for action in cfg.actions:
+        if action.isCondition:
+            collector.collect(action.condition, constants)
+        else:
+            for assign in action.assigns:
+                collector.collect(assign.right, constants)
+    return sorted(constants)
+
+
+def inputVariables(cfg):
+    """
+    Variables that may be read before being assigned (forward analysis of the
+    variables assigned on every path), the inputs a datatest has to give
+    """
+    reads = []
+    writes = []
+    collector = VarCollector()
+    for action in cfg.actions:
+        if action.isCondition:
+            reads.append([collector.collect(action.condition)])
+            writes.append([])
+        else:
+            reads.append([collector.collect(assign.right) for assign in action.assigns])
+            writes.append([assign.left.value for assign in action.assigns])
+    assigned = [None] * len(cfg)
+    assigned[cfg.source] = frozenset()
+    inputs = set()
+    worklist = [cfg.source]
+    while worklist:
+        u = worklist.pop()
+        for e in range(cfg.offsets[u], cfg.offsets[u + 1]):
+            defined = set(assigned[u])
+            for i, names in enumerate(reads[e]):
+                inputs.update(name for name in names if name not in defined)
+                if i < len(writes[e]):
+                    defined.add(writes[e][i])
+            v = cfg.targets[e]
+            new = frozenset(defined) if assigned[v] is None else assigned[v] & defined
+            if new != assigned[v]:
+                assigned[v] = new
+                worklist.append(v)
+    return sorted(inputs)
+
+
+def mutate(corpus, n, constants, rng):
+    """
+    n inputs mutated from random datatests of the corpus, all in numpy
+    :param corpus: int64 array [datatests, inputs]
+    :return: int64 array [n, inputs]
+    """
+    m = corpus.shape[1]
+    inputs = corpus[rng.integers(len(corpus), size=n)]
+    if m == 0:
+        return inputs
+    rows = np.arange(n)
+    # a third of the inputs get a second mutation
+    for active in (rows, rows[rng.random(n) < 0.33]):
+        k = len(active)
+        column = rng.integers(m, size=k)
+        current = inputs[active, column]
+        candidates = [
+            current + rng.choice([-16, -8, -4, -2, -1, 1, 2, 4, 8, 16], size=k),
+            -current,
+            rng.choice(constants, size=k) + rng.integers(-1, 2, size=k),
+            rng.integers(-RANDOM_BOUND, RANDOM_BOUND + 1, size=k),
+            current ^ (1 << rng.integers(0, 16, size=k)),
+            np.where(rng.random(k) < 0.5, current * 2, current // 2),
+            inputs[active, rng.integers(m, size=k)],
+            corpus[rng.integers(len(corpus), size=k), column],
+        ]
+        operation = rng.integers(MUTATIONS, size=k)
+        inputs[active, column] = np.clip(np.choose(operation, candidates), -VALUE_LIMIT, VALUE_LIMIT)
+    return inputs
+
+
+def initWorker(text_source, names, constants, k, max_steps):
+    """ Compile the program once per worker process """
+    _WORKER['program'] = compilePaths(text_source).function
+    _WORKER['names'] = names
+    _WORKER['constants'] = np.array(constants, dtype=np.int64)
+    _WORKER['k'] = k
+    _WORKER['max_steps'] = max_steps
+    # k-paths and edges of the paths already returned by this worker
+    _WORKER['paths'] = set()
+    _WORKER['edges'] = set()
+
+
+def isNew(path, k, paths, edges):
+    """
+    True if path is a k-path not in paths or goes through an edge not in edges
+    (every label, decision outcome and edge of a path is given by its edges),
+    paths and edges are then updated
+    """
+    if len(path) - 1 <= k:
+        if path in paths:
+            return False
+        paths.add(path)
+    path_edges = set(zip(path, path[1:]))
+    if path_edges <= edges:
+        return len(path) - 1 <= k
+    edges |= path_edges
+    return True
+
+
+def fuzzChunk(corpus, n, seed):
+    """
+    Run n inputs mutated from the corpus in a worker
+    :return: list of (input values, path) adding coverage to what this worker already returned
+    """
+    program, names, k, max_steps = _WORKER['program'], _WORKER['names'], _WORKER['k'], _WORKER['max_steps']
+    paths, edges = _WORKER['paths'], _WORKER['edges']
+    rng = np.random.default_rng(seed)
+    found = []
+    for row in mutate(corpus, n, _WORKER['constants'], rng).tolist():
+        try:
+            path = tuple(program(dict(zip(names, row)), [], max_steps))
+        except (RuntimeError, ZeroDivisionError):
+            continue
+        if isNew(path, k, paths, edges):
+            found.append((row, path))
+    return found
+
+
+class Fuzzer:
+    """
+    Corpus of the inputs adding coverage: labels ASSIGN (TA), labels DECISION (TD),
+    decision outcomes, edges and k-paths (TC). Inputs are mutated from the corpus in
+    batches by worker processes running the program compiled to python; only the
+    inputs whose path is a new k-path or has a new edge are sent back
+    """
+    def __init__(self, text_source, k, max_steps=MAX_STEPS):
+        self.text_source = text_source
+        self.cfgparser = CfgParser.cached(text_source)
+        self.cfg = self.cfgparser.cfg
+        self.map = CoverageMap.fromCfg(self.cfgparser)
+        self.coverage = CoverageAccumulator(self.map)
+        self.pathanalysis = PathAnalysis(CfgInterpreter(self.cfgparser), k)
+        self.names = inputVariables(self.cfg)
+        self.constants = programConstants(self.cfg)
+        self.k = k
+        self.max_steps = max_steps
+        self.edges = set()
+        # corpus entries: (input values, hits, path if it is a k-path else None)
+        self.entries = []
+        self.executions = 0
+
+    def add(self, row, path):
+        """
+        Keep an input if its path adds coverage
+        :return: True if it was kept
+        """
+        if not isNew(path, self.k, self.pathanalysis.visited, self.edges):
+            return False
+        hits = self.map.pathHits(path)
+        kpath = self.pathanalysis.isKPath(path)
+        self.coverage.add(hits)
+        self.entries.append((list(row), hits, path if kpath else None))
+        return True
+
+    def seed(self, datatests):
+        """ Start from the inputs of datatests (ex: openDatatests()), or from zeros """
+        program = compilePaths(self.text_source).function
+        rows = [[0] * len(self.names)]
+        rows += [[dt.values.get(name, 0) for name in self.names] for dt in datatests]
+        for row in rows:
+            self.executions += 1
+            try:
+                path = tuple(program(dict(zip(self.names, row)), [], self.max_steps))
+            except (RuntimeError, ZeroDivisionError):
+                continue
+            self.add(row, path)
+        if not self.entries:
+            # nothing runs, mutations start anyway from zeros
+            self.entries.append((rows[0], self.map.pathHits(()), None))
+
+    def corpus(self):
+        return np.array([row for row, _, _ in self.entries], dtype=np.int64).reshape(len(self.entries), len(self.names))
+
+    def complete(self):
+        """ True when every label, outcome, edge and k-path is covered """
+        return bool(self.coverage.covered.all()) and self.pathanalysis.countUncovered() == 0
+
+    def run(self, executions, workers=None, batch=4096, timeout=None, seed=None):
+        """
+        Fuzz until executions inputs were run, timeout seconds elapsed or everything is covered
+        :param workers: number of processes (default: number of cores)
+        """
+        rng = np.random.default_rng(seed)
+        start = time.time()
+        workers = workers or os.cpu_count() or 1
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=initWorker,
+                                                    initargs=(self.text_source, self.names, self.constants,
+                                                              self.k, self.max_steps)) as executor:
+            pending = collections.deque()
+            submitted = 0
+            while True:
+                stop = self.complete() or (timeout is not None and time.time() - start > timeout)
+                # two batches by process are pending, each mutating the latest corpus
+                while not stop and submitted < executions and len(pending) < 2 * workers:
+                    n = min(batch, executions - submitted)
+                    pending.append((n, executor.submit(fuzzChunk, self.corpus(), n, int(rng.integers(2 ** 63)))))
+                    submitted += n
+                if not pending:
+                    break
+                n, future = pending.popleft()
+                for row, path in future.result():
+                    self.add(row, path)
+                self.executions += n
+        return self
+
+    def minimize(self):
+        """
+        Greedy set cover of the items covered by the corpus: every k-path is
+        covered by one entry only, the other entries are kept while they add items
+        :return: list of input values
+        """
+        kept = [i for i, (_, _, path) in enumerate(self.entries) if path is not None]
+        covered = np.zeros(self.map.size, dtype=bool)
+        for i in kept:
+            covered |= self.entries[i][1]
+        rest = [i for i, (_, _, path) in enumerate(self.entries) if path is None]
+        while rest:
+            gains = [int(np.count_nonzero(self.entries[i][1] & ~covered)) for i in rest]
+            best = int(np.argmax(gains))
+            if gains[best] == 0:
+                break
+            covered |= self.entries[rest[best]][1]
+            kept.append(rest.pop(best))
+        return [self.entries[i][0] for i in sorted(kept)]
+
+    def datatests(self):
+        """ :return: list of parsed Datatest of the minimized corpus """
+        return [Datatest.fromValues(collections.OrderedDict(zip(self.names, row))) for row in self.minimize()]
@@ -0,0 +1,107 @@
+import collections
+import concurrent.futures
+import itertools
+import os
+from criteria.Coverage import ASSIGN, DECISION
+from criteria.CoverageEngine import CoverageEngine
+
+CRITERIA = ['ta', 'td', 'tc', 'tb', 'tdef', 'tu', 'tdu']
+
+# maximum number of paths not visited printed for tc and tdu
+MAX_PRINTED_PATHS = 100
+
+# state of a worker process, built once by initWorker
+_WORKER = {}
+
+
+def buildEngine(criterion, text_source, param):
+    """ The engine of main-all, K and I being param for tc and tb """
+    k = param if criterion == 'tc' else 0
+    i = param if criterion == 'tb' else 0
+    return CoverageEngine(text_source, k, i, dupaths=(criterion == 'tdu'))
+
+
+def initWorker(criterion, text_source, param):
+    """ Build the CFG and its static analyses once per worker process """
+    _WORKER['engine'] = buildEngine(criterion, text_source, param)
+
+
+def runChunk(datatests):
+    """
+    Evaluate a chunk of parsed datatests in a worker, a datatest stopped by a
+    RuntimeError is accumulated like in main-all
+    :return: Accumulated
+    """
+    engine = _WORKER['engine']
+    engine.reset()
+    for dt in datatests:
+        engine.add(engine.run(dt))
+    return engine.accumulated()
+
+
+def chunks(items, chunksize):
+    """ Split an iterable (possibly a stream) in lists of chunksize items """
+    items = iter(items)
+    chunk = list(itertools.islice(items, chunksize))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(items, chunksize))
+
+
+def runParallel(criterion, text_source, datatests, param=None, workers=None, chunksize=256):
+    """
+    Evaluate all datatests in a pool of processes. The datatests are consumed
+    as a stream: at most two chunks by process are pending at any time
+    :param datatests: iterable of parsed Datatest, like readDatatests() or DatatestColumns
+    :return: CoverageEngine having merged the chunks of all workers, in order
+    """
+    engine = buildEngine(criterion, text_source, param)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=initWorker,
+                                                initargs=(criterion, text_source, param)) as executor:
+        max_pending = 2 * (workers or os.cpu_count() or 1)
+        pending = collections.deque()
+        for chunk in chunks(datatests, chunksize):
+            pending.append(executor.submit(runChunk, chunk))
+            if len(pending) >= max_pending:
+                # chunks are merged in order, like executor.map
+                engine.merge(pending.popleft().result())
+        while pending:
+            engine.merge(pending.popleft().result())
+    return engine
+
+
+def report(criterion, engine, param=None):
+    """ Print the verdict of the criterion, computed by CoverageEngine.results like main-all """
+    print('====================================')
+    print('------- Result of datatest set (jeu de donnee) : {} datatests --------'.format(engine.count))
+    print('====================================')
+    if criterion in ('ta', 'td'):
+        kind, name = (ASSIGN, 'ASSIGN') if criterion == 'ta' else (DECISION, 'DECISIONS')
+        print('/------- All labels {}-------/'.format(name))
+        print([item for item_kind, item in engine.map.items if item_kind == kind])
+        print('/------- Labels {} not visited -------/ '.format(name))
+        print(engine.coverage.uncovered(kind))
+    elif criterion == 'tc':
+        print('/------- Paths not visited -------/')
+        print(list(engine.pathanalysis.uncoveredPaths(MAX_PRINTED_PATHS)))
+    elif criterion == 'tb':
+        for key in engine.while_max.keys():
+            print("While {} has had a maximum of {} iterations".format(key, engine.while_max[key]))
+    elif criterion == 'tdef':
+        print('/------- Variables declarations not used: -------/ ')
+        print(engine.unused)
+    elif criterion == 'tu':
+        print('/------- Def-use pairs (definition, use, variable) not visited -------/')
+        print(sorted(engine.defuse.pairs - engine.du_covered))
+    else:
+        print('/------- DU-paths (variable, path) not visited -------/ ')
+        not_visited = [p for p in range(len(engine.dupaths.paths)) if p not in engine.dupaths_covered]
+        print([engine.dupaths.path(p) for p in not_visited[:MAX_PRINTED_PATHS]])
+    names = {'ta': 'TA', 'td': 'TD', 'tc': 'TC', 'tb': 'TB for i = {}'.format(param), 'tdef': 'TDef', 'tu': 'TU', 'tdu': 'TDU'}
+    critere, coverage_rate = engine.results()[criterion]
+    print()
+    print('>> Critere {} {}'.format(names[criterion], 'TRUE' if critere else 'FALSE'))
+    if criterion == 'tc' and engine.pathanalysis.countPaths() == 0:
+        print('>> Taux de couverture : {}% : no {}-paths found'.format(coverage_rate, param))
+    elif coverage_rate is not None:
+        print('>> Taux de couverture : {}%'.format(coverage_rate))
@@ -0,0 +1,241 @@
+###############################################################################
+#                                                                             #
+#  BOUNDED INTEGER SOLVER                                                     #
+#                                                                             #
+###############################################################################
+
+# Symbolic values are hashable tuples:
+#   ('lin', ((variable, coefficient), ...), constant)  linear form, variables sorted
+#   ('add', a, b) ('mul', a, b) ('div', a, b)           non linear combination of values
+# A constraint (value, relation) means "value relation 0", relation in RELATIONS
+
+RELATIONS = ('<', '<=', '>', '>=', '==', '!=')
+NEGATION = {'<': '>=', '<=': '>', '>': '<=', '>=': '<', '==': '!=', '!=': '=='}
+
+# default domain of the inputs: [-DEFAULT_BOUND, DEFAULT_BOUND]
+DEFAULT_BOUND = 1000
+# maximum number of assignments tried by one solve()
+DEFAULT_BUDGET = 20000
+
+
+def constant(n):
+    return ('lin', (), n)
+
+
+def variable(name):
+    return ('lin', ((name, 1),), 0)
+
+
+def isConstant(value):
+    return value[0] == 'lin' and not value[1]
+
+
+def linear(coefficients, const):
+    return ('lin', tuple(sorted((v, a) for v, a in coefficients.items() if a != 0)), const)
+
+
+def add(a, b):
+    if a[0] == 'lin' and b[0] == 'lin':
+        coefficients = dict(a[1])
+        for v, c in b[1]:
+            coefficients[v] = coefficients.get(v, 0) + c
+        return linear(coefficients, a[2] + b[2])
+    return ('add', a, b)
+
+
+def scale(a, n):
+    if a[0] == 'lin':
+        return linear({v: c * n for v, c in a[1]}, a[2] * n)
+    return ('mul', a, constant(n))
+
+
+def neg(a):
+    return scale(a, -1)
+
+
+def sub(a, b):
+    return add(a, neg(b))
+
+
+def mul(a, b):
+    if isConstant(a):
+        return scale(b, a[2])
+    if isConstant(b):
+        return scale(a, b[2])
+    return ('mul', a, b)
+
+
+def div(a, b):
+    """ Floor division like the interpreters, None when dividing by a constant 0 """
+    if isConstant(b):
+        if b[2] == 0:
+            return None
+        if isConstant(a):
+            return constant(a[2] // b[2])
+    return ('div', a, b)
+
+
+def evaluate(value, model):
+    """ Concrete value under model (dict variable -> int), ZeroDivisionError on division by 0 """
+    kind = value[0]
+    if kind == 'lin':
+        return value[2] + sum(c * model[v] for v, c in value[1])
+    left = evaluate(value[1], model)
+    right = evaluate(value[2], model)
+    if kind == 'add':
+        return left + right
+    if kind == 'mul':
+        return left * right
+    return left // right
+
+
+def variables(value, result=None):
+    """ Set of the variables of a value """
+    if result is None:
+        result = set()
+    if value[0] == 'lin':
+        result.update(v for v, _ in value[1])
+    else:
+        variables(value[1], result)
+        variables(value[2], result)
+    return result
+
+
+def holds(constraint, model):
+    value, relation = constraint
+    try:
+        x = evaluate(value, model)
+    except ZeroDivisionError:
+        return False
+    if relation == '<':
+        return x < 0
+    if relation == '<=':
+        return x <= 0
+    if relation == '>':
+        return x > 0
+    if relation == '>=':
+        return x >= 0
+    if relation == '==':
+        return x == 0
+    return x != 0
+
+
+def floorDiv(a, b):
+    return a // b
+
+
+def ceilDiv(a, b):
+    return -((-a) // b)
+
+
+class Solver:
+    """
+    Find integer values of the variables of a conjunction of constraints, every
+    variable being in [-bound, bound]. Linear constraints (but !=) narrow the domains
+    of their variables by bounds propagation, the other constraints are checked once
+    their variables have a value. Values are tried from the one closest to 0, so the
+    models are small. The search stops after budget assignments: solve() then
+    returns None like for unsatisfiable constraints
+    """
+    def __init__(self, bound=DEFAULT_BOUND, budget=DEFAULT_BUDGET):
+        self.bound = bound
+        self.budget = budget
+
+    def solve(self, constraints, names=()):
+        """
+        :param constraints: iterable of (value, relation)
+        :param names: variables that must appear in the model even if unconstrained
+        :return: model dict variable -> int, or None
+        """
+        constraints = list(constraints)
+        names = set(names)
+        for value, _ in constraints:
+            variables(value, names)
+        domains = {v: (-self.bound, self.bound) for v in sorted(names)}
+        # a <= b is a - b <= 0: every propagated constraint is "sum + const <= 0"
+        inequalities = []
+        checks = []
+        for value, relation in constraints:
+            if value[0] != 'lin' or relation == '!=':
+                checks.append((value, relation))
+                continue
+            terms, const = value[1], value[2]
+            opposite = tuple((v, -c) for v, c in terms)
+            if relation in ('<=', '<', '=='):
+                inequalities.append((terms, const + (1 if relation == '<' else 0)))
+            if relation in ('>=', '>', '=='):
+                inequalities.append((opposite, -const + (1 if relation == '>' else 0)))
+        self.inequalities = inequalities
+        self.checks = [(c, variables(c[0])) for c in checks]
+        self.steps = 0
+        domains = self.propagate(domains)
+        if domains is None:
+            return None
+        return self.search(domains, {})
+
+    def propagate(self, domains):
+        """ Narrow the domains until a fixpoint, None when one becomes empty """
+        domains = dict(domains)
+        changed = True
+        rounds = 0
+        while changed and rounds < 100:
+            changed = False
+            rounds += 1
+            for terms, const in self.inequalities:
+                # smallest possible value of every term
+                lows = [c * (domains[v][0] if c > 0 else domains[v][1]) for v, c in terms]
+                total = const + sum(lows)
+                if total > 0:
+                    return None
+                for (v, c), low in zip(terms, lows):
+                    # c * x <= -(total - low)
+                    rest = low - total
+                    lo, hi = domains[v]
+                    if c > 0:
+                        hi = min(hi, floorDiv(rest, c))
+                    else:
+                        lo = max(lo, ceilDiv(rest, c))
+                    if lo > hi:
+                        return None
+                    if (lo, hi) != domains[v]:
+                        domains[v] = (lo, hi)
+                        changed = True
+        return domains
+
+    def consistent(self, model):
+        for constraint, names in self.checks:
+            if names.issubset(model) and not holds(constraint, model):
+                return False
+        return True
+
+    def search(self, domains, model):
+        free = [v for v in domains if v not in model]
+        if not free:
+            return dict(model) if self.consistent(model) else None
+        name = min(free, key=lambda v: domains[v][1] - domains[v][0])
+        lo, hi = domains[name]
+        for value in self.values(lo, hi):
+            self.steps += 1
+            if self.steps > self.budget:
+                return None
+            model[name] = value
+            narrowed = self.propagate(dict(domains, **{name: (value, value)}))
+            if narrowed is not None and self.consistent(model):
+                result = self.search(narrowed, model)
+                if result is not None:
+                    return result
+            del model[name]
+        return None
+
+    @staticmethod
+    def values(lo, hi):
+        """ Values of [lo, hi], the closest to 0 first """
+        start = min(max(0, lo), hi)
+        yield start
+        step = 1
+        while start - step >= lo or start + step <= hi:
+            if start + step <= hi:
+                yield start + step
+            if start - step >= lo:
+                yield start - step
+            step += 1
@@ -0,0 +1,274 @@
+import collections
+from interpreter.NodeVisitor import NodeVisitor, PLUS, MINUS, MUL, DIV, SUPERIOR, INFERIOR, EQUAL
+from cfg.Cfg import IF_NODE, WHILE_NODE
+from cfg.CfgInterpreter import CfgInterpreter
+from cfg.PathAnalysis import PathAnalysis
+from criteria.CoverageEngine import edgeEvents, USE
+from criteria.Solver import Solver, NEGATION, constant, variable, add, sub, mul, div, neg, holds
+
+RELATION_OF = {SUPERIOR: '>', INFERIOR: '<', EQUAL: '=='}
+# maximum number of nodes visited by the concrete run checking a generated datatest
+MAX_STEPS = 100000
+# maximum number of CFG nodes expanded by one generation
+DEFAULT_MAX_EXPANSIONS = 200000
+
+
+class InfeasiblePath(Exception):
+    """ The path divides by zero, no datatest can follow it """
+
+
+class SymbolicEvaluator(NodeVisitor):
+    """
+    Evaluate edge actions on symbolic values (see criteria.Solver): a variable read
+    before any assigment on the path is an input of the program
+    """
+    def __init__(self, state, inputs):
+        self.state = state
+        self.inputs = inputs
+
+    def visit_Num(self, node):
+        return constant(node.value)
+
+    def visit_Var(self, node):
+        name = node.value
+        if name not in self.state:
+            self.state[name] = variable(name)
+            self.inputs.add(name)
+        return self.state[name]
+
+    def visit_UnaryOp(self, node):
+        value = self.visit(node.expr)
+        return neg(value) if node.op.type == MINUS else value
+
+    def visit_BinOp(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        op = node.op.type
+        if op == PLUS:
+            return add(left, right)
+        elif op == MINUS:
+            return sub(left, right)
+        elif op == MUL:
+            return mul(left, right)
+        elif op == DIV:
+            value = div(left, right)
+            if value is None:
+                raise InfeasiblePath()
+            return value
+        raise Exception('Unknown operator {}'.format(op))
+
+    def constraint(self, action):
+        """ Constraint (value, relation) for the condition of a decision edge to be true """
+        condition = action.condition
+        relation = RELATION_OF[condition.op.type]
+        value = sub(self.visit(condition.left), self.visit(condition.right))
+        return (value, NEGATION[relation] if action.negate else relation)
+
+    def assign(self, action):
+        for assign in action.assigns:
+            self.state[assign.left.value] = self.visit(assign.right)
+
+
+class Frame:
+    """ A path being explored: its end node, symbolic state and path constraint """
+    def __init__(self, node, path, state, inputs, constraints, model):
+        self.node = node
+        self.path = path
+        self.state = state
+        self.inputs = inputs
+        self.constraints = constraints
+        # values satisfying constraints, shared with the prefix while they still hold
+        self.model = model
+
+
+class SymbolicExecutor:
+    """
+    Generate datatests reaching the labels ('ta', 'td') or the k-paths ('tc') not
+    covered yet. Paths of the CFG are explored depth first with a symbolic state;
+    a decision edge adds its condition to the path constraint, and a prefix whose
+    constraint has no solution is pruned with all its extensions. The model of a
+    prefix is reused by its extensions as long as it satisfies their new
+    constraints, and the solutions of whole constraints are memoized. Each datatest
+    is checked by a concrete run before being kept
+    """
+    def __init__(self, cfgparser, criterion, max_depth, solver=None, max_expansions=DEFAULT_MAX_EXPANSIONS):
+        self.cfgparser = cfgparser
+        self.cfg = cfgparser.cfg
+        self.criterion = criterion
+        self.max_depth = max_depth
+        self.solver = solver or Solver()
+        self.max_expansions = max_expansions
+        self.cfginterpreter = CfgInterpreter(cfgparser)
+        # variables read somewhere in the program, a datatest gives them all a value
+        self.read = sorted(set(name for action in self.cfg.actions
+                               for event, name in edgeEvents(action) if event == USE))
+        self.memo = {}
+        self.goals = set()
+        self.covered_paths = set()
+        self.covered_prefixes = collections.Counter()
+        self.ways = None
+
+    def setCovered(self, labels=(), paths=()):
+        """ Goals are the labels or k-paths of the criterion not covered yet """
+        cfg = self.cfg
+        if self.criterion == 'tc':
+            pathanalysis = PathAnalysis(self.cfginterpreter, self.max_depth)
+            self.ways = pathanalysis.ways()
+            for path in paths:
+                if pathanalysis.isKPath(path):
+                    self.coverPath(tuple(path))
+            self.goals = {cfg.target}
+        else:
+            decision = self.criterion == 'td'
+            program = set(self.cfgparser.labels)
+            self.goals = set(u for u in range(len(cfg))
+                             if cfg.isDecision(u) == decision and cfg.labels[u] in program)
+            self.goals -= set(cfg.ids[l] for l in labels if l in cfg.ids)
+
+    def coverPath(self, path):
+        if path not in self.covered_paths:
+            self.covered_paths.add(path)
+            for n in range(1, len(path) + 1):
+                self.covered_prefixes[path[:n]] += 1
+
+    def distances(self):
+        """ distance[u] : number of edges from node u to the closest goal """
+        cfg = self.cfg
+        predecessors = [[] for _ in range(len(cfg))]
+        for e in range(len(cfg.targets)):
+            predecessors[cfg.targets[e]].append(cfg.sources[e])
+        distance = [None] * len(cfg)
+        queue = collections.deque()
+        for goal in self.goals:
+            distance[goal] = 0
+            queue.append(goal)
+        while queue:
+            v = queue.popleft()
+            for u in predecessors[v]:
+                if distance[u] is None:
+                    distance[u] = distance[v] + 1
+                    queue.append(u)
+        return distance
+
+    def solve(self, constraints, inputs):
+        key = (constraints, frozenset(inputs))
+        if key not in self.memo:
+            self.memo[key] = self.solver.solve(constraints, inputs)
+        return self.memo[key]
+
+    def satisfied(self, model, constraint, inputs):
+        """ model (completed with 0 for the new inputs) if it satisfies constraint, else None """
+        model = dict(model)
+        for name in inputs:
+            model.setdefault(name, 0)
+        return model if holds(constraint, model) else None
+
+    def isGoal(self, frame):
+        if self.criterion == 'tc':
+            return frame.node == self.cfg.target and frame.path not in self.covered_paths
+        return frame.node in self.goals
+
+    def pruned(self, frame, distance):
+        """ True when no goal can be reached by extending the path of frame """
+        depth = len(frame.path) - 1
+        d = distance[frame.node]
+        if d is None or depth + d > self.max_depth:
+            return True
+        if self.criterion == 'tc':
+            # all the k-paths extending the prefix are already covered
+            total = self.ways[self.max_depth - depth][frame.node]
+            return self.covered_prefixes[frame.path] >= total
+        return False
+
+    def generate(self):
+        """
+        Yield the values (OrderedDict variable -> int) of new datatests, each of
+        them covering at least one goal, until no goal is left or reachable
+        """
+        cfg = self.cfg
+        expansions = 0
+        distance = self.distances()
+        stack = [Frame(cfg.source, (cfg.labels[cfg.source],), {}, set(), (), {})]
+        while stack and self.goals and expansions < self.max_expansions:
+            frame = stack.pop()
+            if self.pruned(frame, distance):
+                continue
+            expansions += 1
+            if self.isGoal(frame):
+                values = self.check(frame)
+                if values is not None:
+                    yield values
+                    distance = self.distances()
+                    if self.pruned(frame, distance):
+                        continue
+            first, last = cfg.offsets[frame.node], cfg.offsets[frame.node + 1]
+            children = []
+            for e in range(first, last):
+                child = self.follow(frame, e)
+                if child is not None:
+                    children.append(child)
+            # the child closest to a goal is explored first
+            children.sort(key=lambda child: -(distance[child.node] if distance[child.node] is not None else len(cfg)))
+            stack += children
+
+    def follow(self, frame, e):
+        """ Frame of the path of frame followed by edge e, None if it is infeasible """
+        cfg = self.cfg
+        action = cfg.actions[e]
+        node = cfg.targets[e]
+        state = dict(frame.state)
+        inputs = set(frame.inputs)
+        evaluator = SymbolicEvaluator(state, inputs)
+        constraints = frame.constraints
+        model = frame.model
+        try:
+            if cfg.kinds[frame.node] == IF_NODE or cfg.kinds[frame.node] == WHILE_NODE:
+                constraint = evaluator.constraint(action)
+                constraints = constraints + (constraint,)
+                model = self.satisfied(model, constraint, inputs)
+                if model is None:
+                    model = self.solve(constraints, inputs)
+                    if model is None:
+                        return None
+            else:
+                evaluator.assign(action)
+        except InfeasiblePath:
+            return None
+        return Frame(node, frame.path + (cfg.labels[node],), state, inputs, constraints, model)
+
+    def check(self, frame):
+        """
+        Run the datatest of the model of frame on the CFG, and record what it covers
+        :return: its values, None if it does not reach the goal or does not terminate
+        """
+        values = collections.OrderedDict((name, frame.model.get(name, 0)) for name in sorted(frame.inputs))
+        for name in self.read:
+            values.setdefault(name, 0)
+        self.cfginterpreter.reset()
+        self.cfginterpreter.seed(values)
+        try:
+            self.cfginterpreter.interpretCfg(MAX_STEPS)
+        except (RuntimeError, ZeroDivisionError):
+            return None
+        visited = self.cfginterpreter.visited
+        if self.criterion == 'tc':
+            if tuple(visited) != frame.path:
+                return None
+            self.coverPath(frame.path)
+        else:
+            reached = set(self.cfg.ids[label] for label in visited)
+            if frame.node not in reached:
+                return None
+            self.goals -= reached
+        return values
+
+
+def generateDatatests(cfgparser, criterion, max_depth, labels=(), paths=(), solver=None):
+    """
+    Datatests covering the labels ('ta', 'td') or k-paths ('tc', k = max_depth) not
+    covered by labels and paths, reached by paths of at most max_depth edges
+    :return: list of OrderedDict variable -> int
+    """
+    executor = SymbolicExecutor(cfgparser, criterion, max_depth, solver)
+    executor.setCovered(labels, paths)
+    return list(executor.generate())
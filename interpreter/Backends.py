@@ -0,0 +1,22 @@
+from interpreter.Interpreter import Interpreter
+from interpreter.VirtualMachine import VirtualMachine
+from interpreter.PythonCompiler import CompiledInterpreter
+
+# Execution engines sharing the interface of interpreter.Interpreter
+# (constructor taking a parser, interpret(), reset(), GLOBAL_SCOPE, visited, toUse).
+# They run whole programs: main-ta and main-td select one (or the batch interpreter).
+# The CFG criteria (main-tc, main-tb, main-tdef, main-tu, main-tdu) walk the CFG with
+# cfg.CfgInterpreter, whose edge actions are already compiled to closures, so they
+# take no backend argument
+BACKENDS = {
+    'tree': Interpreter,
+    'vm': VirtualMachine,
+    'python': CompiledInterpreter,
+}
+DEFAULT_BACKEND = 'tree'
+
+
+def getBackend(name):
+    if name not in BACKENDS:
+        raise Exception('Unknown backend {}, expecting one of {}'.format(name, ', '.join(sorted(BACKENDS))))
+    return BACKENDS[name]
@@ -0,0 +1,217 @@
+import collections
+import numpy as np
+from interpreter.NodeVisitor import PLUS, MINUS, MUL, DIV, SUPERIOR, INFERIOR, EQUAL
+from interpreter.Interpreter import Interpreter
+
+###############################################################################
+#                                                                             #
+#  BATCH (VECTORISED) INTERPRETER                                             #
+#                                                                             #
+###############################################################################
+
+# values are int64, the lanes computing a result beyond this magnitude are run again
+# by the scalar interpreter instead of silently wrapping around (python integers are unbounded)
+INT_LIMIT = 2 ** 62
+OVERFLOW = 'integer overflow in batch interpretation'
+
+
+class BatchInterpreter:
+    """
+    Interpret a program over all the datatests of a DatatestSet (or DatatestColumns) at once.
+    Every variable is a numpy int64 vector with one lane per datatest,
+    IF blocks split the lanes with masks and WHILE blocks iterate on
+    the lanes still in the loop until all of them exit. A lane using an
+    undefined variable or dividing by zero fails alone: its error is
+    recorded and it is masked out of the rest of the run. A lane overflowing
+    int64 is masked out the same way, then run again by interpreter.Interpreter.
+    """
+    def __init__(self, tree, datatestset):
+        self.tree = tree
+        self.datatestset = datatestset
+        self.n = len(datatestset)
+        self.labels = []
+        self.label_index = {}
+        self.collectLabels(tree)
+        # hits[l, d] : number of visits of label self.labels[l] by datatest d
+        self.hits = np.zeros((len(self.labels), self.n), dtype=np.int64)
+        self.scope = collections.OrderedDict()
+        self.defined = {}
+        # failed[d] : datatest d stopped on errors[d], like the scalar interpreter raising it
+        self.failed = np.zeros(self.n, dtype=bool)
+        self.errors = {}
+        # overflowed[d] : datatest d to run again with python integers, its results in rerun
+        self.overflowed = np.zeros(self.n, dtype=bool)
+        self.rerun = {}
+        self.seed()
+
+    def collectLabels(self, node):
+        name = type(node).__name__
+        if name == 'Program':
+            for compound in node.compounds:
+                self.collectLabels(compound)
+        elif name == 'Compound':
+            self.collectLabels(node.cblock)
+        elif name == 'Block':
+            self.addLabel(node.label)
+        elif name == 'IfBlock':
+            self.addLabel(node.cond_block.label)
+            self.collectLabels(node.block_true)
+            self.collectLabels(node.block_false)
+        elif name == 'WhileBlock':
+            self.addLabel(node.cond_block.label)
+            self.collectLabels(node.block)
+
+    def addLabel(self, label):
+        self.label_index[label.value] = len(self.labels)
+        self.labels.append(label)
+
+    def seed(self):
+        """ Load the datatests initial assigments in the variable vectors """
+        names, values, defined = self.datatestset.columns()
+        self.initial = (names, values, defined)
+        for j, name in enumerate(names):
+            # copies, the vectors are updated in place by the assigments
+            self.scope[name] = np.array(values[j], dtype=np.int64)
+            self.defined[name] = np.array(defined[j], dtype=bool)
+
+    def hit(self, label, mask):
+        self.hits[self.label_index[label.value]] += mask
+
+    def fail(self, lanes, message):
+        """ Stop the lanes not failed yet, recording their error """
+        lanes = lanes & ~self.failed
+        for d in np.flatnonzero(lanes):
+            self.errors[int(d)] = message
+        self.failed |= lanes
+
+    def execute(self, node, mask):
+        mask = mask & ~self.failed
+        if not mask.any():
+            return
+        method_name = 'execute_' + type(node).__name__
+        return getattr(self, method_name)(node, mask)
+
+    def execute_Program(self, node, mask):
+        for compound in node.compounds:
+            self.execute(compound, mask)
+
+    def execute_Compound(self, node, mask):
+        self.execute(node.cblock, mask)
+
+    def execute_Block(self, node, mask):
+        self.hit(node.label, mask)
+        for statement in node.statement_list:
+            self.execute(statement, mask)
+
+    def execute_IfBlock(self, node, mask):
+        self.hit(node.cond_block.label, mask)
+        condition = self.evaluate(node.cond_block.condition, mask) & mask & ~self.failed
+        self.execute(node.block_true, condition)
+        self.execute(node.block_false, mask & ~condition)
+
+    def execute_WhileBlock(self, node, mask):
+        active = mask
+        while True:
+            self.hit(node.cond_block.label, active)
+            active = self.evaluate(node.cond_block.condition, active) & active & ~self.failed
+            if not active.any():
+                break
+            self.execute(node.block, active)
+            active &= ~self.failed
+
+    def execute_Assign(self, node, mask):
+        var_name = node.left.value
+        value = self.evaluate(node.right, mask)
+        mask = mask & ~self.failed
+        if var_name not in self.scope:
+            self.scope[var_name] = np.zeros(self.n, dtype=np.int64)
+            self.defined[var_name] = np.zeros(self.n, dtype=bool)
+        np.copyto(self.scope[var_name], value, where=mask)
+        self.defined[var_name] |= mask
+
+    def execute_NoOp(self, node, mask):
+        pass
+
+    def evaluate(self, node, mask):
+        name = type(node).__name__
+        if name == 'Num':
+            return np.full(self.n, node.value, dtype=np.int64)
+        if name == 'Var':
+            var_name = node.value
+            if var_name not in self.scope:
+                self.scope[var_name] = np.zeros(self.n, dtype=np.int64)
+                self.defined[var_name] = np.zeros(self.n, dtype=bool)
+            undefined = mask & ~self.defined[var_name]
+            if undefined.any():
+                self.fail(undefined, '{} is not defined, it can\'t be used - check that {} is defined in program or in datatest'.format(var_name, var_name))
+            return self.scope[var_name]
+        if name == 'UnaryOp':
+            value = self.evaluate(node.expr, mask)
+            return -value if node.op.type == MINUS else value
+        left = self.evaluate(node.left, mask)
+        right = self.evaluate(node.right, mask)
+        op = node.op.type
+        if op == SUPERIOR:
+            return left > right
+        elif op == INFERIOR:
+            return left < right
+        elif op == EQUAL:
+            return left == right
+        elif op == DIV:
+            if (mask & (right == 0)).any():
+                self.fail(mask & (right == 0), 'integer division or modulo by zero')
+            return np.floor_divide(left, np.where(right == 0, 1, right))
+        elif op == PLUS:
+            result, approximation = left + right, left.astype(float) + right
+        elif op == MINUS:
+            result, approximation = left - right, left.astype(float) - right
+        elif op == MUL:
+            result, approximation = left * right, left.astype(float) * right
+        overflow = mask & ~self.failed & (np.abs(approximation) >= INT_LIMIT)
+        if overflow.any():
+            self.fail(overflow, OVERFLOW)
+            self.overflowed |= overflow
+        return result
+
+    def interpret(self):
+        """
+        :return: (scopes, hits) where scopes[d] is the final OrderedDict of variables
+            of datatest d and hits[l, d] counts the visits of self.labels[l] by datatest d,
+            the datatests in self.errors stopping at their error
+        """
+        self.execute(self.tree, np.ones(self.n, dtype=bool))
+        for d in np.flatnonzero(self.overflowed):
+            self.runScalar(int(d))
+        return self.scopes(), self.hits
+
+    def runScalar(self, d):
+        """ Run datatest d again with the scalar interpreter, its hits and error are replaced """
+        interpreter = Interpreter(None)
+        interpreter.tree = self.tree
+        names, values, defined = self.initial
+        for j, name in enumerate(names):
+            if defined[j][d]:
+                interpreter.GLOBAL_SCOPE[name] = int(values[j][d])
+        del self.errors[d]
+        self.failed[d] = False
+        try:
+            interpreter.interpret()
+        except (RuntimeError, ArithmeticError, MemoryError) as e:
+            # a path too long to be recorded fails this datatest only
+            self.errors[d] = str(e) or type(e).__name__
+            self.failed[d] = True
+        self.hits[:, d] = 0
+        for label in interpreter.visited:
+            if label.value in self.label_index:
+                self.hits[self.label_index[label.value], d] += 1
+        self.rerun[d] = interpreter.GLOBAL_SCOPE
+
+    def scopes(self):
+        scopes = [collections.OrderedDict() for _ in range(self.n)]
+        for var_name, values in self.scope.items():
+            defined = self.defined[var_name]
+            for d in np.flatnonzero(defined):
+                scopes[d][var_name] = int(values[d])
+        for d, scope in self.rerun.items():
+            scopes[d] = collections.OrderedDict(scope)
+        return scopes
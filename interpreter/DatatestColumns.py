@@ -0,0 +1,162 @@
+import collections
+import numpy as np
+from interpreter.DatatestSet import Datatest, readDatatests, datatestColumns
+
+###############################################################################
+#                                                                             #
+#  COLUMNAR DATATEST SET                                                      #
+#                                                                             #
+###############################################################################
+
+# File format:
+#   MAGIC
+#   "<number of datatests> <number of variables>\n"
+#   "<variable names separated by spaces>\n", padded with spaces up to ALIGN bytes
+#   values : one little endian int64 column of all datatests per variable
+#   defined : one bool column per variable, False where a datatest does not assign it
+
+MAGIC = b'DTCOL1\n'
+ALIGN = 64
+VALUE_TYPE = np.dtype('<i8')
+DEFINED_TYPE = np.dtype('?')
+# number of datatests read at once from the columns when iterating
+BLOCK_SIZE = 4096
+
+
+class DatatestColumns:
+    """
+    Set of datatests stored in the columnar format, memory mapped: opening it reads
+    the header only, the batch interpreter takes the columns as they are and the
+    scalar interpreters iterate over it like over readDatatests()
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.readline() != MAGIC:
+                raise Exception('{} is not a columnar datatest set'.format(path))
+            n, m = (int(x) for x in f.readline().split())
+            self.names = f.readline().decode('ascii').split()
+            offset = f.tell()
+        if len(self.names) != m:
+            raise Exception('Incorrect header of columnar datatest set {}'.format(path))
+        self.n = n
+        self.values = self.column(path, VALUE_TYPE, offset, (m, n))
+        self.defined = self.column(path, DEFINED_TYPE, offset + VALUE_TYPE.itemsize * m * n, (m, n))
+
+    @classmethod
+    def fromDatatests(cls, datatests):
+        """ Columns of parsed datatests held in memory instead of memory mapped """
+        columns = cls.__new__(cls)
+        columns.names, columns.values, columns.defined = datatestColumns(datatests)
+        columns.n = columns.values.shape[1]
+        return columns
+
+    @staticmethod
+    def column(path, dtype, offset, shape):
+        if shape[0] * shape[1] == 0:
+            # mmap can't map an empty region
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, d):
+        return next(self.iterate(d, d + 1))
+
+    def __iter__(self):
+        return self.iterate(0, self.n)
+
+    def iterate(self, start, stop):
+        """ Yield the parsed Datatest of the datatests start to stop - 1 """
+        for block in range(start, stop, BLOCK_SIZE):
+            end = min(block + BLOCK_SIZE, stop)
+            values = self.values[:, block:end].T.tolist()
+            defined = self.defined[:, block:end].T.tolist()
+            for row, row_defined in zip(values, defined):
+                yield Datatest.fromValues(collections.OrderedDict(
+                    (name, value) for name, value, d in zip(self.names, row, row_defined) if d
+                ))
+
+    def columns(self):
+        """ Same as DatatestSet.columns, without copy """
+        return self.names, self.values, self.defined
+
+
+def writeColumns(path, names, values, defined):
+    """ Write columns (see datatestColumns) in the columnar format """
+    values = np.ascontiguousarray(values, dtype=VALUE_TYPE)
+    defined = np.ascontiguousarray(defined, dtype=DEFINED_TYPE)
+    m, n = values.shape
+    header = MAGIC + '{} {}\n'.format(n, m).encode('ascii')
+    names = ' '.join(names).encode('ascii')
+    # pad the names so that the columns start on a multiple of ALIGN bytes
+    names += b' ' * (-(len(header) + len(names) + 1) % ALIGN) + b'\n'
+    with open(path, 'wb') as f:
+        f.write(header + names)
+        values.tofile(f)
+        defined.tofile(f)
+
+
+def writeText(stream, datatests):
+    """ Write datatests in the text format read by DatatestSet and readDatatests """
+    stream.write('{')
+    for i, datatest in enumerate(datatests):
+        if i > 0:
+            stream.write(';\n')
+        stream.write(datatest.text)
+    stream.write('}\n')
+
+
+def isColumnar(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def openDatatests(path):
+    """
+    Datatests of a file in the text or the columnar format
+    :return: iterable of parsed Datatest
+    """
+    if isColumnar(path):
+        return DatatestColumns(path)
+    return readDatatests(open(path, 'r'))
+
+
+def loadColumns(path):
+    """
+    Datatests of a file in the text or the columnar format as columns, for the batch interpreter
+    :return: DatatestColumns, memory mapped for the columnar format
+    """
+    if isColumnar(path):
+        return DatatestColumns(path)
+    return DatatestColumns.fromDatatests(readDatatests(open(path, 'r')))
+
+
+def convert(source, destination):
+    """ Convert a datatest set from the text format to the columnar one, or the opposite """
+    if isColumnar(source):
+        with open(destination, 'w') as f:
+            writeText(f, DatatestColumns(source))
+    else:
+        writeColumns(destination, *datatestColumns(readDatatests(open(source, 'r'))))
+
+
+def inputRanges(datatests):
+    """
+    Interval of the initial values of each variable over a datatest set, the datatests
+    not assigning a variable are not counted for it
+    :param datatests: DatatestColumns or iterable of parsed Datatest
+    :return: dict variable -> (min, max)
+    """
+    ranges = {}
+    if isinstance(datatests, DatatestColumns):
+        for name, values, defined in zip(datatests.names, datatests.values, datatests.defined):
+            if defined.any():
+                values = values[defined]
+                ranges[name] = (int(values.min()), int(values.max()))
+        return ranges
+    for datatest in datatests:
+        for name, value in datatest.values.items():
+            lo, hi = ranges.get(name, (value, value))
+            ranges[name] = (min(lo, value), max(hi, value))
+    return ranges
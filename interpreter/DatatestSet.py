@@ -1,20 +1,46 @@
+import array
+import codecs
+import collections
+import re
+import numpy as np
+from interpreter.Interpreter import Interpreter
+from interpreter.Lexer import Lexer, EOF
+from interpreter.Parser import Parser
+
 class Datatest:
-    """ Class to implement a data test (donnée de jeu) by storing all assigments in string format for the interpreter"""
+    """
+    Class to implement a data test (donnée de jeu): its assigments in string format,
+    and their values computed once by parse() to seed the scope of an interpreter
+    """
 
     def __init__(self, text):
         """ a datatest will just store a list of assigments in string format like X=X_i"""
         """ therefore assigments will hold ["X=Xi", "Y=Yi"] """
         self.text = text
         self.assigments = []
+        # values holds the variables and their integer values, in the order of the assigments
+        self.values = collections.OrderedDict()
         # ini_source is a code piece with label 0, used for main-ta and main-d when we didn't have the cfg yet
         self.ini_source = '0: '
         # ini_assigns is just the block (list) initial assigments
         self.ini_assigns = ''
 
+    @classmethod
+    def fromValues(cls, values):
+        """ Parsed datatest assigning integer values, without parsing any text """
+        datatest = cls('(' + ', '.join('{} = {}'.format(k, v) for k, v in values.items()) + ')')
+        for k, v in values.items():
+            assigment = '{} = {}'.format(k, v)
+            datatest.assigments.append(assigment)
+            datatest.ini_source = datatest.ini_source + assigment + ' ; '
+            datatest.ini_assigns = datatest.ini_assigns + assigment + ' ; '
+        datatest.values.update(values)
+        return datatest
+
     def parse(self):
         n = len(self.text)
         """ check that the datatest begins by ( and ends by ) """
-        if self.text[0] != '(' or self.text[n-1] != ')':
+        if n == 0 or self.text[0] != '(' or self.text[n-1] != ')':
             self.error()
         assigments = self.text[1:n-1].split(',')
         for assigment in assigments:
@@ -24,6 +50,26 @@ class Datatest:
 
     def add(self, assigment):
         self.assigments.append(assigment)
+        if assigment.strip() == '':
+            # empty datatest ()
+            return
+        if assigment.find('=') == -1:
+            self.error()
+        var_name, expr = assigment.split('=', 1)
+        var_name = var_name.strip()
+        if not var_name.isalnum() or not var_name[0].isalpha():
+            self.error()
+        try:
+            # most values are integer constants, they do not need the parser
+            value = int(expr)
+        except ValueError:
+            # an expression, it may use the variables assigned before it
+            interpreter = Interpreter(Parser(Lexer(expr)))
+            interpreter.GLOBAL_SCOPE.update(self.values)
+            value = interpreter.visit(interpreter.parser.expr())
+            if interpreter.parser.current_token.type != EOF:
+                self.error()
+        self.values[var_name] = value
 
     def error(self):
         raise Exception('Incorrect syntax to describe a datatest')
@@ -35,12 +81,8 @@ class DatatestSet:
         """ Initialize from text source that must contain a set of datasets"""
         """ Remove comments by spliting lines and removing line with #"""
         lines = text.splitlines()
-        text = ''
-        for line in lines:
-            if line.find('#') == -1:
-                # Only adding lines without '#'
-                text = text+line
-        self.text = text
+        # Only adding lines without '#'
+        self.text = ''.join(line for line in lines if line.find('#') == -1)
         # list of données de jeu
         self.datatests = []
 
@@ -58,9 +100,130 @@ class DatatestSet:
         """ Add datatest to the list """
         self.datatests.append(Datatest(datatest))
 
-    def error(self):
+    def __len__(self):
+        return len(self.datatests)
+
+    def columns(self):
+        """ Values of the datatests by variable, see datatestColumns """
+        for datatest in self.datatests:
+            if not datatest.assigments:
+                datatest.parse()
+        return datatestColumns(self.datatests)
+
+    @staticmethod
+    def error():
         raise Exception('Incorrect syntax to describe set of datatests')
 
+# size of the pieces read by readDatatests
+READ_SIZE = 1 << 16
+# end of a datatest in a set
+SEPARATORS = re.compile('[;}]')
+
+
+def readChunks(stream, size=READ_SIZE):
+    """ Yield the text of a file object (text or binary) or of a mmap piece by piece """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    if hasattr(stream, 'read'):
+        pieces = iter(lambda: stream.read(size), stream.read(0))
+    else:
+        pieces = (stream[start:start + size] for start in range(0, len(stream), size))
+    for piece in pieces:
+        if isinstance(piece, bytes):
+            piece = decoder.decode(piece)
+        yield piece
+    yield decoder.decode(b'', final=True)
+
+
+def uncommentedChunks(stream, size=READ_SIZE):
+    """
+    Yield the text of the stream without its comments and line breaks:
+    a '#' removes the rest of its line, and the lines are joined without separator
+    """
+    in_comment = False
+    for chunk in readChunks(stream, size):
+        pieces = []
+        pos = 0
+        while pos < len(chunk):
+            if in_comment:
+                end = chunk.find('\n', pos)
+                in_comment = end == -1
+                pos = len(chunk) if in_comment else end + 1
+            else:
+                comment = chunk.find('#', pos)
+                in_comment = comment != -1
+                pieces.append(chunk[pos:comment] if in_comment else chunk[pos:])
+                pos = comment + 1 if in_comment else len(chunk)
+        yield ''.join(pieces).replace('\r', '').replace('\n', '')
+
+
+def readDatatests(stream, size=READ_SIZE):
+    """
+    Parse a set of datatests {(X=1,Y=2);(...)} incrementally, like DatatestSet.parse
+    but only the datatest being read is kept in memory
+    :param stream: file object (text or binary) or mmap
+    :return: generator of parsed Datatest
+    """
+    buffer = ''
+    started = False
+    ended = False
+    for chunk in uncommentedChunks(stream, size):
+        buffer += chunk
+        if not started and buffer:
+            if buffer[0] != '{':
+                DatatestSet.error()
+            started = True
+            buffer = buffer[1:]
+        if ended:
+            if buffer:
+                DatatestSet.error()
+            continue
+        start = 0
+        for match in SEPARATORS.finditer(buffer):
+            yield parsedDatatest(buffer[start:match.start()])
+            start = match.end()
+            if match.group() == '}':
+                ended = True
+                if buffer[start:]:
+                    DatatestSet.error()
+                break
+        buffer = buffer[start:]
+    if not ended:
+        DatatestSet.error()
+
+
+def parsedDatatest(text):
+    datatest = Datatest(text)
+    datatest.parse()
+    return datatest
+
+
+def datatestColumns(datatests):
+    """
+    Store the values of parsed datatests by variable, one int64 column per variable
+    in the order the variables first appear
+    :return: (names, values, defined) where values[j, d] is the value of names[j] in
+        datatest d and defined[j, d] is False when datatest d does not assign names[j]
+    """
+    columns = collections.OrderedDict()
+    n = 0
+    for datatest in datatests:
+        for name, value in datatest.values.items():
+            if name not in columns:
+                columns[name] = (array.array('q', bytes(8 * n)), bytearray(n))
+            values, defined = columns[name]
+            # pad the datatests that did not assign the variable
+            values.frombytes(bytes(8 * (n - len(values))))
+            defined.extend(bytes(n - len(defined)))
+            values.append(value)
+            defined.append(1)
+        n += 1
+    values = np.zeros((len(columns), n), dtype=np.int64)
+    defined = np.zeros((len(columns), n), dtype=bool)
+    for j, (column, column_defined) in enumerate(columns.values()):
+        values[j, :len(column)] = np.frombuffer(column, dtype=np.int64)
+        defined[j, :len(column_defined)] = np.frombuffer(bytes(column_defined), dtype=bool)
+    return list(columns.keys()), values, defined
+
 """ TESTING CODE TO CHECK THAT PARSERS WORKS"""
 """
 text = '{(X=1,Y=2);(X=-3)}'
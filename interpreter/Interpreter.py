@@ -1,4 +1,8 @@
 import json
+from interpreter.NodeVisitor import NodeVisitor, INTEGER, INTEGER_CONST, PLUS, MINUS, MUL, DIV, LPAREN, \
+    RPAREN, ID, LABEL, PIPE, ASSIGN, BEGIN, END, SEMI, COLON, LBRACKET, RBRACKET, INFERIOR, SUPERIOR, EQUAL, \
+    IF, ELSE, WHILE, EOF
+from interpreter.LoopAcceleration import whileLoop
 
 ###############################################################################
 #                                                                             #
@@ -6,51 +10,15 @@ import json
 #                                                                             #
 ###############################################################################
 
-# Token types
-#
-# EOF (end-of-file) token is used to indicate that
-# there is no more input left for lexical analysis
-INTEGER       = 'INTEGER'
-INTEGER_CONST = 'INTEGER_CONST'
-PLUS          = 'PLUS'
-MINUS         = 'MINUS'
-MUL           = 'MUL'
-DIV           = 'DIV'
-LPAREN        = 'LPAREN'
-RPAREN        = 'RPAREN'
-ID            = 'ID'
-LABEL         = 'LABEL'
-PIPE          = 'PIPE'
-ASSIGN        = 'ASSIGN'
-BEGIN         = 'BEGIN'
-END           = 'END'
-SEMI          = 'SEMI'
-COLON         = 'COLON'
-LBRACKET      = 'LBRACKET'
-RBRACKET      = 'RBRACKET'
-INFERIOR      = 'INFERIOR'
-SUPERIOR      = 'SUPERIOR'
-EQUAL         = 'EQUAL'
-IF            = 'IF'
-ELSE          = 'ELSE'
-WHILE         = 'WHILE'
-EOF           = 'EOF'
-
-class NodeVisitor(object):
-    def visit(self, node):
-        # to debug and follow which node is visited
-        #print(type(node).__name__)
-        method_name = 'visit_' + type(node).__name__
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
-
-    def generic_visit(self, node):
-        raise Exception('No visit_{} method'.format(type(node).__name__))
-
 
 class Interpreter(NodeVisitor):
     def __init__(self, parser):
         self.parser = parser
+        self.tree = None
+        self.reset()
+
+    def reset(self):
+        """ Give a fresh state (empty scope, visited and toUse) to interpret the program again """
         import collections
         self.GLOBAL_SCOPE = collections.OrderedDict()
         self.visited = []
@@ -116,6 +84,13 @@ class Interpreter(NodeVisitor):
         return self.visit(node.condition)
 
     def visit_WhileBlock(self, node):
+        affine = whileLoop(node)
+        if affine is not None:
+            # an affine loop runs all its iterations at once
+            loop, labels = affine
+            iterations = loop.accelerate(self)
+            if iterations:
+                self.visited.extend(labels * iterations)
         while self.visit(node.cond_block):
             self.visit(node.block)
 
@@ -143,7 +118,9 @@ class Interpreter(NodeVisitor):
         pass
 
     def interpret(self):
-        tree = self.parser.parse()
-        if tree is None:
+        # the program is parsed once, then interpreted after each reset()
+        if self.tree is None:
+            self.tree = self.parser.parse()
+        if self.tree is None:
             return ''
-        return self.visit(tree)
+        return self.visit(self.tree)
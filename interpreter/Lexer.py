@@ -4,6 +4,11 @@
 #                                                                             #
 ###############################################################################
 
+import re
+from array import array
+from itertools import accumulate, compress
+import numpy as np
+
 # Token types
 #
 # EOF (end-of-file) token is used to indicate that
@@ -66,150 +71,283 @@ RESERVED_KEYWORDS = {
 }
 
 
+# Shared tokens of the lexemes made of fixed characters and of the reserved keywords
+FIXED_TOKENS = {lexeme: Token(type, lexeme) for lexeme, type in (
+    ('|', PIPE), ('=', ASSIGN), (';', SEMI), (':', COLON), ('+', PLUS), ('-', MINUS),
+    ('*', MUL), ('/', DIV), ('(', LPAREN), (')', RPAREN), ('{', LBRACKET), ('}', RBRACKET),
+    ('<', INFERIOR), ('>', SUPERIOR), ('==', EQUAL),
+)}
+FIXED_TOKENS.update(RESERVED_KEYWORDS)
+EOF_TOKEN = Token(EOF, None)
+# type of the token of an invalid character, reported when the Parser reaches it
+ERROR = 'ERROR'
+
+# Type codes of the tokens, stored in the compact arrays of the Lexer
+TOKEN_TYPES = [EOF, ERROR, ID, INTEGER_CONST, PIPE, ASSIGN, SEMI, COLON, PLUS, MINUS, MUL, DIV,
+               LPAREN, RPAREN, LBRACKET, RBRACKET, INFERIOR, SUPERIOR, EQUAL, BEGIN, IF, ELSE, WHILE, END]
+TOKEN_CODES = {type: code for code, type in enumerate(TOKEN_TYPES)}
+EOF_CODE = TOKEN_CODES[EOF]
+ERROR_CODE = TOKEN_CODES[ERROR]
+ID_CODE = TOKEN_CODES[ID]
+INTEGER_CODE = TOKEN_CODES[INTEGER_CONST]
+ASSIGN_CODE = TOKEN_CODES[ASSIGN]
+EQUAL_CODE = TOKEN_CODES[EQUAL]
+# code of a comment, dropped from the tokens
+COMMENT_CODE = -1
+LEXEME_CODES = {lexeme: TOKEN_CODES[token.type] for lexeme, token in FIXED_TOKENS.items()}
+
+# Token served for each type code, None when it depends on the lexeme: identifiers,
+# integers, invalid characters and DIV (either '/' or the keyword DIV)
+SHARED_TOKENS = [None] * len(TOKEN_TYPES)
+for lexeme, token in FIXED_TOKENS.items():
+    if token.type != DIV:
+        SHARED_TOKENS[TOKEN_CODES[token.type]] = token
+SHARED_TOKENS[EOF_CODE] = EOF_TOKEN
+
+
+def firstCharCode(char):
+    """
+    Type code of a lexeme not fixed, given by its first character like the historical
+    character by character lexer: a letter starts an identifier (then letters or digits,
+    str.isalnum()), a decimal digit an integer. Anything else is an invalid character
+    """
+    if char.isalpha():
+        return ID_CODE
+    if char.isdecimal():
+        return INTEGER_CODE
+    return ERROR_CODE
+
+
+class LexemeCodes(dict):
+    """ Type code of each lexeme of a text, computed once per distinct lexeme """
+    def __init__(self):
+        dict.__init__(self, LEXEME_CODES)
+
+    def __missing__(self, lexeme):
+        if lexeme[0] == '#' and len(lexeme) > 1:
+            code = COMMENT_CODE
+        else:
+            code = firstCharCode(lexeme[0])
+        self[lexeme] = code
+        return code
+
+
+class LexemeTokens(dict):
+    """
+    Token of each lexeme of a text, built once per distinct lexeme: identifiers and
+    integers repeat, tokens are never modified so they are shared by their occurrences
+    """
+    def __init__(self):
+        dict.__init__(self, FIXED_TOKENS)
+
+    def __missing__(self, lexeme):
+        if lexeme[0].isdecimal():
+            token = Token(INTEGER_CONST, int(lexeme))
+        else:
+            token = Token(ID, lexeme)
+        self[lexeme] = token
+        return token
+
+
+# Lexemes of the language: an identifier (a letter then letters or digits), an
+# integer (decimal digits), '==', a comment enclosed by two '#' or a single
+# character. Splitting the text on them leaves the whitespaces between them.
+# [^\W\d_] also matches the non decimal digits, their lexeme is then an invalid character
+TOKEN_REGEX = re.compile(r'([^\W\d_][^\W_]*|\d+|==|#[^#]*#|\S)')
+
+
+def scanRegex(text):
+    """
+    Tokenize text with a single split() on TOKEN_REGEX
+    :return: (type codes, start offsets, end offsets) of the tokens, EOF excluded
+    """
+    # whitespaces and lexemes alternate, starting and ending with whitespaces (maybe empty)
+    parts = TOKEN_REGEX.split(text)
+    offsets = array('q', accumulate(map(len, parts)))
+    codes = array('b', map(LexemeCodes().__getitem__, parts[1::2]))
+    starts = offsets[0:-1:2]
+    ends = offsets[1::2]
+    if COMMENT_CODE in codes:
+        keep = [code != COMMENT_CODE for code in codes]
+        codes = array('b', compress(codes, keep))
+        starts = array('q', compress(starts, keep))
+        ends = array('q', compress(ends, keep))
+    return codes, starts, ends
+
+
+# Sources from this length on are tokenized with numpy, below it the fixed
+# cost of the numpy calls is higher than the split() of the whole text
+VECTORIZED_MIN_LENGTH = 1 << 9
+
+# Classes of the characters for scanVectorized(): the type code of the token started
+# by the character, or one of these classes for the characters which start no token
+SPACE_CLASS = 100
+HASH_CLASS = 101
+# letters or digits only allowed inside an identifier (str.isalnum() but neither a
+# letter nor a decimal digit)
+TAIL_CLASS = 102
+
+
+def charClass(char):
+    if char in LEXEME_CODES:
+        return LEXEME_CODES[char]
+    if char == '#':
+        return HASH_CLASS
+    if char.isspace():
+        return SPACE_CLASS
+    code = firstCharCode(char)
+    if code == ERROR_CODE and char.isalnum():
+        return TAIL_CLASS
+    return code
+
+
+ASCII_CLASSES = np.array([charClass(chr(c)) for c in range(128)], dtype=np.uint8)
+
+
+def charClasses(text):
+    """ :return: (codes of the characters of text, classes of the characters) """
+    if text.isascii():
+        chars = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+        return chars, ASCII_CLASSES[chars]
+    chars = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    classes = np.empty(len(chars), dtype=np.uint8)
+    ascii = chars < 128
+    classes[ascii] = ASCII_CLASSES[chars[ascii]]
+    # the other characters are classified once each
+    others, inverse = np.unique(chars[~ascii], return_inverse=True)
+    classes[~ascii] = np.array([charClass(chr(c)) for c in others.tolist()], dtype=np.uint8)[inverse]
+    return chars, classes
+
+
+def scanVectorized(text):
+    """
+    Tokenize text with numpy operations on its array of characters, no python
+    loop runs per character nor per token. Same tokens as scanRegex()
+    :return: (type codes, start offsets, end offsets) of the tokens, EOF excluded
+    """
+    chars, classes = charClasses(text)
+    n = len(classes)
+    live = classes != SPACE_CLASS
+    if '#' in text:
+        # comments: the characters after an odd number of '#', and the '#' themselves.
+        # The last '#' of an odd number opens a comment never closed, it is an invalid character
+        hashes = classes == HASH_CLASS
+        count = np.cumsum(hashes, dtype=np.int64)
+        if count[-1] % 2 == 1:
+            last = np.flatnonzero(hashes)[-1]
+            classes[last] = ERROR_CODE
+            hashes[last] = False
+            count[last:] -= 1
+        live &= ~hashes
+        live &= (count & 1) == 0
+    # continues[i] : character i is in the token of character i - 1
+    word = live & ((classes == ID_CODE) | (classes == INTEGER_CODE) | (classes == TAIL_CLASS))
+    continues = np.zeros(n, dtype=bool)
+    np.logical_and(word[1:], word[:-1], out=continues[1:])
+    # the first letter after the digits starting a word starts an identifier ('12ab' is 12 then ab)
+    digit = classes == INTEGER_CODE
+    after_digit = np.zeros(n, dtype=bool)
+    np.logical_and(continues[1:], digit[:-1], out=after_digit[1:])
+    after_digit &= ~digit
+    split = np.flatnonzero(after_digit)
+    if len(split):
+        not_digits = np.flatnonzero(~digit)
+        previous = np.searchsorted(not_digits, split) - 1
+        # the digits before the split start the word when no word character precedes them
+        starts_word = previous < 0
+        starts_word[~starts_word] = ~word[not_digits[previous[~starts_word]]]
+        continues[split[starts_word]] = False
+    # '=' directly after a '=' starting a token makes '=='
+    equal = live & (classes == ASSIGN_CODE)
+    pairs = np.zeros(n, dtype=bool)
+    np.logical_and(equal[1:], equal[:-1], out=pairs[1:])
+    if (pairs[1:] & pairs[:-1]).any():
+        # runs of more than two '=' are paired from their first one
+        run_starts = equal.copy()
+        run_starts[1:] &= ~equal[:-1]
+        first = np.flatnonzero(run_starts)
+        run = np.cumsum(run_starts) - 1
+        pairs &= ((np.arange(n) - first[run]) & 1) == 1
+    continues |= pairs
+    starts = np.flatnonzero(live & ~continues)
+    last = np.ones(n, dtype=bool)
+    np.logical_not(continues[1:], out=last[:-1])
+    ends = np.flatnonzero(live & last) + 1
+    codes = classes[starts]
+    codes[codes == TAIL_CLASS] = ERROR_CODE
+    lengths = ends - starts
+    codes[(codes == ASSIGN_CODE) & (lengths == 2)] = EQUAL_CODE
+    words = np.flatnonzero((codes == ID_CODE) & (lengths <= max(map(len, RESERVED_KEYWORDS))))
+    for keyword, token in RESERVED_KEYWORDS.items():
+        candidates = words[lengths[words] == len(keyword)]
+        for offset, char in enumerate(keyword):
+            candidates = candidates[chars[starts[candidates] + offset] == ord(char)]
+        codes[candidates] = TOKEN_CODES[token.type]
+    return array('b', codes.astype(np.int8).tobytes()), array('q', starts.tobytes()), array('q', ends.tobytes())
+
+
 class Lexer(object):
+    """
+    Tokenize the whole source in a single pass, with TOKEN_REGEX or with numpy
+    for the long sources. Tokens are stored in compact parallel arrays: type codes
+    and start/end offsets of their lexemes in the text, the value of an identifier
+    or an integer being decoded from its lexeme when it is served.
+    get_next_token() serves them one at a time to the Parser, and current_char
+    is the character that directly follows the last token served. An invalid
+    character is only reported when the Parser reaches it
+    """
     def __init__(self, text):
         # client string input, e.g. "4 + 2 * 3 - 6 / 2"
         self.text = text
-        # self.pos is an index into self.text
+        self.length = len(text)
+        self.tokenize()
+        self.lexeme_tokens = LexemeTokens()
+        # index of the next token served by get_next_token
+        self.index = 0
+        # self.pos is an index into self.text, current_char is read there
         self.pos = 0
-        self.current_char = self.text[self.pos]
 
-    def error(self):
-        raise Exception('Invalid character ' + self.current_char)
-
-    def advance(self):
-        """Advance the `pos` pointer and set the `current_char` variable."""
-        self.pos += 1
-        if self.pos > len(self.text) - 1:
-            self.current_char = None  # Indicates end of input
+    def tokenize(self):
+        if self.length >= VECTORIZED_MIN_LENGTH:
+            codes, starts, ends = scanVectorized(self.text)
         else:
-            self.current_char = self.text[self.pos]
-        # for debugging print(self.current_char)
-        #print(self.current_char)
-
-    def peek(self):
-        peek_pos = self.pos + 1
-        if peek_pos > len(self.text) - 1:
-            return None
+            codes, starts, ends = scanRegex(self.text)
+        if ERROR_CODE in codes:
+            # the Parser can not go further anyway
+            n = codes.index(ERROR_CODE) + 1
+            del codes[n:], starts[n:], ends[n:]
         else:
-            return self.text[peek_pos]
-
-    def skip_whitespace(self):
-        while self.current_char is not None and self.current_char.isspace():
-            self.advance()
+            # the EOF starts and ends at the end of the text
+            codes.append(EOF_CODE)
+            starts.append(self.length)
+            ends.append(self.length)
+        self.codes, self.starts, self.ends = codes, starts, ends
+
+    @property
+    def current_char(self):
+        """ Character that directly follows the last token served, None at the end of input """
+        if self.pos < self.length:
+            return self.text[self.pos]
+        return None
 
-    def skip_comment(self):
-        while self.current_char != '#':
-            self.advance()
-        self.advance()  # the closing #
-
-    def number(self):
-        """Return a (multidigit) integer consumed from the input."""
-        result = ''
-        while self.current_char is not None and self.current_char.isdigit():
-            result += self.current_char
-            self.advance()
-
-        token = Token('INTEGER_CONST', int(result))
-
-        return token
-
-    def _id(self):
-        """Handle identifiers and reserved keywords"""
-        result = ''
-        while self.current_char is not None and self.current_char.isalnum():
-            result += self.current_char
-            self.advance()
-
-        token = RESERVED_KEYWORDS.get(result, Token(ID, result))
-        return token
+    def error(self):
+        raise Exception('Invalid character ' + str(self.current_char))
 
     def get_next_token(self):
         """Lexical analyzer (also known as scanner or tokenizer)
-        This method is responsible for breaking a sentence
-        apart into tokens. One token at a time.
+        Serve the next token of the arrays filled by tokenize(),
+        the EOF token is served again once reached
         """
-        while self.current_char is not None:
-
-            if self.current_char.isspace():
-                self.skip_whitespace()
-                continue
-
-            if self.current_char == '#':
-                self.advance()
-                self.skip_comment()
-                continue
-
-            if self.current_char.isalpha():
-                return self._id()
-
-            if self.current_char == '|':
-                self.advance()
-                return Token(PIPE, '|')
-
-            if self.current_char.isdigit():
-                return self.number()
-
-            if self.current_char == '=' and self.peek() != '=':
-                self.advance()
-                self.advance()
-                return Token(ASSIGN, '=')
-
-            if self.current_char == ';':
-                self.advance()
-                return Token(SEMI, ';')
-
-            if self.current_char == ':':
-                self.advance()
-                return Token(COLON, ':')
-
-            if self.current_char == '+':
-                self.advance()
-                return Token(PLUS, '+')
-
-            if self.current_char == '-':
-                self.advance()
-                return Token(MINUS, '-')
-
-            if self.current_char == '*':
-                self.advance()
-                return Token(MUL, '*')
-
-            if self.current_char == '/':
-                self.advance()
-                return Token(DIV, '/')
-
-            if self.current_char == '(':
-                self.advance()
-                return Token(LPAREN, '(')
-
-            if self.current_char == ')':
-                self.advance()
-                return Token(RPAREN, ')')
-
-            if self.current_char == '{':
-                self.advance()
-                return Token(LBRACKET, '{')
-
-            if self.current_char == '}':
-                self.advance()
-                return Token(RBRACKET, '}')
-
-            if self.current_char == '<':
-                self.advance()
-                return Token(INFERIOR, '<')
-
-            if self.current_char == '>':
-                self.advance()
-                return Token(SUPERIOR, '>')
-
-            if self.current_char == '=' and self.peek() == '=':
-                self.advance()
-                self.advance()
-                return Token(EQUAL, '==')
-
-            self.error()
-
-        return Token(EOF, None)
-
-
+        index = self.index
+        code = self.codes[index]
+        self.pos = self.ends[index]
+        token = SHARED_TOKENS[code]
+        if token is None:
+            if code == ERROR_CODE:
+                self.pos = self.starts[index]
+                self.error()
+            token = self.lexeme_tokens[self.text[self.starts[index]:self.pos]]
+        elif token is EOF_TOKEN:
+            return token
+        self.index = index + 1
+        return token
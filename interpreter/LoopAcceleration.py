@@ -0,0 +1,210 @@
+from interpreter.NodeVisitor import NodeVisitor, PLUS, MINUS, MUL, DIV, SUPERIOR, INFERIOR, EQUAL, VarCollector
+
+###############################################################################
+#                                                                             #
+#  ACCELERATION OF AFFINE WHILE LOOPS                                         #
+#                                                                             #
+###############################################################################
+
+# events of an iteration on the toUse list of the interpreter
+READ = 0
+ASSIGN = 1
+
+
+class NotAffine(Exception):
+    """ The expression is not affine in the variables assigned by the loop """
+
+
+class AffineEvaluator(NodeVisitor):
+    """
+    Evaluate an expression as an affine form of the values of the variables assigned by
+    a loop, the other variables being read in the scope. A form is a pair (coefficients,
+    constant), coefficients[i] being the one of AffineLoop.names[i]
+    """
+    def __init__(self, index, scope, forms):
+        """
+        :param index: dict variable assigned by the loop -> its index in the coefficients
+        :param forms: forms[i], current value of the variable i
+        """
+        self.index = index
+        self.scope = scope
+        self.forms = forms
+        self.zero = (0,) * len(index)
+
+    def visit_Num(self, node):
+        return (self.zero, node.value)
+
+    def visit_Var(self, node):
+        if node.value in self.index:
+            return self.forms[self.index[node.value]]
+        return (self.zero, self.scope[node.value])
+
+    def visit_UnaryOp(self, node):
+        coefficients, constant = self.visit(node.expr)
+        if node.op.type == MINUS:
+            return (tuple(-c for c in coefficients), -constant)
+        return (coefficients, constant)
+
+    def visit_BinOp(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        op = node.op.type
+        if op == PLUS:
+            return (tuple(a + b for a, b in zip(left[0], right[0])), left[1] + right[1])
+        elif op == MINUS:
+            return (tuple(a - b for a, b in zip(left[0], right[0])), left[1] - right[1])
+        elif op == MUL:
+            if left[0] == self.zero:
+                left, right = right, left
+            if right[0] != self.zero:
+                raise NotAffine()
+            return (tuple(c * right[1] for c in left[0]), left[1] * right[1])
+        elif op == DIV:
+            # a constant division only, a division by 0 is left to the interpreter
+            if left[0] != self.zero or right[0] != self.zero or right[1] == 0:
+                raise NotAffine()
+            return (self.zero, left[1] // right[1])
+        raise NotAffine()
+
+
+class AffineLoop:
+    """
+    WHILE whose body is a sequence of assigments without decision: an iteration is then
+    an affine map of the variables it assigns (once the variables it only reads are
+    known) and its condition an affine form of them, g < 0, g > 0 or g == 0.
+    When every variable is only translated (x = x + c for the whole iteration) the number
+    of iterations is computed in closed form, else the map is iterated on the integers
+    without evaluating the AST. The state reached, the iterations and the toUse list of
+    the interpreter are the ones the interpreter would have produced, the caller adds
+    the labels the iterations visit
+    """
+    def __init__(self, condition, assigns):
+        """
+        :param condition: condition node of the WHILE (BinOp)
+        :param assigns: Assign nodes of one iteration, in execution order
+        """
+        self.condition = condition
+        self.assigns = assigns
+        self.names = []
+        for assign in assigns:
+            if assign.left.value not in self.names:
+                self.names.append(assign.left.value)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        collector = VarCollector()
+        # events of an iteration on toUse, in the order the interpreter makes them
+        self.events = [(READ, name) for name in collector.collect(condition)]
+        for assign in assigns:
+            self.events.append((ASSIGN, assign.left.value))
+            self.events += [(READ, name) for name in collector.collect(assign.right)]
+        self.variables = set(name for _, name in self.events)
+
+    def useAfter(self, interpreter):
+        """ :return: toUse after any number of iterations, None if it changes or one raises """
+        states = [interpreter.toUse]
+        for _ in range(2):
+            to_use = list(states[-1])
+            for event, name in self.events:
+                if event == READ:
+                    if name in to_use:
+                        to_use.remove(name)
+                elif name not in to_use:
+                    to_use.append(name)
+                elif interpreter.raiseExceptionIfNotUsed:
+                    return None
+            states.append(to_use)
+        return states[1] if states[1] == states[2] else None
+
+    def holds(self, g):
+        op = self.condition.op.type
+        if op == INFERIOR:
+            return g < 0
+        if op == SUPERIOR:
+            return g > 0
+        return g == 0
+
+    def accelerate(self, interpreter, max_iterations=None):
+        """
+        Run the iterations of the loop from the state of the interpreter at its head,
+        stopping before the evaluation of the condition that exits the loop
+        :param max_iterations: the loop is not accelerated if it iterates more
+        :return: number of iterations, None if the loop is not accelerated (state unchanged)
+        """
+        scope = interpreter.GLOBAL_SCOPE
+        if any(scope.get(name) is None for name in self.variables):
+            return None
+        to_use = self.useAfter(interpreter)
+        if to_use is None:
+            return None
+        m = len(self.names)
+        units = [(tuple(int(i == j) for j in range(m)), 0) for i in range(m)]
+        forms = list(units)
+        evaluator = AffineEvaluator(self.index, scope, forms)
+        try:
+            for assign in self.assigns:
+                forms[self.index[assign.left.value]] = evaluator.visit(assign.right)
+            evaluator.forms = units
+            left = evaluator.visit(self.condition.left)
+            right = evaluator.visit(self.condition.right)
+        except NotAffine:
+            return None
+        if self.condition.op.type not in (INFERIOR, SUPERIOR, EQUAL):
+            return None
+        # condition g(x) = a.x + b
+        a = [l - r for l, r in zip(left[0], right[0])]
+        b = left[1] - right[1]
+        values = [scope[name] for name in self.names]
+        g = sum(c * x for c, x in zip(a, values)) + b
+        if all(forms[i][0] == units[i][0] for i in range(m)):
+            steps = [constant for _, constant in forms]
+            iterations = self.translations(g, sum(c * d for c, d in zip(a, steps)))
+            if iterations is None or (max_iterations is not None and iterations > max_iterations):
+                return None
+            values = [x + iterations * d for x, d in zip(values, steps)]
+        else:
+            iterations = 0
+            while self.holds(g):
+                if iterations == max_iterations:
+                    return None
+                values = [sum(c * x for c, x in zip(coefficients, values)) + constant
+                          for coefficients, constant in forms]
+                g = sum(c * x for c, x in zip(a, values)) + b
+                iterations += 1
+        if iterations > 0:
+            for name, value in zip(self.names, values):
+                scope[name] = value
+            interpreter.toUse[:] = to_use
+        return iterations
+
+    def translations(self, g, delta):
+        """ :return: iterations while g + k * delta holds, None if the loop never exits """
+        if not self.holds(g):
+            return 0
+        op = self.condition.op.type
+        if op == INFERIOR and delta > 0:
+            return (-g + delta - 1) // delta
+        if op == SUPERIOR and delta < 0:
+            return (g - delta - 1) // -delta
+        if op == EQUAL and delta != 0:
+            return 1
+        return None
+
+
+def whileLoop(node):
+    """
+    :param node: WhileBlock of the AST, the result is kept on it for the next entries
+    :return: (AffineLoop, labels visited by an iteration), None if its body has a decision
+    """
+    if not hasattr(node, 'affine_loop'):
+        node.affine_loop = affineLoop(node)
+    return node.affine_loop
+
+
+def affineLoop(node):
+    assigns = []
+    labels = [node.cond_block.label]
+    for compound in node.block.compounds:
+        if compound.type != 'SIMPLE':
+            return None
+        labels.append(compound.cblock.label)
+        assigns += [s for s in compound.cblock.statement_list if type(s).__name__ == 'Assign']
+    return AffineLoop(node.cond_block.condition, assigns), labels
@@ -0,0 +1,67 @@
+###############################################################################
+#                                                                             #
+#  TOKEN TYPES AND AST VISITORS                                               #
+#                                                                             #
+###############################################################################
+
+# Token types
+#
+# EOF (end-of-file) token is used to indicate that
+# there is no more input left for lexical analysis
+INTEGER       = 'INTEGER'
+INTEGER_CONST = 'INTEGER_CONST'
+PLUS          = 'PLUS'
+MINUS         = 'MINUS'
+MUL           = 'MUL'
+DIV           = 'DIV'
+LPAREN        = 'LPAREN'
+RPAREN        = 'RPAREN'
+ID            = 'ID'
+LABEL         = 'LABEL'
+PIPE          = 'PIPE'
+ASSIGN        = 'ASSIGN'
+BEGIN         = 'BEGIN'
+END           = 'END'
+SEMI          = 'SEMI'
+COLON         = 'COLON'
+LBRACKET      = 'LBRACKET'
+RBRACKET      = 'RBRACKET'
+INFERIOR      = 'INFERIOR'
+SUPERIOR      = 'SUPERIOR'
+EQUAL         = 'EQUAL'
+IF            = 'IF'
+ELSE          = 'ELSE'
+WHILE         = 'WHILE'
+EOF           = 'EOF'
+
+class NodeVisitor(object):
+    def visit(self, node):
+        # to debug and follow which node is visited
+        #print(type(node).__name__)
+        method_name = 'visit_' + type(node).__name__
+        visitor = getattr(self, method_name, self.generic_visit)
+        return visitor(node)
+
+    def generic_visit(self, node):
+        raise Exception('No visit_{} method'.format(type(node).__name__))
+
+
+class VarCollector(NodeVisitor):
+    """ Names of the variables read by an expression, in evaluation order """
+    def collect(self, node):
+        self.names = []
+        self.visit(node)
+        return self.names
+
+    def visit_BinOp(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+
+    def visit_UnaryOp(self, node):
+        self.visit(node.expr)
+
+    def visit_Num(self, node):
+        pass
+
+    def visit_Var(self, node):
+        self.names.append(node.value)
@@ -0,0 +1,362 @@
+import collections
+import hashlib
+from interpreter.NodeVisitor import NodeVisitor, PLUS, MINUS, MUL, DIV, SUPERIOR, INFERIOR, EQUAL
+from interpreter.Lexer import Lexer
+from interpreter.Parser import Parser
+
+###############################################################################
+#                                                                             #
+#  PYTHON CODE GENERATION                                                     #
+#                                                                             #
+###############################################################################
+
+OPERATORS = {
+    PLUS: '+',
+    MINUS: '-',
+    MUL: '*',
+    DIV: '//',
+    SUPERIOR: '>',
+    INFERIOR: '<',
+    EQUAL: '==',
+}
+
+# prefix of the generated local variables, so that program variables
+# never clash with python keywords or with the function arguments
+VAR_PREFIX = 'v_'
+
+# compiled programs, indexed by the hash of their source text
+_CACHE = {}
+
+
+class PythonCompiler(NodeVisitor):
+    """
+    Transpile a Program AST into the source of one python function
+    program(scope, hits) : program variables are python locals initialized
+    from scope and every label hit is an increment of hits[index of label]
+    """
+    # arguments of the generated function
+    ARGUMENTS = 'scope, hits'
+
+    def __init__(self):
+        self.lines = []
+        self.indent = 1
+        self.labels = []
+        self.variables = []
+
+    def emit(self, line):
+        self.lines.append('    ' * self.indent + line)
+
+    def hit(self, label):
+        self.labels.append(label)
+        self.emit('hits[{}] += 1'.format(len(self.labels) - 1))
+
+    def expression(self, node):
+        """ Python expression of an expression or condition node of the AST """
+        return self.visit(node)
+
+    def var(self, name):
+        if name not in self.variables:
+            self.variables.append(name)
+        return VAR_PREFIX + name
+
+    def generate(self, tree):
+        self.visit(tree)
+        body = self.lines
+        self.lines = []
+        self.emit('try:')
+        self.lines += ['    ' + line for line in body]
+        for line in self.handlers() + self.epilogue():
+            self.emit(line)
+        header = ['def program({}):'.format(self.ARGUMENTS)] + ['    ' + line for line in self.prologue()]
+        for name in self.variables:
+            header.append('    if {0!r} in scope: {1} = scope[{0!r}]'.format(name, VAR_PREFIX + name))
+        return '\n'.join(header + self.lines) + '\n'
+
+    def prologue(self):
+        """ Lines run before the initialization of the variables """
+        return []
+
+    def handlers(self):
+        """ Except clauses of the body, a variable used before being defined raises like Interpreter """
+        return ['except UnboundLocalError as e:',
+                '    raise RuntimeError(undefined(e)) from None']
+
+    def epilogue(self):
+        """ Lines returning the result of the function """
+        return ['values = locals()',
+                'return [(name, values[VAR_PREFIX + name]) for name in variables if VAR_PREFIX + name in values]']
+
+    def visit_Program(self, node):
+        for compound in node.compounds:
+            self.visit(compound)
+
+    def visit_Compound(self, node):
+        self.visit(node.cblock)
+
+    def visit_Block(self, node):
+        self.hit(node.label)
+        for statement in node.statement_list:
+            self.visit(statement)
+
+    def visit_IfBlock(self, node):
+        self.hit(node.cond_block.label)
+        self.emit('if {}:'.format(self.expression(node.cond_block.condition)))
+        self.indent += 1
+        self.visit(node.block_true)
+        self.indent -= 1
+        if type(node.block_false).__name__ != 'NoOp':
+            self.emit('else:')
+            self.indent += 1
+            self.visit(node.block_false)
+            self.indent -= 1
+
+    def visit_WhileBlock(self, node):
+        self.emit('while True:')
+        self.indent += 1
+        self.hit(node.cond_block.label)
+        self.emit('if not ({}): break'.format(self.expression(node.cond_block.condition)))
+        self.visit(node.block)
+        self.indent -= 1
+
+    def visit_Assign(self, node):
+        self.emit('{} = {}'.format(self.var(node.left.value), self.expression(node.right)))
+
+    def visit_BinOp(self, node):
+        return '({} {} {})'.format(self.visit(node.left), OPERATORS[node.op.type], self.visit(node.right))
+
+    def visit_UnaryOp(self, node):
+        return '({}{})'.format('-' if node.op.type == MINUS else '+', self.visit(node.expr))
+
+    def visit_Num(self, node):
+        return str(node.value)
+
+    def visit_Var(self, node):
+        return self.var(node.value)
+
+    def visit_NoOp(self, node):
+        pass
+
+
+class PathCompiler(PythonCompiler):
+    """
+    Transpile a Program AST into program(scope, trace, max_steps) appending the
+    label of every block and decision visited to trace: trace is then the path
+    of the CFG visited by CfgInterpreter.interpretCfg. A RuntimeError is raised
+    when a WHILE is entered with more than max_steps labels in trace
+    """
+    ARGUMENTS = 'scope, trace, max_steps'
+
+    def prologue(self):
+        return ['visit = trace.append']
+
+    def epilogue(self):
+        return ['return trace']
+
+    def hit(self, label):
+        self.labels.append(label)
+        self.emit('visit({!r})'.format(label.value))
+
+    def visit_WhileBlock(self, node):
+        self.emit('while True:')
+        self.indent += 1
+        self.hit(node.cond_block.label)
+        self.emit('if len(trace) > max_steps: raise RuntimeError(too_long(max_steps))')
+        self.emit('if not ({}): break'.format(self.expression(node.cond_block.condition)))
+        self.visit(node.block)
+        self.indent -= 1
+
+
+class TraceCompiler(PythonCompiler):
+    """
+    Transpile a Program AST into program(scope, trace, toUse, strict, out) doing what
+    interpreter.Interpreter does: the index of every label visited is appended to
+    trace, in execution order, and toUse is kept up to date, an assigment of a
+    variable still in toUse raising a RuntimeError when strict is set. The variables
+    are appended to out as (name, value), also when the program raises.
+    Expressions are evaluated in the order of Interpreter: each variable read leaves
+    toUse then raises if undefined, a division is done once both its operands are read
+    """
+    ARGUMENTS = 'scope, trace, toUse, strict, out'
+
+    def __init__(self):
+        PythonCompiler.__init__(self)
+        self.temporaries = 0
+
+    def prologue(self):
+        return ['visit = trace.append']
+
+    def handlers(self):
+        return ['except UnboundLocalError as e:',
+                '    error = RuntimeError(undefined(e))',
+                'except (RuntimeError, ArithmeticError) as e:',
+                '    error = e',
+                'else:',
+                '    error = None']
+
+    def epilogue(self):
+        return ['values = locals()',
+                'out.extend((name, values[VAR_PREFIX + name]) for name in variables if VAR_PREFIX + name in values)',
+                'if error is not None: raise error']
+
+    def hit(self, label):
+        self.labels.append(label)
+        self.emit('visit({})'.format(len(self.labels) - 1))
+
+    def visit_Assign(self, node):
+        name = node.left.value
+        self.emit('if {0!r} not in toUse: toUse.append({0!r})'.format(name))
+        self.emit('elif strict: raise RuntimeError(not_used({!r}))'.format(name))
+        PythonCompiler.visit_Assign(self, node)
+
+    def visit_BinOp(self, node):
+        code = PythonCompiler.visit_BinOp(self, node)
+        if node.op.type != DIV:
+            return code
+        # a division by zero raises before the right of the enclosing expression is read
+        self.temporaries += 1
+        temporary = '_t{}'.format(self.temporaries)
+        self.emit('{} = {}'.format(temporary, code))
+        return temporary
+
+    def visit_Var(self, node):
+        name = node.value
+        var = self.var(name)
+        self.emit('if {0!r} in toUse: toUse.remove({0!r})'.format(name))
+        # raises UnboundLocalError here if the variable is not defined yet
+        self.emit(var)
+        return var
+
+
+def too_long(max_steps):
+    """ Same message as cfg.CfgInterpreter.interpretCfg """
+    return 'More than {} nodes visited'.format(max_steps)
+
+
+def not_used(var_name):
+    """ Same message as interpreter.Interpreter for a variable assigned twice without being used """
+    return 'Var "{}" not used after declaration'.format(var_name)
+
+
+def undefined(error):
+    """ Same message as interpreter.Interpreter for a variable used before being defined """
+    var_name = str(getattr(error, 'name', None) or str(error).split("'")[1])
+    if var_name.startswith(VAR_PREFIX):
+        var_name = var_name[len(VAR_PREFIX):]
+    return '{} is not defined, it can\'t be used - check that {} is defined in program or in datatest'.format(var_name, var_name)
+
+
+class CompiledProgram:
+    """ A program transpiled to python and compiled, reusable for every datatest """
+    def __init__(self, tree, labels, compiler=None):
+        compiler = compiler or PythonCompiler()
+        self.source = compiler.generate(tree)
+        self.labels = labels
+        self.hit_labels = compiler.labels
+        self.variables = compiler.variables
+        namespace = {'VAR_PREFIX': VAR_PREFIX, 'variables': self.variables, 'undefined': undefined,
+                     'too_long': too_long, 'not_used': not_used}
+        exec(compile(self.source, '<ivf program>', 'exec'), namespace)
+        self.function = namespace['program']
+
+    def run(self, scope=None):
+        """
+        :param scope: initial values of the variables (ex: {'X': -1})
+        :return: (final scope, hits) where hits[i] counts the visits of hit_labels[i]
+        """
+        scope = scope or {}
+        hits = [0] * len(self.hit_labels)
+        values = collections.OrderedDict(scope)
+        values.update(self.function(scope, hits))
+        return values, hits
+
+
+class CompiledPaths(CompiledProgram):
+    """ A program compiled by PathCompiler """
+    def __init__(self, tree, labels):
+        CompiledProgram.__init__(self, tree, labels, PathCompiler())
+
+    def run(self, scope=None, max_steps=None):
+        """
+        :param scope: initial values of the variables (ex: {'X': -1})
+        :param max_steps: maximum number of labels visited, a RuntimeError is raised beyond
+        :return: list of the labels visited
+        """
+        return self.function(scope or {}, [], float('inf') if max_steps is None else max_steps)
+
+
+def compilePaths(text, parser=None):
+    """
+    Compile a program recording the path it visits, compiled programs are cached by source hash
+    :param parser: parser on text to use when the program is not in cache yet
+    :return: CompiledPaths
+    """
+    key = 'paths:' + hashlib.sha1(text.encode('utf-8')).hexdigest()
+    compiled = _CACHE.get(key)
+    if compiled is None:
+        if parser is None:
+            parser = Parser(Lexer(text))
+        compiled = CompiledPaths(parser.parse(), list(parser.labels))
+        _CACHE[key] = compiled
+    return compiled
+
+
+class CompiledTrace(CompiledProgram):
+    """ A program compiled by TraceCompiler """
+    def __init__(self, tree, labels):
+        CompiledProgram.__init__(self, tree, labels, TraceCompiler())
+
+    def run(self, scope, visited, toUse=None, strict=False):
+        """
+        Run the program, the state is updated in place also when it raises
+        :param scope: initial values of the variables, then their final values
+        :param visited: the labels visited are appended to it
+        :param toUse: variables assigned and not used yet
+        """
+        trace = []
+        values = []
+        try:
+            self.function(scope, trace, [] if toUse is None else toUse, strict, values)
+        finally:
+            scope.update(values)
+            visited.extend(map(self.hit_labels.__getitem__, trace))
+
+
+def compileTrace(text, parser=None):
+    """
+    Compile a program tracing its labels and toUse, cached by source hash like compilePaths
+    :return: CompiledTrace
+    """
+    key = 'trace:' + hashlib.sha1(text.encode('utf-8')).hexdigest()
+    compiled = _CACHE.get(key)
+    if compiled is None:
+        if parser is None:
+            parser = Parser(Lexer(text))
+        compiled = CompiledTrace(parser.parse(), list(parser.labels))
+        _CACHE[key] = compiled
+    return compiled
+
+
+class CompiledInterpreter:
+    """
+    Drop-in replacement of interpreter.Interpreter running the compiled python
+    function of the program, GLOBAL_SCOPE, visited and toUse behave like in
+    Interpreter, also when it raises. The program is compiled once per source
+    text (see compileTrace), reset() gives a fresh state to run it again
+    """
+    def __init__(self, parser):
+        self.parser = parser
+        self.compiled = None
+        self.reset()
+
+    def reset(self):
+        self.GLOBAL_SCOPE = collections.OrderedDict()
+        self.visited = []
+        self.toUse = []
+        self.raiseExceptionIfNotUsed = False
+
+    def interpret(self):
+        if self.compiled is None:
+            self.compiled = compileTrace(self.parser.lexer.text, self.parser)
+            # the parser is skipped when the program is in cache, it still exposes the labels
+            self.parser.labels = list(self.compiled.labels)
+        self.compiled.run(self.GLOBAL_SCOPE, self.visited, self.toUse, self.raiseExceptionIfNotUsed)
@@ -0,0 +1,234 @@
+import collections
+from interpreter.NodeVisitor import NodeVisitor, PLUS, MINUS, MUL, DIV, SUPERIOR, INFERIOR, EQUAL
+
+###############################################################################
+#                                                                             #
+#  BYTECODE VIRTUAL MACHINE                                                   #
+#                                                                             #
+###############################################################################
+
+# Opcodes of the stack bytecode
+#
+# MARK appends a label to the visited list, DEFINE does the toUse
+# bookkeeping of an assigment before its right side is evaluated
+LOAD_CONST    = 0
+LOAD_VAR      = 1
+DEFINE        = 2
+STORE         = 3
+ADD           = 4
+SUB           = 5
+MUL_OP        = 6
+DIV_OP        = 7
+GT            = 8
+LT            = 9
+EQ            = 10
+NEG           = 11
+MARK          = 12
+JUMP          = 13
+JUMP_IF_FALSE = 14
+
+OPNAMES = ['LOAD_CONST', 'LOAD_VAR', 'DEFINE', 'STORE', 'ADD', 'SUB', 'MUL', 'DIV',
+           'GT', 'LT', 'EQ', 'NEG', 'MARK', 'JUMP', 'JUMP_IF_FALSE']
+
+BINARY_OPCODES = {
+    PLUS: ADD,
+    MINUS: SUB,
+    MUL: MUL_OP,
+    DIV: DIV_OP,
+    SUPERIOR: GT,
+    INFERIOR: LT,
+    EQUAL: EQ,
+}
+
+
+class Bytecode:
+    """ Flat bytecode of a program: parallel lists of opcodes and arguments """
+    def __init__(self):
+        self.ops = []
+        self.args = []
+
+    def emit(self, op, arg=None):
+        self.ops.append(op)
+        self.args.append(arg)
+        return len(self.ops) - 1
+
+    def patch(self, pos, target):
+        self.args[pos] = target
+
+    def here(self):
+        return len(self.ops)
+
+    def __str__(self):
+        lines = []
+        for pos, (op, arg) in enumerate(zip(self.ops, self.args)):
+            if op == MARK:
+                arg = arg.value
+            lines.append('{:4d} {:<14} {}'.format(pos, OPNAMES[op], '' if arg is None else arg))
+        return '\n'.join(lines)
+
+
+class BytecodeCompiler(NodeVisitor):
+    """ Compile a Program AST (see interpreter.Parser) into a Bytecode """
+    def __init__(self):
+        self.code = Bytecode()
+
+    def compile(self, tree):
+        self.visit(tree)
+        return self.code
+
+    def visit_Program(self, node):
+        for compound in node.compounds:
+            self.visit(compound)
+
+    def visit_Compound(self, node):
+        self.visit(node.cblock)
+
+    def visit_Block(self, node):
+        self.code.emit(MARK, node.label)
+        for statement in node.statement_list:
+            self.visit(statement)
+
+    def visit_CondBlock(self, node):
+        self.code.emit(MARK, node.label)
+        self.visit(node.condition)
+
+    def visit_IfBlock(self, node):
+        self.visit(node.cond_block)
+        jump_false = self.code.emit(JUMP_IF_FALSE)
+        self.visit(node.block_true)
+        if type(node.block_false).__name__ == 'NoOp':
+            self.code.patch(jump_false, self.code.here())
+        else:
+            jump_end = self.code.emit(JUMP)
+            self.code.patch(jump_false, self.code.here())
+            self.visit(node.block_false)
+            self.code.patch(jump_end, self.code.here())
+
+    def visit_WhileBlock(self, node):
+        start = self.code.here()
+        self.visit(node.cond_block)
+        jump_false = self.code.emit(JUMP_IF_FALSE)
+        self.visit(node.block)
+        self.code.emit(JUMP, start)
+        self.code.patch(jump_false, self.code.here())
+
+    def visit_Assign(self, node):
+        var_name = node.left.value
+        self.code.emit(DEFINE, var_name)
+        self.visit(node.right)
+        self.code.emit(STORE, var_name)
+
+    def visit_BinOp(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+        self.code.emit(BINARY_OPCODES[node.op.type])
+
+    def visit_UnaryOp(self, node):
+        if type(node.expr).__name__ == 'Num':
+            # fold constants like -1
+            value = node.expr.value
+            self.code.emit(LOAD_CONST, -value if node.op.type == MINUS else value)
+            return
+        self.visit(node.expr)
+        if node.op.type == MINUS:
+            self.code.emit(NEG)
+
+    def visit_Num(self, node):
+        self.code.emit(LOAD_CONST, node.value)
+
+    def visit_Var(self, node):
+        self.code.emit(LOAD_VAR, node.value)
+
+    def visit_NoOp(self, node):
+        pass
+
+
+class VirtualMachine:
+    """
+    Alternative execution engine to interpreter.Interpreter : the program is
+    compiled into a Bytecode run by a single dispatch loop.
+    GLOBAL_SCOPE, visited and toUse behave like in Interpreter, the program is
+    compiled once and run again after each reset()
+    """
+    def __init__(self, parser):
+        self.parser = parser
+        self.code = None
+        self.reset()
+
+    def reset(self):
+        self.GLOBAL_SCOPE = collections.OrderedDict()
+        self.visited = []
+        self.toUse = []
+        self.raiseExceptionIfNotUsed = False
+
+    def run(self, code):
+        ops = code.ops
+        args = code.args
+        n = len(ops)
+        scope = self.GLOBAL_SCOPE
+        visited = self.visited
+        toUse = self.toUse
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        while pc < n:
+            op = ops[pc]
+            arg = args[pc]
+            pc += 1
+            if op == LOAD_VAR:
+                value = scope.get(arg)
+                if arg in toUse:
+                    toUse.remove(arg)
+                if value is None:
+                    raise RuntimeError('{} is not defined, it can\'t be used - check that {} is defined in program or in datatest'.format(arg, arg))
+                push(value)
+            elif op == LOAD_CONST:
+                push(arg)
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == MARK:
+                visited.append(arg)
+            elif op == STORE:
+                scope[arg] = pop()
+            elif op == DEFINE:
+                if arg not in toUse:
+                    toUse.append(arg)
+                elif self.raiseExceptionIfNotUsed:
+                    raise RuntimeError('Var "{}" not used after declaration'.format(arg))
+            elif op == ADD:
+                right = pop()
+                push(pop() + right)
+            elif op == SUB:
+                right = pop()
+                push(pop() - right)
+            elif op == MUL_OP:
+                right = pop()
+                push(pop() * right)
+            elif op == DIV_OP:
+                right = pop()
+                push(pop() // right)
+            elif op == LT:
+                right = pop()
+                push(pop() < right)
+            elif op == GT:
+                right = pop()
+                push(pop() > right)
+            elif op == EQ:
+                right = pop()
+                push(pop() == right)
+            elif op == NEG:
+                push(-pop())
+            else:
+                raise Exception('Unknown opcode {}'.format(op))
+
+    def interpret(self):
+        if self.code is None:
+            tree = self.parser.parse()
+            if tree is None:
+                return ''
+            self.code = BytecodeCompiler().compile(tree)
+        return self.run(self.code)
@@ -0,0 +1,73 @@
+from criteria.CoverageEngine import CoverageEngine
+from criteria.Coverage import ASSIGN, DECISION, OUTCOME
+from interpreter.DatatestColumns import openDatatests
+import sys
+
+# usage : python main-all.py input/text_source_while_in_a_while.txt datatests/dt3.txt 10 7
+# each datatest is run once, TA, TD, TC (with K) and TB (with I), TDef and TU are checked together
+
+def main():
+    if len(sys.argv) != 5:
+        print('EXPECTING AS ARGV: SOURCE_CODE DATATESTSET K I')
+        exit()
+    text_source = open(sys.argv[1], 'r').read()
+    # text datatests are read one at a time, columnar ones are memory mapped
+    datatests = openDatatests(sys.argv[2])
+    K = int(sys.argv[3])
+    I = int(sys.argv[4])
+
+    engine = CoverageEngine(text_source, K, I)
+    i = 1
+    for dt in datatests:
+        """ Evaluate program once for each datatest """
+        print('====================================')
+        print('-------Datatest ' + str(i) + '--------')
+        print('====================================')
+        print('/------- Evaluating with initial assigments:  -------/ ')
+        print(dt.ini_assigns)
+        trace = engine.run(dt)
+        print('/------- Path visited -------/ ')
+        print(trace.path)
+        if trace.error is not None:
+            print('/------- Run stopped -------/ ')
+            print(trace.error)
+        print('/------- While with their labels and max iterations recorded -------/ ')
+        for key in trace.while_max.keys():
+            print("While {} iter {} ".format(key, trace.while_max[key]))
+        engine.add(trace)
+        print('/------- Variables final evaluation -------/ ')
+        for k, v in sorted(engine.cfginterpreter.interpreter.GLOBAL_SCOPE.items()):
+            print('%s = %s' % (k, v))
+        i += 1
+    print('====================================')
+    print('------- Result of datatest set (jeu de donnee) --------')
+    print('====================================')
+    print('/------- Labels ASSIGN not visited -------/ ')
+    print(engine.coverage.uncovered(ASSIGN))
+    print('/------- Labels DECISIONS not visited -------/ ')
+    print(engine.coverage.uncovered(DECISION))
+    print('/------- Decision outcomes (decision, successor) not visited -------/ ')
+    print(engine.coverage.uncovered(OUTCOME))
+    print('/------- Datatest covering first each label -------/ ')
+    first = engine.coverage.firstCovered(ASSIGN)
+    first.update(engine.coverage.firstCovered(DECISION))
+    print(dict(sorted((label, n + 1) for label, n in first.items())))
+    print('/------- Number of {}-paths not visited -------/'.format(K))
+    print(engine.pathanalysis.countUncovered())
+    print('/------- All while with their max i iterations over all dataset----/')
+    for key in engine.while_max.keys():
+        print("While {} has had a maximum of {} iterations".format(key, engine.while_max[key]))
+    print('/------- Variables declarations not used: -------/ ')
+    print(engine.unused)
+    print('/------- Def-use pairs (definition, use, variable) not visited -------/ ')
+    print(sorted(engine.defuse.pairs - engine.du_covered))
+    print()
+    names = {'ta': 'TA', 'td': 'TD', 'tc': 'TC for k = {}'.format(K), 'tb': 'TB for i = {}'.format(I), 'tdef': 'TDef', 'tu': 'TU'}
+    for criterion, (critere, coverage_rate) in engine.results().items():
+        line = '>> Critere {} {}'.format(names[criterion], 'TRUE' if critere else 'FALSE')
+        if coverage_rate is not None:
+            line += ' - Taux de couverture : {}%'.format(coverage_rate)
+        print(line)
+
+if __name__ == '__main__':
+    main()
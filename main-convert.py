@@ -0,0 +1,15 @@
+from interpreter.DatatestColumns import convert, isColumnar
+import sys
+
+# usage : python main-convert.py datatests/dt1.txt datatests/dt1.dtc
+# a text datatest set is converted to the columnar format, a columnar one to the text format
+
+def main():
+    if len(sys.argv) != 3:
+        print('EXPECTING AS ARGV: DATATESTSET DESTINATION')
+        exit()
+    convert(sys.argv[1], sys.argv[2])
+    print('{} written in {} format'.format(sys.argv[2], 'text' if isColumnar(sys.argv[1]) else 'columnar'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+from criteria.Fuzzer import Fuzzer, MAX_STEPS
+from criteria.Coverage import ASSIGN, DECISION, OUTCOME, EDGE
+from interpreter.DatatestColumns import openDatatests, writeText
+import argparse
+import time
+
+# usage : python main-fuzz.py input/text_source_complique.txt 10 --executions 1000000 --out datatests/fuzz.txt
+# inputs are mutated and kept when they cover a new label, decision outcome, edge or K-path,
+# the minimized corpus is written as a datatest set in OUT
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description='Grow a small datatest set by coverage-guided fuzzing'
+    )
+    argparser.add_argument('source', help='source code of the program')
+    argparser.add_argument('k', type=int, help='K of the k-paths (tc)')
+    argparser.add_argument('--datatestset', default=None, help='datatest set (jeu de test) used as initial corpus')
+    argparser.add_argument('--executions', type=int, default=1000000, help='number of inputs run')
+    argparser.add_argument('--timeout', type=float, default=None, help='maximum fuzzing time in seconds')
+    argparser.add_argument('--workers', type=int, default=None, help='number of processes (default: number of cores)')
+    argparser.add_argument('--batch', type=int, default=4096, help='number of inputs mutated and run at once by a process')
+    argparser.add_argument('--max-steps', type=int, default=MAX_STEPS, help='maximum number of labels visited by one run')
+    argparser.add_argument('--seed', type=int, default=None, help='seed of the random mutations')
+    argparser.add_argument('--out', default=None, help='file where the datatest set is written')
+    args = argparser.parse_args()
+
+    text_source = open(args.source, 'r').read()
+    fuzzer = Fuzzer(text_source, args.k, args.max_steps)
+    fuzzer.seed(openDatatests(args.datatestset) if args.datatestset is not None else [])
+    start = time.time()
+    fuzzer.run(args.executions, args.workers, args.batch, args.timeout, args.seed)
+    elapsed = time.time() - start
+    datatests = fuzzer.datatests()
+
+    print('/------- Inputs of the program -------/ ')
+    print(fuzzer.names)
+    print('/------- {} executions in {:.2f}s ({:.0f} per second) -------/ '.format(
+        fuzzer.executions, elapsed, fuzzer.executions / max(elapsed, 1e-9)))
+    print('/------- Datatests kept: {} (corpus of {}) -------/ '.format(len(datatests), len(fuzzer.entries)))
+    for dt in datatests:
+        print(dt.text)
+    if args.out is not None:
+        with open(args.out, 'w') as f:
+            writeText(f, datatests)
+    coverage = fuzzer.coverage
+    print('/------- Labels ASSIGN not visited -------/ ')
+    print(coverage.uncovered(ASSIGN))
+    print('/------- Labels DECISIONS not visited -------/ ')
+    print(coverage.uncovered(DECISION))
+    print('/------- Decision outcomes (decision, successor) not visited -------/ ')
+    print(coverage.uncovered(OUTCOME))
+    print('/------- Edges not visited -------/ ')
+    print(coverage.uncovered(EDGE))
+    print('/------- Number of {}-paths not visited -------/'.format(args.k))
+    print(fuzzer.pathanalysis.countUncovered())
+    print()
+    print('>> Critere TA {} - Taux de couverture : {}%'.format(
+        'TRUE' if coverage.uncovered(ASSIGN) == [] else 'FALSE', coverage.coverageRate(ASSIGN)))
+    print('>> Critere TD {} - Taux de couverture : {}%'.format(
+        'TRUE' if coverage.uncovered(DECISION) == [] else 'FALSE', coverage.coverageRate(DECISION)))
+    print('>> Critere TC for k = {} {} - Taux de couverture : {}%'.format(
+        args.k, 'TRUE' if fuzzer.pathanalysis.countUncovered() == 0 else 'FALSE', fuzzer.pathanalysis.coverageRate()))
+
+if __name__ == '__main__':
+    main()
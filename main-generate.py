@@ -0,0 +1,62 @@
+from criteria.CoverageEngine import CoverageEngine
+from criteria.Coverage import ASSIGN, DECISION
+from criteria.Solver import Solver, DEFAULT_BOUND
+from criteria.SymbolicExecution import generateDatatests
+from interpreter.DatatestColumns import openDatatests, writeText
+from interpreter.DatatestSet import Datatest
+import argparse
+
+# usage : python main-generate.py input/text_source_complique.txt ta --datatestset datatests/dt1.txt --out dt_ta.txt
+# usage : python main-generate.py input/text_source.txt tc 10
+# datatests are generated by symbolic execution for the labels (ta, td) or the k-paths (tc)
+# not covered by DATATESTSET, the completed datatest set is written in OUT
+
+DEFAULT_DEPTH = 100
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description='Generate datatests reaching what a datatest set does not cover'
+    )
+    argparser.add_argument('source', help='source code of the program')
+    argparser.add_argument('criterion', choices=('ta', 'td', 'tc'))
+    argparser.add_argument('param', nargs='?', type=int, help='K for tc')
+    argparser.add_argument('--datatestset', default=None, help='datatest set (jeu de test) already covering part of the program')
+    argparser.add_argument('--depth', type=int, default=DEFAULT_DEPTH, help='maximum number of edges of the explored paths (K for tc)')
+    argparser.add_argument('--bound', type=int, default=DEFAULT_BOUND, help='generated values are in [-BOUND, BOUND]')
+    argparser.add_argument('--out', default=None, help='file where the completed datatest set is written')
+    args = argparser.parse_args()
+    if args.criterion == 'tc' and args.param is None:
+        argparser.error('criterion tc expects PARAM')
+    depth = args.param if args.criterion == 'tc' else args.depth
+
+    text_source = open(args.source, 'r').read()
+    engine = CoverageEngine(text_source, depth, 0)
+    datatests = []
+    if args.datatestset is not None:
+        for dt in openDatatests(args.datatestset):
+            engine.add(engine.run(dt))
+            datatests.append(dt)
+
+    kind = DECISION if args.criterion == 'td' else ASSIGN
+    uncovered = set(engine.coverage.uncovered(kind))
+    labels = [l for l in engine.cfgparser.labels if l not in uncovered]
+    paths = engine.pathanalysis.coveredPaths()
+    generated = generateDatatests(engine.cfgparser, args.criterion, depth, labels, paths, Solver(args.bound))
+
+    print('/------- Datatests generated -------/ ')
+    for values in generated:
+        dt = Datatest.fromValues(values)
+        print(dt.text)
+        engine.add(engine.run(dt))
+        datatests.append(dt)
+    if args.out is not None:
+        with open(args.out, 'w') as f:
+            writeText(f, datatests)
+
+    critere, coverage_rate = engine.results()[args.criterion]
+    names = {'ta': 'TA', 'td': 'TD', 'tc': 'TC for k = {}'.format(depth)}
+    print('>> Critere {} {} - Taux de couverture : {}%'.format(names[args.criterion], 'TRUE' if critere else 'FALSE', coverage_rate))
+
+if __name__ == '__main__':
+    main()
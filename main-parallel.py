@@ -0,0 +1,33 @@
+from criteria.ParallelRunner import CRITERIA, runParallel, report
+from interpreter.DatatestColumns import openDatatests
+import argparse
+
+# usage : python main-parallel.py input/text_source.txt datatests/dt1.txt tc 10 --workers 32
+# PARAM is K for tc and I for tb, every criterion is evaluated like main-all (see CoverageEngine)
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description='Evaluate a criterion over a datatest set with a pool of processes'
+    )
+    argparser.add_argument('source', help='source code of the program')
+    argparser.add_argument('datatestset', help='datatest set (jeu de test)')
+    argparser.add_argument('criterion', choices=CRITERIA)
+    argparser.add_argument('param', nargs='?', type=int, help='K for tc, I for tb')
+    argparser.add_argument('--workers', type=int, default=None, help='number of processes (default: number of cores)')
+    argparser.add_argument('--chunksize', type=int, default=256, help='number of datatests sent at once to a process')
+    args = argparser.parse_args()
+    if args.criterion in ('tc', 'tb') and args.param is None:
+        argparser.error('criterion {} expects PARAM'.format(args.criterion))
+
+    text_source = open(args.source, 'r').read()
+    datatests = openDatatests(args.datatestset)
+    try:
+        engine = runParallel(args.criterion, text_source, datatests, args.param, args.workers, args.chunksize)
+    except RuntimeError as e:
+        # too many DU-paths for tdu
+        print(e)
+        exit()
+    report(args.criterion, engine, args.param)
+
+if __name__ == '__main__':
+    main()
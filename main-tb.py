@@ -1,6 +1,8 @@
 from cfg.CfgParser import CfgParser
 from cfg.CfgInterpreter import  CfgInterpreter
-from interpreter.DatatestSet import DatatestSet
+from cfg.LoopAnalysis import LoopBoundAnalysis
+from cfg.Cfg import WHILE_NODE
+from interpreter.DatatestColumns import DatatestColumns, openDatatests, inputRanges
 import sys
 
 # usage : python main-tb.py input/text_source_while_in_a_while.txt datatests/dt3.txt 7
@@ -10,27 +12,45 @@ def main():
         print('EXPECTING AS ARGV: SOURCE_CODE DATATESTSET I')
         exit()
     text_source = open(sys.argv[1], 'r').read()
-    text_datatestset = open(sys.argv[2], 'r').read()
+    # text datatests are read one at a time, columnar ones are memory mapped
+    datatests = openDatatests(sys.argv[2])
     I = int(sys.argv[3])
 
-    dts = DatatestSet(text_datatestset)
-    dts.parse()
+    """ Build the CFG once (or load it from the cache), it is shared by all datatests """
+    cfgparser = CfgParser.cached(text_source)
+    cfginterpreter = CfgInterpreter(cfgparser)
+
+    """ Bound the iterations of the while statically from the ranges of the inputs """
+    ranges = {}
+    if WHILE_NODE in cfgparser.cfg.kinds:
+        # a columnar set gives the min/max of its columns, a text one is read a second time
+        ranges = inputRanges(datatests if isinstance(datatests, DatatestColumns) else openDatatests(sys.argv[2]))
+    loopbounds = LoopBoundAnalysis(cfgparser.cfg, ranges)
+    forest = loopbounds.forest
+    print('/------- While with their static bounds of iterations -------/ ')
+    for key, bound in loopbounds.bounds.items():
+        h = cfgparser.cfg.ids[key]
+        parent = forest.parent.get(h)
+        inside = '' if parent is None else ' (in while {})'.format(cfgparser.cfg.labels[parent])
+        print("While {}{} bound {}".format(key, inside, 'unknown' if bound is None else bound))
+    proven = loopbounds.proven(I)
+
     i = 1
     while_dict_list = []
-    for dt in dts.datatests:
+    if len(proven) == len(loopbounds.bounds):
+        print('/------- Every while is bounded by {}, no datatest executed -------/ '.format(I))
+        datatests = []
+    for dt in datatests:
         """ Evaluate program for each datatest """
         print('====================================')
         print('-------Datatest ' + str(i) + '--------')
         print('====================================')
         """ Add assigments to program """
-        dt.parse()
         print('/------- Evaluating with initial assigments:  -------/ ')
         print(dt.ini_assigns)
-        """ Now Interpret program """
-        cfgparser = CfgParser(text_source)
-        cfgparser.parse()
-        cfginterpreter = CfgInterpreter(cfgparser)
-        cfginterpreter.interpretAssigments(dt.ini_assigns)
+        """ Now Interpret program on the shared CFG with a fresh state """
+        cfginterpreter.reset()
+        cfginterpreter.seed(dt.values)
         while_dict = cfginterpreter.interpretCfgForIWhile()
         print('/------- While with their labels and max iterations recorded -------/ ')
         for key in while_dict.keys():
@@ -47,6 +67,8 @@ def main():
     while_dict_max = {}
     for while_dict in while_dict_list:
         for key in while_dict.keys():
+            if key in proven:
+                continue
             if key not in while_dict_max.keys():
                 while_dict_max[key] = while_dict[key][1]
             else:
@@ -54,6 +76,8 @@ def main():
                     while_dict_max[key] = while_dict[key][1]
 
     critere = True
+    for key in proven:
+        print("While {} is statically bounded by {} iterations".format(key, loopbounds.bounds[key]))
     for key in while_dict_max.keys():
         if while_dict_max[key] > I:
             critere = False
@@ -1,41 +1,45 @@
 from cfg.CfgParser import CfgParser
 from cfg.CfgInterpreter import  CfgInterpreter
-from interpreter.DatatestSet import DatatestSet
+from cfg.PathAnalysis import PathAnalysis
+from interpreter.DatatestColumns import openDatatests
 import sys
 
 # usage : python main-tc.py input/text_source.txt datatests/dt1.txt 10
 
+# maximum number of paths not visited printed
+MAX_PRINTED_PATHS = 100
+
 def main():
     if len(sys.argv) != 4:
         print('EXPECTING AS ARGV: SOURCE_CODE DATATESTSET K')
         exit()
     text_source = open(sys.argv[1], 'r').read()
-    text_datatestset = open(sys.argv[2], 'r').read()
+    # text datatests are read one at a time, columnar ones are memory mapped
+    datatests = openDatatests(sys.argv[2])
     K = int(sys.argv[3])
 
-    dts = DatatestSet(text_datatestset)
-    dts.parse()
+    """ Build the CFG once (or load it from the cache), it is shared by all datatests """
+    cfgparser = CfgParser.cached(text_source)
+    cfginterpreter = CfgInterpreter(cfgparser)
+    pathanalysis = PathAnalysis(cfginterpreter, K)
+
     i = 1
-    visited = []
-    for dt in dts.datatests:
+    for dt in datatests:
         """ Evaluate program for each datatest """
         print('====================================')
         print('-------Datatest ' + str(i) + '--------')
         print('====================================')
         """ Add assigments to program """
-        dt.parse()
         print('/------- Evaluating with initial assigments:  -------/ ')
         print(dt.ini_assigns)
-        """ Now Interpret program """
-        cfgparser = CfgParser(text_source)
-        cfgparser.parse()
-        cfginterpreter = CfgInterpreter(cfgparser)
-        cfginterpreter.interpretAssigments(dt.ini_assigns)
+        """ Now Interpret program on the shared CFG with a fresh state """
+        cfginterpreter.reset()
+        cfginterpreter.seed(dt.values)
         cfginterpreter.interpretCfg()
         print('/------- Path visited -------/ ')
         i_visited = cfginterpreter.visited
         print(i_visited)
-        visited.append(i_visited)
+        pathanalysis.addVisited(i_visited)
         print('/------- Variables final evaluation -------/ ')
         for k, v in sorted(cfginterpreter.interpreter.GLOBAL_SCOPE.items()):
             print('%s = %s' % (k, v))
@@ -44,30 +48,49 @@ def main():
     print('------- Result of datatest set (jeu de donnee) --------')
     print('====================================')
     print('/------- All paths visited-------/')
-    print(visited)
-    print('/------- All paths -------/')
-    k_paths = []
-    for path in cfginterpreter.getPaths(K):
-        k_paths.append(path)
-    print(k_paths)
-    print('/------- Paths not visited -------/')
-    not_visited = [ path for path in k_paths if path  not in visited]
+    print([list(path) for path in sorted(pathanalysis.visited)])
+    print('/------- Number of {}-paths -------/'.format(K))
+    n_paths = pathanalysis.countPaths()
+    print(n_paths)
+    print('/------- Number of feasible {}-paths (interval analysis) -------/'.format(K))
+    try:
+        n_feasible = pathanalysis.countFeasible()
+        print(n_feasible)
+    except RuntimeError as e:
+        n_feasible = None
+        print('unknown : {}'.format(e))
+    n_not_visited = pathanalysis.countUncovered()
+    if n_feasible is None:
+        print('/------- Paths not visited -------/')
+        not_visited = list(pathanalysis.uncoveredPaths(MAX_PRINTED_PATHS))
+        n_listed = n_not_visited
+    else:
+        # the paths proven infeasible can't be visited, they are not listed
+        print('/------- Feasible paths not visited -------/')
+        not_visited = list(pathanalysis.uncoveredPaths(MAX_PRINTED_PATHS, feasible=True))
+        n_listed = n_feasible - len(pathanalysis.coveredPaths())
     print(not_visited)
+    if n_listed > len(not_visited):
+        print('... {} paths not visited in total'.format(n_listed))
 
-    if not_visited == []:
+    if n_not_visited == 0:
         print()
         print('>> Critere TC TRUE')
     else:
         print()
         print('>> Critere TC FALSE')
-    if len(k_paths) > 0 :
-        coverage_rate = round(1 - len(not_visited)/len(k_paths),2)*100
+    if n_paths > 0 :
+        coverage_rate = pathanalysis.coverageRate()
         print()
         print('>> Taux de couverture : {}%'.format(coverage_rate))
     else :
         coverage_rate = 100
         print()
         print('>> Taux de couverture : {}% : no {}-paths found'.format(coverage_rate, K))
+    if n_feasible is not None:
+        print()
+        print('>> Critere TC (chemins faisables) {}'.format('TRUE' if n_listed == 0 else 'FALSE'))
+        print('>> Taux de couverture (chemins faisables) : {}%'.format(pathanalysis.feasibleCoverageRate()))
 
 if __name__ == '__main__':
     main()
@@ -1,53 +1,60 @@
-from interpreter.Interpreter import Interpreter
+from interpreter.Backends import getBackend, DEFAULT_BACKEND
 from interpreter.Lexer import Lexer
 from interpreter.Parser import Parser
-from interpreter.DatatestSet import DatatestSet, Datatest
+from interpreter.DatatestColumns import openDatatests
+from criteria.BatchRunner import runBatch
+from criteria.Coverage import CoverageMap, CoverageAccumulator, DECISION
 import sys
 
-# usage : python main-td.py input/text_source.txt datatests/dt1.txt
+# usage : python main-td.py input/text_source.txt datatests/dt1.txt [tree|vm|python|batch]
+# batch evaluates all the datatests at once, one numpy lane per datatest
 
 def main():
-    if len(sys.argv) != 3 :
-        print('EXPECTING AS ARGV: SOURCE_CODE DATATESTSET ')
+    if len(sys.argv) not in (3, 4) :
+        print('EXPECTING AS ARGV: SOURCE_CODE DATATESTSET [BACKEND]')
         exit()
-    text_source_original = open(sys.argv[1], 'r').read()
-    text_datatestset = open(sys.argv[2], 'r').read()
-
-    dts = DatatestSet(text_datatestset)
-    dts.parse()
-    i = 1
-    visited = []
-    for dt in dts.datatests :
-        """ Evaluate program for each datatest """
-        print('====================================')
-        print('-------Datatest '+str(i)+'--------')
-        print('====================================')
-        """ Add assigments to program """
-        dt.parse()
-        text_source = dt.ini_source + text_source_original
-        print('/------- Evaluating with initial assigments:  -------/ ')
-        print(dt.ini_source)
-        """ Now Interpret program """
-        lexer = Lexer(text_source)
-        parser = Parser(lexer)
-        interpreter = Interpreter(parser)
-        interpreter.interpret()
-        print('/------- Labels DECISIONS visited -------/ ')
-        i_visited = [l.value for l in interpreter.visited if l.type == 'IF' or l.type == 'WHILE' ]
-        print(i_visited)
-        visited = set(list(visited)+i_visited)
-        print('/------- Variables final evaluation -------/ ')
-        for k, v in sorted(interpreter.GLOBAL_SCOPE.items()):
-            print('%s = %s' % (k, v))
-        i += 1
+    text_source = open(sys.argv[1], 'r').read()
+    """ Tokenize and parse the program once, it is run again for each datatest """
+    parser = Parser(Lexer(text_source))
+    backend = sys.argv[3] if len(sys.argv) == 4 else DEFAULT_BACKEND
+    if backend == 'batch':
+        coverage = runBatch(parser, sys.argv[2], DECISION)
+    else:
+        # text datatests are read one at a time, columnar ones are memory mapped
+        datatests = openDatatests(sys.argv[2])
+        interpreter = getBackend(backend)(parser)
+        i = 1
+        coverage = None
+        for dt in datatests:
+            """ Evaluate program for each datatest """
+            print('====================================')
+            print('-------Datatest '+str(i)+'--------')
+            print('====================================')
+            print('/------- Evaluating with initial assigments:  -------/ ')
+            print(dt.ini_assigns)
+            """ Now Interpret program, its scope seeded with the datatest values """
+            interpreter.reset()
+            interpreter.GLOBAL_SCOPE.update(dt.values)
+            interpreter.interpret()
+            print('/------- Labels DECISIONS visited -------/ ')
+            i_visited = [l.value for l in interpreter.visited if l.type == 'IF' or l.type == 'WHILE' ]
+            print(i_visited)
+            if coverage is None:
+                # the labels are known once the program is parsed
+                coverage = CoverageAccumulator(CoverageMap({DECISION: [l.value for l in parser.labels if l.type == 'IF' or l.type == 'WHILE']}))
+            coverage.add(coverage.map.hits(DECISION, i_visited))
+            print('/------- Variables final evaluation -------/ ')
+            for k, v in sorted(interpreter.GLOBAL_SCOPE.items()):
+                print('%s = %s' % (k, v))
+            i += 1
     print('====================================')
     print('------- Result of datatest set (jeu de donnee) --------')
     print('====================================')
     print('/------- All labels DECISIONS-------/')
-    decision_labels = [ l.value for l in interpreter.parser.labels if l.type == 'IF' or l.type == 'WHILE' ]
+    decision_labels = [ l.value for l in parser.labels if l.type == 'IF' or l.type == 'WHILE' ]
     print(decision_labels)
     print('/------- Labels DECISIONS not visited -------/ ')
-    not_visited = [ u.value for u in interpreter.parser.labels if u.value not in visited and (u.type == 'IF' or u.type == 'WHILE') ]
+    not_visited = coverage.uncovered(DECISION)
     print(not_visited)
     if not_visited == []:
         print()
@@ -55,7 +62,7 @@ def main():
     else :
         print()
         print('>> Critere TD FALSE')
-    coverage_rate = round(1 - len(not_visited)/len(decision_labels),2)*100
+    coverage_rate = coverage.coverageRate(DECISION)
     print('>> Taux de couverture : {}%'.format(coverage_rate))
 
 if __name__ == '__main__':
@@ -1,6 +1,6 @@
 from cfg.CfgParser import CfgParser
 from cfg.CfgInterpreter import  CfgInterpreter
-from interpreter.DatatestSet import DatatestSet
+from interpreter.DatatestColumns import openDatatests
 import sys
 
 # usage : python main-tdef.py input/text_source_complique.txt datatests/dt2.txt
@@ -10,28 +10,27 @@ def main():
         print('EXPECTING AS ARGV: SOURCE_CODE DATATESTSET')
         exit()
     text_source = open(sys.argv[1], 'r').read()
-    text_datatestset = open(sys.argv[2], 'r').read()
+    # text datatests are read one at a time, columnar ones are memory mapped
+    datatests = openDatatests(sys.argv[2])
+
+    """ Build the CFG once (or load it from the cache), it is shared by all datatests """
+    cfgparser = CfgParser.cached(text_source)
+    cfginterpreter = CfgInterpreter(cfgparser)
 
-    dts = DatatestSet(text_datatestset)
-    dts.parse()
     i = 1
     critere = True
-    for dt in dts.datatests:
+    for dt in datatests:
         """ Evaluate program for each datatest """
         print('====================================')
         print('-------Datatest ' + str(i) + '--------')
         print('====================================')
         """ Add assigments to program """
-        dt.parse()
         print('/------- Evaluating with initial assigments:  -------/ ')
         print(dt.ini_assigns)
-        """ Now Interpret program """
-        cfgparser = CfgParser(text_source)
-        cfgparser.parse()
-        cfginterpreter = CfgInterpreter(cfgparser)
-        cfginterpreter.interpretAssigments(dt.ini_assigns)
-        # we don't really count the initial test assigment as definition so we empty the list
-        cfginterpreter.interpreter.toUse = []
+        """ Now Interpret program on the shared CFG with a fresh state """
+        cfginterpreter.reset()
+        cfginterpreter.seed(dt.values)
+        # the initial test assigments are not definitions, seeding them leaves toUse empty
         # variable so that an exception is raised when a variable is not used after a declaration i.e. between two declarations
         cfginterpreter.interpreter.raiseExceptionIfNotUsed = True
         try:
@@ -0,0 +1,68 @@
+from cfg.CfgParser import CfgParser
+from cfg.CfgInterpreter import  CfgInterpreter
+from criteria.DefUse import DefUseAnalysis
+from criteria.DuPaths import DuPathAnalysis
+from interpreter.DatatestColumns import openDatatests
+import sys
+
+# usage : python main-tdu.py input/text_source_that_check_tu.txt datatests/dt1.txt
+# TDU (all DU-paths) : every definition-clear loop-free path from a definition to a use
+# of its variable is executed by a datatest
+
+# maximum number of DU-paths not visited printed
+MAX_PRINTED_PATHS = 100
+
+def main():
+    if len(sys.argv) != 3 :
+        print('EXPECTING AS ARGV: SOURCE_CODE DATATESTSET')
+        exit()
+    text_source = open(sys.argv[1], 'r').read()
+    # text datatests are read one at a time, columnar ones are memory mapped
+    datatests = openDatatests(sys.argv[2])
+
+    """ Build the CFG once (or load it from the cache), it is shared by all datatests """
+    cfgparser = CfgParser.cached(text_source)
+    cfginterpreter = CfgInterpreter(cfgparser)
+    """ DU-paths are enumerated once, statically """
+    try:
+        dupaths = DuPathAnalysis(DefUseAnalysis(cfgparser.cfg))
+    except RuntimeError as e:
+        print(e)
+        exit()
+
+    i = 1
+    covered = set()
+    for dt in datatests:
+        """ Evaluate program for each datatest """
+        print('====================================')
+        print('-------Datatest ' + str(i) + '--------')
+        print('====================================')
+        print('/------- Evaluating with initial assigments:  -------/ ')
+        print(dt.ini_assigns)
+        cfginterpreter.reset()
+        cfginterpreter.seed(dt.values)
+        try:
+            cfginterpreter.interpretCfg()
+        except RuntimeError as e:
+            print('/------- Run stopped -------/ ')
+            print(e)
+        print('/------- Path visited -------/ ')
+        print(cfginterpreter.visited)
+        print('/------- DU-paths (variable, path) visited -------/ ')
+        print([dupaths.path(p) for p in sorted(dupaths.coveredPaths(cfginterpreter.visited))])
+        dupaths.coveredPaths(cfginterpreter.visited, covered)
+        i += 1
+    print('====================================')
+    print('------- Result of datatest set (jeu de donnee) --------')
+    print('====================================')
+    print('/------- Number of DU-paths -------/ ')
+    print(len(dupaths.paths))
+    print('/------- DU-paths (variable, path) not visited -------/ ')
+    not_visited = [p for p in range(len(dupaths.paths)) if p not in covered]
+    print([dupaths.path(p) for p in not_visited[:MAX_PRINTED_PATHS]])
+    print()
+    print('>> Critere TDU {}'.format('TRUE' if not_visited == [] else 'FALSE'))
+    print('>> Taux de couverture : {}%'.format(dupaths.coverageRate(covered)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+from cfg.CfgParser import CfgParser
+from cfg.CfgInterpreter import  CfgInterpreter
+from criteria.DefUse import DefUseAnalysis
+from interpreter.DatatestColumns import openDatatests
+import sys
+
+# usage : python main-tu.py input/text_source_that_check_tu.txt datatests/dt1.txt
+# TU (all uses) : every def-use pair (definition, use, variable) is executed by a datatest
+
+def main():
+    if len(sys.argv) != 3 :
+        print('EXPECTING AS ARGV: SOURCE_CODE DATATESTSET')
+        exit()
+    text_source = open(sys.argv[1], 'r').read()
+    # text datatests are read one at a time, columnar ones are memory mapped
+    datatests = openDatatests(sys.argv[2])
+
+    """ Build the CFG once (or load it from the cache), it is shared by all datatests """
+    cfgparser = CfgParser.cached(text_source)
+    cfginterpreter = CfgInterpreter(cfgparser)
+    """ Def-use pairs are computed once, statically """
+    defuse = DefUseAnalysis(cfgparser.cfg)
+
+    i = 1
+    covered = set()
+    for dt in datatests:
+        """ Evaluate program for each datatest """
+        print('====================================')
+        print('-------Datatest ' + str(i) + '--------')
+        print('====================================')
+        print('/------- Evaluating with initial assigments:  -------/ ')
+        print(dt.ini_assigns)
+        cfginterpreter.reset()
+        cfginterpreter.seed(dt.values)
+        try:
+            cfginterpreter.interpretCfg()
+        except RuntimeError as e:
+            print('/------- Run stopped -------/ ')
+            print(e)
+        print('/------- Path visited -------/ ')
+        print(cfginterpreter.visited)
+        print('/------- Def-use pairs (definition, use, variable) visited -------/ ')
+        print(sorted(defuse.coveredPairs(cfginterpreter.visited)))
+        defuse.coveredPairs(cfginterpreter.visited, covered)
+        i += 1
+    print('====================================')
+    print('------- Result of datatest set (jeu de donnee) --------')
+    print('====================================')
+    print('/------- All def-use pairs (definition, use, variable) -------/ ')
+    print(sorted(defuse.pairs))
+    print('/------- Def-use pairs not visited -------/ ')
+    not_visited = sorted(defuse.pairs - covered)
+    print(not_visited)
+    print('/------- Definitions reaching no use -------/ ')
+    print(defuse.unusedDefinitions())
+    print()
+    print('>> Critere TU {}'.format('TRUE' if not_visited == [] else 'FALSE'))
+    print('>> Taux de couverture : {}%'.format(defuse.coverageRate(covered)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import sys
+
+# the parser names the Program after sys.argv[1], the source file of the main-*.py scripts
+if len(sys.argv) < 2:
+    sys.argv.append('program')
+
+from interpreter.Lexer import Lexer
+from interpreter.Parser import Parser
+from interpreter.Interpreter import Interpreter
+
+# variables of the generated programs and of their datatests
+VARS = ['a', 'b', 'c']
+# loop counter of the WHILE at each depth, only assigned by its loop
+COUNTERS = ['i', 'j']
+# variable decremented by the WHILE "n > 0", only read elsewhere
+DOWN = 'n'
+MAX_DEPTH = 2
+
+
+class ProgramGenerator:
+    """
+    Random programs of the language, terminating whatever their datatests:
+    a WHILE either counts its counter up to a small constant or decrements n,
+    and the loops only multiply by constants so that the values stay small
+    enough for the tree interpreter. A datatest leaving a variable out or
+    a division by zero makes them fail
+    """
+    def __init__(self, rng):
+        self.rng = rng
+        self.label = 0
+
+    def nextLabel(self):
+        self.label += 1
+        return self.label
+
+    def program(self):
+        self.label = 0
+        body = self.compounds(0, False)
+        return '{}\n{}:\n'.format(body, self.nextLabel())
+
+    def compounds(self, depth, in_loop):
+        rng = self.rng
+        # cfg.CfgParser connects a decision to the first block of a sequence, never to a decision
+        out = [self.block(in_loop)]
+        for _ in range(rng.randint(0, 2)):
+            r = rng.random()
+            if depth < MAX_DEPTH and r < 0.2:
+                out.append(self.ifBlock(depth, in_loop))
+            elif depth < MAX_DEPTH and r < 0.35:
+                out.append(self.countingLoop(depth))
+            elif depth < MAX_DEPTH and r < 0.45:
+                out.append(self.downLoop())
+            else:
+                out.append(self.block(in_loop))
+        return '\n'.join(out)
+
+    def block(self, in_loop):
+        rng = self.rng
+        assigns = ' '.join('{} = {} ;'.format(name, self.expr(in_loop))
+                           for name in rng.sample(VARS, rng.randint(1, 2)))
+        return '{}: {}'.format(self.nextLabel(), assigns)
+
+    def ifBlock(self, depth, in_loop):
+        text = 'IF( {}: {} ){{\n{}\n}}'.format(self.nextLabel(), self.condition(), self.compounds(depth + 1, in_loop))
+        if self.rng.random() < 0.5:
+            text += 'ELSE{{\n{}\n}}'.format(self.compounds(depth + 1, in_loop))
+        return text
+
+    def countingLoop(self, depth):
+        counter = COUNTERS[depth]
+        init = '{}: {} = 0 ;'.format(self.nextLabel(), counter)
+        head = 'WHILE( {}: {} < {} ){{'.format(self.nextLabel(), counter, self.rng.randint(0, 4))
+        body = self.compounds(depth + 1, True)
+        step = '{}: {} = {} + 1 ;'.format(self.nextLabel(), counter, counter)
+        return '\n'.join([init, head, body, step, '}'])
+
+    def downLoop(self):
+        rng = self.rng
+        head = 'WHILE( {}: {} > 0 ){{'.format(self.nextLabel(), DOWN)
+        assigns = ['{} = {} - {} ;'.format(DOWN, DOWN, rng.randint(1, 3))]
+        if rng.random() < 0.7:
+            name = rng.choice(VARS)
+            assigns.insert(rng.randint(0, 1), '{} = {} ;'.format(name, self.expr(True)))
+        return '\n'.join([head, '{}: {}'.format(self.nextLabel(), ' '.join(assigns)), '}'])
+
+    def condition(self):
+        rng = self.rng
+        left = rng.choice(VARS + [DOWN])
+        right = rng.choice(VARS + [str(rng.randint(-3, 3))])
+        return '{} {} {}'.format(left, rng.choice(['<', '>', '==']), right)
+
+    def expr(self, in_loop):
+        rng = self.rng
+        x, y = rng.choice(VARS), rng.choice(VARS + [DOWN])
+        r = rng.random()
+        if r < 0.25:
+            return '{} + {}'.format(x, rng.randint(-3, 5))
+        if r < 0.4:
+            return '{} - {}'.format(x, y)
+        if r < 0.55:
+            return '{} * {}'.format(x, rng.choice(['-1', '2', '3']))
+        if r < 0.65:
+            return str(rng.randint(-5, 5))
+        if r < 0.75:
+            return '{} / {}'.format(x, rng.choice([y, '2']))
+        if r < 0.85 and not in_loop:
+            return '{} * {}'.format(x, y)
+        return '- {} + {}'.format(x, y)
+
+    def values(self, present=0.9, huge=0.0):
+        """ Initial values of a datatest, some variables left out and some huge if asked """
+        rng = self.rng
+        values = {}
+        for name in VARS + [DOWN]:
+            if rng.random() < present:
+                if name != DOWN and rng.random() < huge:
+                    values[name] = rng.choice([2 ** 61, -2 ** 61 + 5, 2 ** 40])
+                else:
+                    values[name] = rng.randint(-6, 6)
+        return values
+
+
+def run(interpreter_class, source, values, strict=False):
+    """
+    Interpret source with an interpreter of the interface of interpreter.Interpreter
+    :return: (error, scope items, visited labels, toUse) once it stops
+    """
+    interpreter = interpreter_class(Parser(Lexer(source)))
+    interpreter.GLOBAL_SCOPE.update(values)
+    interpreter.raiseExceptionIfNotUsed = strict
+    try:
+        interpreter.interpret()
+        error = None
+    except Exception as e:
+        error = '{}: {}'.format(type(e).__name__, e)
+    return error, list(interpreter.GLOBAL_SCOPE.items()), [l.value for l in interpreter.visited], \
+        list(interpreter.toUse)
+
+
+def reference(source, values, strict=False):
+    return run(Interpreter, source, values, strict)
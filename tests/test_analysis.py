@@ -0,0 +1,126 @@
+import random
+import pytest
+from programs import ProgramGenerator
+from cfg.CfgParser import CfgParser
+from cfg.CfgInterpreter import CfgInterpreter
+from cfg.Cfg import ASSIGN_NODE
+from cfg.IntervalAnalysis import IntervalAnalysis, TOP
+from cfg.LoopAnalysis import LoopBoundAnalysis
+from interpreter.DatatestColumns import inputRanges
+from interpreter.DatatestSet import Datatest
+
+
+def cfgInterpreter(source):
+    cfgparser = CfgParser(source)
+    cfgparser.parse()
+    return CfgInterpreter(cfgparser)
+
+
+def walk(cfginterpreter, values):
+    """
+    Run the CFG edge by edge, without accelerating the loops
+    :return: list of (node, scope on entry of the node) until the end or the first error,
+        and the edges taken
+    """
+    cfg = cfginterpreter.cfg
+    cfginterpreter.reset()
+    cfginterpreter.seed(values)
+    interpreter = cfginterpreter.interpreter
+    states = []
+    edges = []
+    u = cfg.source
+    try:
+        while True:
+            states.append((u, dict(interpreter.GLOBAL_SCOPE)))
+            first, last = cfg.offsets[u], cfg.offsets[u + 1]
+            if first == last:
+                return states, edges
+            if cfg.kinds[u] == ASSIGN_NODE:
+                cfg.actions[first](interpreter)
+                edge = first
+            else:
+                edge = [e for e in range(first, last) if cfg.actions[e](interpreter)][0]
+            edges.append(edge)
+            u = cfg.targets[edge]
+    except Exception:
+        return states, edges
+
+
+def contains(interval, value):
+    return interval[0] <= value <= interval[1]
+
+
+def datatestSet(generator):
+    """ Datatests of one program, a few of them leaving a variable out """
+    return [Datatest.fromValues(generator.values(present=0.95)) for _ in range(6)]
+
+
+@pytest.mark.parametrize('with_inputs', [False, True])
+@pytest.mark.parametrize('seed', range(3))
+def test_intervals_contain_executed_values(seed, with_inputs):
+    generator = ProgramGenerator(random.Random(seed))
+    for _ in range(60):
+        source = generator.program()
+        cfginterpreter = cfgInterpreter(source)
+        cfg = cfginterpreter.cfg
+        datatests = datatestSet(generator)
+        analysis = IntervalAnalysis(cfg, inputRanges(datatests) if with_inputs else None)
+        dead = set(analysis.deadEdges())
+        for datatest in datatests:
+            states, edges = walk(cfginterpreter, datatest.values)
+            for u, scope in states:
+                invariant = analysis.invariants[u]
+                assert invariant is not None, (source, datatest.text, cfg.labels[u])
+                for name, value in scope.items():
+                    assert contains(invariant.get(name, TOP), value), (source, datatest.text, cfg.labels[u], name)
+            for e in edges:
+                assert (cfg.labels[cfg.sources[e]], cfg.labels[cfg.targets[e]]) not in dead
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_executed_paths_are_feasible(seed):
+    generator = ProgramGenerator(random.Random(seed))
+    k = 12
+    for _ in range(40):
+        source = generator.program()
+        cfginterpreter = cfgInterpreter(source)
+        datatests = datatestSet(generator)
+        analysis = IntervalAnalysis(cfginterpreter.cfg, inputRanges(datatests))
+        feasible = set(map(tuple, analysis.feasiblePaths(k)))
+        assert analysis.countFeasible(k) == len(feasible)
+        for datatest in datatests:
+            states, edges = walk(cfginterpreter, datatest.values)
+            path = tuple(cfginterpreter.cfg.labels[u] for u, _ in states)
+            if states[-1][0] == cfginterpreter.cfg.target and len(edges) <= k:
+                assert path in feasible, (source, datatest.text)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_loop_bounds_above_executed_iterations(seed):
+    generator = ProgramGenerator(random.Random(seed))
+    proven = 0
+    for _ in range(60):
+        source = generator.program()
+        cfginterpreter = cfgInterpreter(source)
+        datatests = datatestSet(generator)
+        bounds = LoopBoundAnalysis(cfginterpreter.cfg, inputRanges(datatests)).bounds
+        proven += sum(bound is not None for bound in bounds.values())
+        for datatest in datatests:
+            cfginterpreter.reset()
+            cfginterpreter.seed(datatest.values)
+            try:
+                iterations = cfginterpreter.interpretCfgForIWhile()
+            except Exception:
+                continue
+            for label, (_, maximum) in iterations.items():
+                assert bounds[label] is None or maximum <= bounds[label], (source, datatest.text, label)
+    assert proven > 0
+
+
+def test_counting_loop_bound_is_exact():
+    source = '1: i = 0 ;\nWHILE( 2: i < N ){\n3: X = X + i ; i = i + 2 ;\n}\n4:\n'
+    cfginterpreter = cfgInterpreter(source)
+    bounds = LoopBoundAnalysis(cfginterpreter.cfg, {'N': (0, 9), 'X': (0, 0)}).bounds
+    assert bounds == {2: 5}
+    cfginterpreter.seed({'N': 9, 'X': 0})
+    assert cfginterpreter.interpretCfgForIWhile() == {2: [5, 5]}
@@ -0,0 +1,86 @@
+import random
+import pytest
+from programs import ProgramGenerator, run, reference
+from interpreter.Lexer import Lexer
+from interpreter.Parser import Parser
+from interpreter.Backends import BACKENDS, getBackend
+from interpreter.BatchInterpreter import BatchInterpreter, OVERFLOW
+from interpreter.DatatestSet import Datatest
+from interpreter.DatatestColumns import DatatestColumns
+
+
+@pytest.mark.parametrize('backend', ['vm', 'python'])
+@pytest.mark.parametrize('seed', range(3))
+def test_backend_same_state_as_tree(backend, seed):
+    """ Same scope, visited labels and toUse as the tree interpreter, also when it stops on an error """
+    generator = ProgramGenerator(random.Random(seed))
+    errors = 0
+    for _ in range(60):
+        source = generator.program()
+        for _ in range(4):
+            values = generator.values()
+            strict = generator.rng.random() < 0.3
+            expected = reference(source, values, strict)
+            assert run(getBackend(backend), source, values, strict) == expected, (source, values, strict)
+            errors += expected[0] is not None
+    assert errors > 0
+
+
+def test_backend_reused_after_reset():
+    source = '1: X = X + 1 ; Y = X * 2 ;\nIF( 2: Y > 4 ){\n3: X = 0 ;\n}\n4:\n'
+    for backend in BACKENDS.values():
+        interpreter = backend(Parser(Lexer(source)))
+        for x in (1, 5, 1):
+            interpreter.reset()
+            interpreter.GLOBAL_SCOPE['X'] = x
+            interpreter.interpret()
+            assert interpreter.GLOBAL_SCOPE['X'] == (0 if x == 5 else x + 1)
+            assert [l.value for l in interpreter.visited] == ([1, 2, 3, 4] if x == 5 else [1, 2, 4])
+
+
+def test_unknown_backend():
+    with pytest.raises(Exception, match='Unknown backend'):
+        getBackend('jit')
+
+
+def batch(source, rows):
+    columns = DatatestColumns.fromDatatests([Datatest.fromValues(values) for values in rows])
+    interpreter = BatchInterpreter(Parser(Lexer(source)).parse(), columns)
+    scopes, hits = interpreter.interpret()
+    return interpreter, scopes, hits
+
+
+def assertSameLanes(source, rows):
+    interpreter, scopes, hits = batch(source, rows)
+    for d, values in enumerate(rows):
+        error, scope, visited, _ = reference(source, values)
+        if error is None:
+            assert d not in interpreter.errors
+        else:
+            # the message of the exception raised by the tree interpreter
+            assert error.endswith(': ' + interpreter.errors[d]), (source, values)
+        assert dict(scopes[d]) == dict(scope), (source, values)
+        for l, label in enumerate(interpreter.labels):
+            assert hits[l, d] == visited.count(label.value), (source, values, label.value)
+    return interpreter
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_batch_lanes_same_as_tree(seed):
+    generator = ProgramGenerator(random.Random(seed))
+    failed = reruns = 0
+    for _ in range(60):
+        source = generator.program()
+        rows = [generator.values(huge=0.2) for _ in range(8)]
+        interpreter = assertSameLanes(source, rows)
+        failed += len(interpreter.errors)
+        reruns += len(interpreter.rerun)
+    assert failed > 0 and reruns > 0
+
+
+def test_batch_overflowing_lane_run_again():
+    source = '1: X = X * X ;\nWHILE( 2: X > 0 ){\n3: X = X - Y ; Y = Y * 2 ;\n}\n4:\n'
+    rows = [{'X': 3, 'Y': 1}, {'X': 2 ** 40, 'Y': 2 ** 60}, {'X': 2 ** 31, 'Y': 2 ** 59}]
+    interpreter = assertSameLanes(source, rows)
+    assert sorted(interpreter.rerun) == [1, 2]
+    assert OVERFLOW not in interpreter.errors.values()
@@ -0,0 +1,100 @@
+import random
+import pytest
+from programs import ProgramGenerator, reference
+from cfg.CfgParser import CfgParser
+from cfg.CfgCache import DiskCache
+from cfg.CfgInterpreter import CfgInterpreter
+from cfg.LoopAnalysis import LoopForest
+from cfg.PathAnalysis import PathAnalysis
+
+
+def cfgParser(source):
+    cfgparser = CfgParser(source)
+    cfgparser.parse()
+    return cfgparser
+
+
+def runCfg(cfginterpreter, values, strict=False):
+    """ :return: (error, scope items, visited labels, toUse) like programs.run """
+    cfginterpreter.reset()
+    cfginterpreter.seed(values)
+    cfginterpreter.interpreter.raiseExceptionIfNotUsed = strict
+    try:
+        cfginterpreter.interpretCfg()
+        error = None
+    except Exception as e:
+        error = '{}: {}'.format(type(e).__name__, e)
+    interpreter = cfginterpreter.interpreter
+    return error, list(interpreter.GLOBAL_SCOPE.items()), list(cfginterpreter.visited), list(interpreter.toUse)
+
+
+def whileIterations(cfg, visited):
+    """
+    Maximum of iterations of each WHILE each time it is entered, counted on a trace:
+    the WHILE is entered from a node out of its loop, iterated from a node in it
+    """
+    loops = LoopForest(cfg).loops
+    bodies = {cfg.labels[h]: set(cfg.labels[u] for u in body) for h, body in loops.items()}
+    counts = {}
+    for previous, label in zip([None] + visited, visited):
+        if label in bodies:
+            counter = counts.setdefault(label, [0, 0])
+            counter[0] = counter[0] + 1 if previous in bodies[label] else 0
+            counter[1] = max(counter[1], counter[0])
+    return counts
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_cfg_interpreter_same_as_tree(seed):
+    generator = ProgramGenerator(random.Random(seed))
+    for _ in range(60):
+        source = generator.program()
+        # one interpreter for all the datatests, like the main-*.py scripts
+        cfginterpreter = CfgInterpreter(cfgParser(source))
+        for _ in range(4):
+            values = generator.values()
+            strict = generator.rng.random() < 0.3
+            assert runCfg(cfginterpreter, values, strict) == reference(source, values, strict), (source, values)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_while_iterations_same_as_trace(seed):
+    generator = ProgramGenerator(random.Random(seed))
+    for _ in range(60):
+        source = generator.program()
+        cfginterpreter = CfgInterpreter(cfgParser(source))
+        for _ in range(4):
+            values = generator.values()
+            error, scope, visited, _ = reference(source, values)
+            if error is not None:
+                continue
+            cfginterpreter.reset()
+            cfginterpreter.seed(values)
+            counts = cfginterpreter.interpretCfgForIWhile()
+            assert cfginterpreter.visited == visited
+            assert list(cfginterpreter.interpreter.GLOBAL_SCOPE.items()) == scope
+            assert counts == whileIterations(cfginterpreter.cfg, visited), (source, values)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_counted_paths_same_as_enumerated(seed):
+    generator = ProgramGenerator(random.Random(seed))
+    for _ in range(30):
+        cfginterpreter = CfgInterpreter(cfgParser(generator.program()))
+        for k in range(0, 14, 3):
+            paths = list(cfginterpreter.getPaths(k))
+            assert len(set(map(tuple, paths))) == len(paths)
+            assert PathAnalysis(cfginterpreter, k).countPaths() == len(paths)
+
+
+def test_cached_cfg_same_as_parsed(tmp_path):
+    generator = ProgramGenerator(random.Random(7))
+    cache = DiskCache(str(tmp_path))
+    for _ in range(10):
+        source = generator.program()
+        # the first call parses and stores the CFG, the second loads it
+        for cfgparser in (CfgParser.cached(source, cache), CfgParser.cached(source, cache)):
+            cfginterpreter = CfgInterpreter(cfgparser)
+            for _ in range(3):
+                values = generator.values()
+                assert runCfg(cfginterpreter, values) == reference(source, values)
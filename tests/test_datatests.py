@@ -0,0 +1,100 @@
+import io
+import random
+import pytest
+from interpreter.DatatestSet import Datatest, DatatestSet, readDatatests, datatestColumns
+from interpreter.DatatestColumns import DatatestColumns, writeColumns, writeText, isColumnar, openDatatests, \
+    loadColumns, convert, inputRanges
+
+NAMES = ['X', 'Y', 'Z', 'i', 'longName2']
+
+
+def randomDatatests(rng, n):
+    datatests = []
+    for _ in range(n):
+        names = rng.sample(NAMES, rng.randint(0, len(NAMES)))
+        datatests.append(Datatest.fromValues({name: rng.choice([rng.randint(-9, 9), rng.randint(-2 ** 63, 2 ** 63 - 1)])
+                                              for name in names}))
+    return datatests
+
+
+def items(datatests):
+    return [list(datatest.values.items()) for datatest in datatests]
+
+
+def textOf(datatests):
+    stream = io.StringIO()
+    writeText(stream, datatests)
+    return stream.getvalue()
+
+
+@pytest.mark.parametrize('size', [1, 7, 1 << 16])
+@pytest.mark.parametrize('seed', range(3))
+def test_text_round_trip(seed, size):
+    datatests = randomDatatests(random.Random(seed), 50)
+    text = textOf(datatests)
+    assert items(readDatatests(io.StringIO(text), size)) == items(datatests)
+    assert items(readDatatests(io.BytesIO(text.encode('utf-8')), size)) == items(datatests)
+    datatestset = DatatestSet(text)
+    datatestset.parse()
+    assert len(datatestset) == len(datatests)
+    names, values, defined = datatestset.columns()
+    expected_names, expected_values, expected_defined = datatestColumns(datatests)
+    assert names == expected_names
+    assert (values == expected_values).all() and (defined == expected_defined).all()
+
+
+def test_text_with_comments_and_expressions():
+    text = '# set of datatests #\n{(X = 2 * 3, Y = X + 1);\n# second one\n(X = -1);()}\n'
+    expected = [[('X', 6), ('Y', 7)], [('X', -1)], []]
+    assert items(readDatatests(io.StringIO(text), 3)) == expected
+    datatestset = DatatestSet(text)
+    datatestset.parse()
+    for datatest in datatestset.datatests:
+        datatest.parse()
+    assert items(datatestset.datatests) == expected
+
+
+@pytest.mark.parametrize('text', ['(X = 1)', '{(X = 1);(Y = 2)', '{(X = 1)} (Y = 2)', '{(X = 1);(Y)}', '{(1X = 1)}'])
+def test_text_syntax_errors(text):
+    with pytest.raises(Exception, match='Incorrect syntax'):
+        list(readDatatests(io.StringIO(text)))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_columnar_round_trip(seed, tmp_path):
+    datatests = randomDatatests(random.Random(seed), 5000)
+    path = str(tmp_path / 'datatests.col')
+    writeColumns(path, *datatestColumns(datatests))
+    assert isColumnar(path)
+    columns = DatatestColumns(path)
+    assert len(columns) == len(datatests)
+    # the columns keep the values, not the order of the assigments of a datatest
+    expected = [dict(datatest.values) for datatest in datatests]
+    assert [dict(datatest.values) for datatest in columns] == expected
+    assert [dict(datatest.values) for datatest in loadColumns(path)] == expected
+    assert [dict(datatest.values) for datatest in openDatatests(path)] == expected
+    assert dict(columns[1234].values) == expected[1234]
+    assert inputRanges(columns) == inputRanges(datatests)
+
+
+def test_convert_round_trip(tmp_path):
+    datatests = randomDatatests(random.Random(3), 300)
+    text, columnar, back = (str(tmp_path / name) for name in ('dt.txt', 'dt.col', 'back.txt'))
+    with open(text, 'w') as f:
+        writeText(f, datatests)
+    convert(text, columnar)
+    convert(columnar, back)
+    assert isColumnar(columnar) and not isColumnar(back)
+    expected = [dict(datatest.values) for datatest in datatests]
+    with open(back) as f:
+        assert [dict(datatest.values) for datatest in readDatatests(f)] == expected
+    assert [dict(datatest.values) for datatest in openDatatests(back)] == expected
+    assert [dict(datatest.values) for datatest in loadColumns(text)] == expected
+
+
+def test_empty_columns(tmp_path):
+    path = str(tmp_path / 'empty.col')
+    writeColumns(path, *datatestColumns([Datatest.fromValues({}), Datatest.fromValues({})]))
+    columns = DatatestColumns(path)
+    assert len(columns) == 2
+    assert [dict(datatest.values) for datatest in columns] == [{}, {}]
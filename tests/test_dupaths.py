@@ -0,0 +1,83 @@
+import random
+import pytest
+from programs import ProgramGenerator
+from cfg.CfgParser import CfgParser
+from cfg.CfgInterpreter import CfgInterpreter
+from criteria.DefUse import DefUseAnalysis
+from criteria.DuPaths import DuPathAnalysis
+
+
+def bruteForcePaths(defuse):
+    """
+    DU-paths by a plain depth-first search of every loop-free path from each
+    definition, without the live variables nor the prefix trees
+    :return: set of (variable, tuple of labels)
+    """
+    cfg = defuse.cfg
+    paths = set()
+
+    def extend(d, name, path):
+        u = path[-1]
+        for v in cfg.targets[cfg.offsets[u]:cfg.offsets[u + 1]]:
+            if v in path and v != d:
+                continue
+            if name in defuse.uses[v]:
+                paths.add((name, tuple(cfg.labels[w] for w in path + [v])))
+            if v != d and name not in defuse.defs[v]:
+                extend(d, name, path + [v])
+
+    for d, name in defuse.definitions:
+        extend(d, name, [d])
+    return paths
+
+
+def occurs(path, trace):
+    n = len(path)
+    return any(tuple(trace[i:i + n]) == path for i in range(len(trace) - n + 1))
+
+
+def analyses(source):
+    cfgparser = CfgParser(source)
+    cfgparser.parse()
+    defuse = DefUseAnalysis(cfgparser.cfg)
+    return CfgInterpreter(cfgparser), defuse, DuPathAnalysis(defuse)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_du_paths_same_as_brute_force(seed):
+    generator = ProgramGenerator(random.Random(seed))
+    for _ in range(60):
+        source = generator.program()
+        _, defuse, dupaths = analyses(source)
+        paths = [dupaths.path(i) for i in range(len(dupaths.paths))]
+        assert len(set(paths)) == len(paths)
+        assert set(paths) == bruteForcePaths(defuse), source
+        for name, path in paths:
+            assert (path[0], path[-1], name) in defuse.pairs
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_covered_du_paths_occur_in_trace(seed):
+    generator = ProgramGenerator(random.Random(seed))
+    for _ in range(40):
+        source = generator.program()
+        cfginterpreter, _, dupaths = analyses(source)
+        for _ in range(4):
+            cfginterpreter.reset()
+            cfginterpreter.seed(generator.values(present=1))
+            try:
+                cfginterpreter.interpretCfg()
+            except Exception:
+                # the nodes visited before the error are a trace as well
+                pass
+            trace = cfginterpreter.visited
+            expected = set(i for i in range(len(dupaths.paths)) if occurs(dupaths.path(i)[1], trace))
+            assert dupaths.coveredPaths(trace) == expected, (source, trace)
+
+
+def test_max_paths():
+    source = '1: X = 0 ;\nIF( 2: X < 1 ){\n3: Y = X ;\n}ELSE{\n4: Y = X + 1 ;\n}\n5: X = Y ;\n6:\n'
+    defuse = analyses(source)[1]
+    assert len(DuPathAnalysis(defuse).paths) == 5
+    with pytest.raises(RuntimeError, match='More than 4 DU-paths'):
+        DuPathAnalysis(defuse, max_paths=4)
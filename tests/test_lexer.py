@@ -0,0 +1,135 @@
+import random
+import pytest
+from interpreter.Lexer import Lexer, Token, RESERVED_KEYWORDS, ID, INTEGER_CONST, EOF, \
+    scanRegex, scanVectorized, VECTORIZED_MIN_LENGTH
+
+
+class ReferenceLexer(object):
+    """
+    The character by character lexer the token arrays replaced, kept as the reference
+    of the differential tests. Two of its quirks are avoided by the generated sources:
+    it skips the character after a '=' which is not '==', and it never returns on a
+    comment not closed
+    """
+    SINGLE = {'|': 'PIPE', ';': 'SEMI', ':': 'COLON', '+': 'PLUS', '-': 'MINUS', '*': 'MUL',
+              '/': 'DIV', '(': 'LPAREN', ')': 'RPAREN', '{': 'LBRACKET', '}': 'RBRACKET',
+              '<': 'INFERIOR', '>': 'SUPERIOR'}
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def char(self, offset=0):
+        if self.pos + offset < len(self.text):
+            return self.text[self.pos + offset]
+        return None
+
+    def get_next_token(self):
+        while self.char() is not None:
+            char = self.char()
+            if char.isspace():
+                self.pos += 1
+            elif char == '#':
+                self.pos = self.text.index('#', self.pos + 1) + 1
+            elif char.isalpha():
+                start = self.pos
+                while self.char() is not None and self.char().isalnum():
+                    self.pos += 1
+                lexeme = self.text[start:self.pos]
+                return RESERVED_KEYWORDS.get(lexeme, Token(ID, lexeme))
+            elif char.isdigit():
+                start = self.pos
+                while self.char() is not None and self.char().isdigit():
+                    self.pos += 1
+                return Token(INTEGER_CONST, int(self.text[start:self.pos]))
+            elif char == '=':
+                self.pos += 2
+                return Token('EQUAL', '==') if self.char(-1) == '=' else Token('ASSIGN', '=')
+            elif char in self.SINGLE:
+                self.pos += 1
+                return Token(self.SINGLE[char], char)
+            else:
+                raise Exception('Invalid character ' + char)
+        return Token(EOF, None)
+
+
+def tokens(lexer):
+    """ :return: (type, value) of the tokens served until EOF, or the message of the error """
+    served = []
+    while True:
+        try:
+            token = lexer.get_next_token()
+        except Exception as e:
+            served.append(str(e))
+            return served
+        served.append((token.type, token.value))
+        if token.type == EOF:
+            return served
+
+
+LETTERS = 'abcXYZéßΩж'
+FIXED = ['|', '= ', '==', ';', ':', '+', '-', '*', '/', '(', ')', '{', '}', '<', '>',
+         'IF', 'ELSE', 'WHILE', 'DIV', 'BEGIN', 'END', 'IFX', 'ENDE']
+SPACES = [' ', '\n', '\t', '', '', '　']
+
+
+def lexeme(rng):
+    r = rng.random()
+    if r < 0.3:
+        # identifiers, with non ASCII letters and digits
+        return rng.choice(LETTERS) + ''.join(rng.choice(LETTERS + '0123²٣') for _ in range(rng.randint(0, 4)))
+    if r < 0.45:
+        return ''.join(rng.choice('0123456789٣') for _ in range(rng.randint(1, 4)))
+    if r < 0.5:
+        return '#' + ''.join(rng.choice('ab 1=\n') for _ in range(rng.randint(0, 5))) + '#'
+    if r < 0.51:
+        return rng.choice('_$@!?')
+    return rng.choice(FIXED)
+
+
+def source(rng, size):
+    return 'X' + ''.join(lexeme(rng) + rng.choice(SPACES) for _ in range(rng.randint(0, size)))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_same_tokens_as_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        text = source(rng, 80)
+        assert tokens(Lexer(text)) == tokens(ReferenceLexer(text)), text
+
+
+def test_long_source_same_tokens_as_reference():
+    rng = random.Random(10)
+    text = source(rng, 5000)
+    assert len(text) >= VECTORIZED_MIN_LENGTH
+    assert tokens(Lexer(text)) == tokens(ReferenceLexer(text))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_regex_and_vectorized_scans_agree(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        text = source(rng, 80) + rng.choice(['', '#', ' # a', '==='])
+        assert scanRegex(text) == scanVectorized(text), text
+
+
+def test_current_char_follows_last_token():
+    lexer = Lexer('1: X = 2 ;')
+    assert lexer.get_next_token().value == 1
+    assert lexer.current_char == ':'
+    for _ in range(4):
+        lexer.get_next_token()
+    assert lexer.current_char == ' '
+    assert lexer.get_next_token().type == 'SEMI'
+    assert lexer.current_char is None
+    assert lexer.get_next_token().type == EOF
+    assert lexer.get_next_token().type == EOF
+
+
+def test_invalid_character_reported_when_reached():
+    lexer = Lexer('X = 1 ; $ Y')
+    for _ in range(4):
+        lexer.get_next_token()
+    with pytest.raises(Exception, match=r'Invalid character \$'):
+        lexer.get_next_token()